@@ -0,0 +1,624 @@
+# backend/benchmarks/fakes.py
+"""
+Deterministic in-memory stand-ins for Firestore and Gemini.
+
+They implement only the parts of the client APIs this backend uses: collection
+and document references, where/order_by/limit/select/start_after queries,
+snapshot listeners,
+write batches, transactions, and the async client's awaitable equivalents.
+"""
+import asyncio
+import copy
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_NUMBER = (int, float)
+# What firestore.FieldPath.document_id() returns; documents are always in id order
+DOCUMENT_ID = "__name__"
+
+
+def _comparable(a: Any, b: Any) -> bool:
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool)
+    if isinstance(a, _NUMBER) and isinstance(b, _NUMBER):
+        return True
+    return type(a) is type(b)
+
+
+def _matches(data: Dict[str, Any], field: str, op: str, value: Any) -> bool:
+    if field not in data:
+        return False
+    actual = data[field]
+    if op == "==":
+        return actual == value
+    if op == "in":
+        return actual in value
+    if op == "array_contains":
+        return isinstance(actual, list) and value in actual
+    if op == "array_contains_any":
+        return isinstance(actual, list) and any(v in actual for v in value)
+    if not _comparable(actual, value):
+        return False
+    if op == ">=":
+        return actual >= value
+    if op == ">":
+        return actual > value
+    if op == "<=":
+        return actual <= value
+    if op == "<":
+        return actual < value
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def _project(data: Dict[str, Any], field_paths: Optional[List[str]]) -> Dict[str, Any]:
+    """Keeps only `field_paths` (dotted for nested maps), like a Firestore field mask."""
+    if field_paths is None:
+        return data
+    projected: Dict[str, Any] = {}
+    for path in field_paths:
+        source, target = data, projected
+        keys = path.split(".")
+        for key in keys[:-1]:
+            if not isinstance(source.get(key), dict):
+                break
+            source = source[key]
+            target = target.setdefault(key, {})
+        else:
+            if keys[-1] in source:
+                target[keys[-1]] = source[keys[-1]]
+    return projected
+
+
+# ----------------------------
+# Storage
+# ----------------------------
+class FakeStore:
+    """Collections keyed by path ("users", "carbon_history/u1/entries", ...)."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        # Per-call latency applied by the async client
+        self.latency = latency_ms / 1000
+        self.collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.lock = threading.RLock()
+        self.watches: List["FakeWatch"] = []
+        # (collection, field) -> value -> ids, so "==" queries don't scan large collections
+        self._eq_index: Dict[Tuple[str, str], Dict[Any, set]] = {}
+        self.reads = 0
+        self.writes = 0
+
+    def load(self, collection: str, documents: List[Dict[str, Any]], id_field: str = "id") -> None:
+        with self.lock:
+            col = self.collections.setdefault(collection, {})
+            for doc in documents:
+                col[str(doc[id_field])] = copy.deepcopy(doc)
+            self._drop_indexes(collection)
+
+    def _drop_indexes(self, collection: str) -> None:
+        for key in [k for k in self._eq_index if k[0] == collection]:
+            del self._eq_index[key]
+
+    def candidates(self, collection: str, field: str, value: Any) -> List[str]:
+        """Ids of documents whose `field` equals `value`. Call with the lock held."""
+        index = self._eq_index.get((collection, field))
+        if index is None:
+            index = {}
+            for doc_id, data in self.collections.get(collection, {}).items():
+                try:
+                    index.setdefault(data.get(field), set()).add(doc_id)
+                except TypeError:  # unhashable values are never matched by "=="
+                    pass
+            self._eq_index[(collection, field)] = index
+        try:
+            return list(index.get(value, ()))
+        except TypeError:
+            return []
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            self.reads += 1
+            data = self.collections.get(collection, {}).get(doc_id)
+            return copy.deepcopy(data) if data is not None else None
+
+    def put(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]]) -> None:
+        """Writes (or deletes, when data is None) one document and notifies listeners."""
+        with self.lock:
+            self.writes += 1
+            col = self.collections.setdefault(collection, {})
+            before = col.get(doc_id)
+            self._drop_indexes(collection)
+            if data is None:
+                col.pop(doc_id, None)
+            else:
+                col[doc_id] = copy.deepcopy(data)
+            watches = [w for w in self.watches if w.query.collection == collection]
+        for watch in watches:
+            watch.notify(doc_id, before, data)
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference: "FakeDocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+        self.update_time = None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentReference:
+    def __init__(self, store: FakeStore, collection: str, doc_id: str):
+        self._store = store
+        self._collection = collection
+        self.id = doc_id
+        self.path = f"{collection}/{doc_id}"
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self._store, f"{self.path}/{name}")
+
+    def get(self, *args, **kwargs) -> FakeDocumentSnapshot:
+        return FakeDocumentSnapshot(self, self._store.get(self._collection, self.id))
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        if merge:
+            data = {**(self._store.get(self._collection, self.id) or {}), **data}
+        self._store.put(self._collection, self.id, data)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        current = self._store.get(self._collection, self.id)
+        if current is None:
+            raise KeyError(f"No document to update: {self.path}")
+        self._store.put(self._collection, self.id, {**current, **data})
+
+    def delete(self) -> None:
+        self._store.put(self._collection, self.id, None)
+
+
+class FakeQuery:
+    def __init__(self, store: FakeStore, collection: str, filters: Tuple = (), order: Tuple = (),
+                 limit: Optional[int] = None, fields: Optional[Tuple[str, ...]] = None,
+                 after: Optional[Dict[str, Any]] = None):
+        self._store = store
+        self.collection = collection
+        self._filters = filters
+        self._order = order
+        self._limit = limit
+        self._fields = fields
+        self._after = after
+
+    def _copy(self, **changes) -> "FakeQuery":
+        params = {
+            "filters": self._filters, "order": self._order, "limit": self._limit,
+            "fields": self._fields, "after": self._after, **changes,
+        }
+        return type(self)(self._store, self.collection, **params)
+
+    def where(self, field: str, op: str, value: Any) -> "FakeQuery":
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return self._copy(order=self._order + ((field, direction),))
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._copy(limit=count)
+
+    def select(self, field_paths: List[str]) -> "FakeQuery":
+        return self._copy(fields=tuple(field_paths))
+
+    def start_after(self, document_fields) -> "FakeQuery":
+        """Takes a snapshot or a {field: value} dict keyed by the order_by fields (DOCUMENT_ID for the id)."""
+        if isinstance(document_fields, FakeDocumentSnapshot):
+            document_fields = {**(document_fields.to_dict() or {}), DOCUMENT_ID: document_fields.id}
+        return self._copy(after=dict(document_fields))
+
+    def _is_after(self, doc_id: str, data: Dict[str, Any]) -> bool:
+        # Like Firestore, the document id is the implicit last ordering
+        order = list(self._order)
+        if all(field != DOCUMENT_ID for field, _ in order):
+            order.append((DOCUMENT_ID, "ASCENDING"))
+        for field, direction in order:
+            if field not in self._after:
+                break
+            value = doc_id if field == DOCUMENT_ID else data[field]
+            bound = self._after[field]
+            if value != bound:
+                return (value > bound) != (direction == "DESCENDING")
+        return False
+
+    def matches(self, data: Optional[Dict[str, Any]]) -> bool:
+        return data is not None and all(_matches(data, f, op, v) for f, op, v in self._filters)
+
+    def _reference(self, doc_id: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self._store, self.collection, doc_id)
+
+    def _run(self) -> List[FakeDocumentSnapshot]:
+        with self._store.lock:
+            col = self._store.collections.get(self.collection, {})
+            equality = next(((f, v) for f, op, v in self._filters if op == "=="), None)
+            if equality is not None:
+                ids = self._store.candidates(self.collection, *equality)
+            else:
+                ids = list(col)
+            docs = [(doc_id, copy.deepcopy(col[doc_id])) for doc_id in ids if self.matches(col[doc_id])]
+        docs.sort(key=lambda d: d[0])
+        for field, direction in reversed(self._order):
+            if field == DOCUMENT_ID:
+                continue
+            docs = [d for d in docs if field in d[1]]
+            docs.sort(key=lambda d: d[1][field], reverse=direction == "DESCENDING")
+        if self._after is not None:
+            docs = [d for d in docs if self._is_after(*d)]
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        # Billed like Firestore: per document returned, at least one per query
+        with self._store.lock:
+            self._store.reads += max(len(docs), 1)
+        if self._fields is not None:
+            docs = [(doc_id, {f: data[f] for f in self._fields if f in data}) for doc_id, data in docs]
+        return [FakeDocumentSnapshot(self._reference(doc_id), data) for doc_id, data in docs]
+
+    def stream(self, *args, **kwargs):
+        return iter(self._run())
+
+    def get(self, *args, **kwargs) -> List[FakeDocumentSnapshot]:
+        return self._run()
+
+    def on_snapshot(self, callback: Callable) -> "FakeWatch":
+        watch = FakeWatch(self, callback)
+        with self._store.lock:
+            self._store.watches.append(watch)
+            initial = self._run()
+        changes = [_change("ADDED", snapshot) for snapshot in initial]
+        # Like the real client, deliver the initial snapshot from a background thread
+        threading.Thread(
+            target=callback, args=(initial, changes, datetime.now(timezone.utc)), daemon=True
+        ).start()
+        return watch
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, store: FakeStore, collection: str, **kwargs):
+        super().__init__(store, collection, **kwargs)
+
+    def document(self, doc_id: Optional[str] = None) -> FakeDocumentReference:
+        return self._reference(doc_id or f"{random.getrandbits(64):016x}")
+
+
+def _change(kind: str, snapshot: FakeDocumentSnapshot) -> SimpleNamespace:
+    return SimpleNamespace(type=SimpleNamespace(name=kind), document=snapshot)
+
+
+class FakeWatch:
+    def __init__(self, query: FakeQuery, callback: Callable):
+        self.query = query
+        self._callback = callback
+
+    def notify(self, doc_id: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        was, now = self.query.matches(before), self.query.matches(after)
+        if not was and not now:
+            return
+        kind = "REMOVED" if not now else "MODIFIED" if was else "ADDED"
+        snapshot = FakeDocumentSnapshot(self.query._reference(doc_id), after if now else before)
+        self._callback([], [_change(kind, snapshot)], datetime.now(timezone.utc))
+
+    def unsubscribe(self) -> None:
+        with self.query._store.lock:
+            if self in self.query._store.watches:
+                self.query._store.watches.remove(self)
+
+
+class FakeWriteBatch:
+    def __init__(self):
+        self._ops: List[Callable[[], None]] = []
+
+    def set(self, reference: FakeDocumentReference, data: Dict[str, Any], merge: bool = False) -> None:
+        self._ops.append(lambda: FakeDocumentReference.set(reference, data, merge=merge))
+
+    def update(self, reference: FakeDocumentReference, data: Dict[str, Any]) -> None:
+        self._ops.append(lambda: FakeDocumentReference.update(reference, data))
+
+    def delete(self, reference: FakeDocumentReference) -> None:
+        self._ops.append(lambda: FakeDocumentReference.delete(reference))
+
+    def commit(self) -> None:
+        for op in self._ops:
+            op()
+        self._ops.clear()
+
+
+class FakeTransaction(FakeWriteBatch):
+    """
+    Works with `firestore.transactional`: holds the store lock from begin to
+    commit, so transactions are serialized instead of retried.
+    """
+
+    _max_attempts = 1
+    _read_only = False
+
+    def __init__(self, store: FakeStore):
+        super().__init__()
+        self._store = store
+        self._id = None
+
+    def _clean_up(self) -> None:
+        self._ops.clear()
+        self._id = None
+
+    def _begin(self, retry_id=None) -> None:
+        self._store.lock.acquire()
+        self._id = b"fake-transaction"
+
+    def _commit(self) -> None:
+        try:
+            FakeWriteBatch.commit(self)
+        finally:
+            self._id = None
+            self._store.lock.release()
+
+    def _rollback(self) -> None:
+        if self._id is not None:
+            self._clean_up()
+            self._store.lock.release()
+
+
+class FakeFirestore:
+    """Stand-in for `firestore.client()`."""
+
+    def __init__(self, store: FakeStore):
+        self.store = store
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self.store, name)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch()
+
+    def transaction(self, **kwargs) -> FakeTransaction:
+        return FakeTransaction(self.store)
+
+    def get_all(self, references: List[FakeDocumentReference], field_paths: Optional[List[str]] = None, **kwargs):
+        for reference in references:
+            data = self.store.get(reference._collection, reference.id)
+            yield FakeDocumentSnapshot(reference, _project(data, field_paths) if data is not None else None)
+
+    def close(self) -> None:
+        pass
+
+
+# ----------------------------
+# Async client
+# ----------------------------
+async def _pause(store: FakeStore) -> None:
+    """Simulates one network round trip to Firestore."""
+    await asyncio.sleep(store.latency)
+
+
+class FakeAsyncDocumentReference(FakeDocumentReference):
+    def collection(self, name: str) -> "FakeAsyncCollection":
+        return FakeAsyncCollection(self._store, f"{self.path}/{name}")
+
+    async def get(self, *args, **kwargs) -> FakeDocumentSnapshot:
+        await _pause(self._store)
+        return FakeDocumentReference.get(self)
+
+    async def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        await _pause(self._store)
+        FakeDocumentReference.set(self, data, merge=merge)
+
+    async def update(self, data: Dict[str, Any]) -> None:
+        await _pause(self._store)
+        FakeDocumentReference.update(self, data)
+
+    async def delete(self) -> None:
+        await _pause(self._store)
+        FakeDocumentReference.delete(self)
+
+
+class FakeAsyncQuery(FakeQuery):
+    def _reference(self, doc_id: str) -> FakeAsyncDocumentReference:
+        return FakeAsyncDocumentReference(self._store, self.collection, doc_id)
+
+    async def stream(self, *args, **kwargs):
+        await _pause(self._store)
+        for snapshot in self._run():
+            yield snapshot
+
+    async def get(self, *args, **kwargs) -> List[FakeDocumentSnapshot]:
+        await _pause(self._store)
+        return self._run()
+
+class FakeAsyncCollection(FakeAsyncQuery):
+    def document(self, doc_id: Optional[str] = None) -> FakeAsyncDocumentReference:
+        return self._reference(doc_id or f"{random.getrandbits(64):016x}")
+
+
+class FakeAsyncWriteBatch(FakeWriteBatch):
+    def __init__(self, store: FakeStore):
+        super().__init__()
+        self._store = store
+
+    async def commit(self) -> None:
+        await _pause(self._store)
+        FakeWriteBatch.commit(self)
+
+
+class FakeAsyncFirestore:
+    """Stand-in for `firestore_async.client()`; every call waits `store.latency` seconds."""
+
+    def __init__(self, store: FakeStore):
+        self.store = store
+
+    def collection(self, name: str) -> FakeAsyncCollection:
+        return FakeAsyncCollection(self.store, name)
+
+    def batch(self) -> FakeAsyncWriteBatch:
+        return FakeAsyncWriteBatch(self.store)
+
+    async def get_all(self, references: List[FakeDocumentReference], field_paths: Optional[List[str]] = None, **kwargs):
+        # One round trip for the whole batch, like BatchGetDocuments
+        await _pause(self.store)
+        for snapshot in FakeFirestore.get_all(self, references, field_paths):
+            yield snapshot
+
+    def close(self) -> None:
+        pass
+
+
+# ----------------------------
+# Gemini
+# ----------------------------
+class FakeGeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiStream:
+    def __init__(self, chunks: List[str], chunk_delay: float):
+        self._chunks = chunks
+        self._chunk_delay = chunk_delay
+        self.text = "".join(chunks)
+
+    async def __aiter__(self):
+        for i, chunk in enumerate(self._chunks):
+            if i and self._chunk_delay:
+                await asyncio.sleep(self._chunk_delay)
+            yield FakeGeminiResponse(chunk)
+
+
+class FakeGeminiModel:
+    """
+    Stand-in for `genai.GenerativeModel`.
+
+    A full reply takes `latency_ms`; in streaming mode the first chunk arrives
+    after `first_token_ms` and the rest are spread over the remaining time.
+    """
+
+    def __init__(self, latency_ms: float = 800.0, first_token_ms: float = 150.0, reply_words: int = 60, chunks: int = 8):
+        self.latency = latency_ms / 1000
+        self.first_token = min(first_token_ms / 1000, self.latency)
+        self.reply_words = reply_words
+        self.chunks = max(chunks, 1)
+        self.calls = 0
+
+    def _reply(self, prompt: str) -> List[str]:
+        rng = random.Random(prompt)
+        words = [rng.choice(_WORDS) for _ in range(self.reply_words)]
+        step = max(len(words) // self.chunks, 1)
+        return [" ".join(words[i:i + step]) + " " for i in range(0, len(words), step)]
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        self.calls += 1
+        time.sleep(self.latency)
+        return FakeGeminiResponse("".join(self._reply(prompt)))
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self.calls += 1
+        chunks = self._reply(prompt)
+        if not stream:
+            await asyncio.sleep(self.latency)
+            return FakeGeminiResponse("".join(chunks))
+        await asyncio.sleep(self.first_token)
+        delay = (self.latency - self.first_token) / max(len(chunks) - 1, 1)
+        return FakeGeminiStream(chunks, delay)
+
+
+_WORDS = (
+    "insulation", "solar", "rebate", "heat", "pump", "draught", "seal", "window", "LED",
+    "thermostat", "savings", "bill", "efficient", "shade", "battery", "upgrade", "audit",
+)
+
+
+# ----------------------------
+# Dataset
+# ----------------------------
+STATES = ["NSW", "VIC", "QLD", "SA", "WA", "TAS", "NT", "ACT"]
+# Capital city coordinates; contractors are scattered around them
+STATE_CENTRES = {
+    "NSW": (-33.87, 151.21), "VIC": (-37.81, 144.96), "QLD": (-27.47, 153.03), "SA": (-34.93, 138.60),
+    "WA": (-31.95, 115.86), "TAS": (-42.88, 147.33), "NT": (-12.46, 130.84), "ACT": (-35.28, 149.13),
+}
+SERVICES = ["solar", "battery", "hot_water", "insulation", "windows", "ev_charger",
+            "heating_cooling", "lighting", "energy_audit"]
+AUDIT_OPTIONS = {
+    "fridge_age": ["old", "medium", "new"],
+    "has_dryer": [True, False],
+    "has_dishwasher": [True, False],
+    "insulation": ["poor", "average", "good"],
+    "window_type": ["single", "double"],
+    "hvac_age": ["old", "medium", "new"],
+    "water_heater": ["electric_storage", "gas_storage", "heat_pump_wh"],
+    "has_solar": [True, False],
+}
+
+
+def build_dataset(users: int = 1000, rebates: int = 200, contractors: int = 500,
+                  audits_per_user: int = 2, seed: int = 7) -> Dict[str, List[Dict[str, Any]]]:
+    """Generates reproducible `users`, `audits`, `rebates` and `contractors` documents."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    data: Dict[str, List[Dict[str, Any]]] = {"users": [], "audits": [], "rebates": [], "contractors": []}
+
+    for i in range(users):
+        user_id = f"user_{i:06d}"
+        data["users"].append({
+            "id": user_id,
+            "email": f"{user_id}@example.com",
+            "location": rng.choice(STATES),
+            "home_size_sqft": rng.randrange(600, 4000, 50),
+            "family_size": rng.randint(1, 6),
+            "annual_income": float(rng.randrange(30000, 250000, 1000)),
+            "monthly_energy_bill": float(rng.randrange(80, 600, 5)),
+        })
+        for j in range(audits_per_user):
+            data["audits"].append({
+                "id": f"audit_{i:06d}_{j}",
+                "user_id": user_id,
+                "answers": {k: rng.choice(v) for k, v in AUDIT_OPTIONS.items()},
+                "timestamp": start + timedelta(days=30 * j, seconds=i),
+            })
+
+    for i in range(rebates):
+        location = "AUS" if rng.random() < 0.1 else rng.choice(STATES)
+        data["rebates"].append({
+            "id": f"rebate_{i:05d}",
+            "name": f"{location} {rng.choice(SERVICES).replace('_', ' ').title()} Rebate {i}",
+            "description": "Rebate for " + " and ".join(rng.sample(SERVICES, 2)).replace("_", " ") + " upgrades.",
+            "amount": rng.randrange(50, 5000, 10),
+            "location": location,
+            "income_max": rng.choice([75000, 120000, 180000, 210000, 250000, 300000]),
+        })
+
+    # Separate generator, so adding coordinates left the other fields unchanged
+    geo_rng = random.Random(seed + 1)
+    for i in range(contractors):
+        contractor = {
+            "id": f"contractor_{i:05d}",
+            "name": f"Contractor {i}",
+            "services": rng.sample(SERVICES, rng.randint(1, 4)),
+            "location": "AUS" if rng.random() < 0.05 else rng.choice(STATES),
+            "contact": f"contact{i}@example.com",
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+        }
+        centre = STATE_CENTRES.get(contractor["location"])
+        if centre is not None:
+            # Most work near the capital, some across the state
+            spread = 0.3 if geo_rng.random() < 0.7 else 2.0
+            contractor["lat"] = round(centre[0] + geo_rng.gauss(0, spread), 5)
+            contractor["lon"] = round(centre[1] + geo_rng.gauss(0, spread), 5)
+        data["contractors"].append(contractor)
+    return data
+
+
+def build_store(dataset: Dict[str, List[Dict[str, Any]]], latency_ms: float = 0.0) -> FakeStore:
+    store = FakeStore(latency_ms)
+    for collection, documents in dataset.items():
+        store.load(collection, documents)
+    return store
@@ -0,0 +1,293 @@
+# backend/benchmarks/run_endpoints.py
+"""
+Load-tests every router in-process against the fake Firestore and Gemini.
+
+    cd backend
+    python -m benchmarks.run_endpoints --users 5000 --concurrency 64 --requests 2000
+
+Requests go straight into the ASGI app (no sockets), so the numbers measure
+server-side cost: routing, validation, caches, indexes and serialization,
+plus whatever latency is configured for the fakes.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fakes import (  # noqa: E402
+    SERVICES,
+    STATE_CENTRES,
+    STATES,
+    FakeAsyncFirestore,
+    FakeFirestore,
+    FakeGeminiModel,
+    FakeStore,
+    build_dataset,
+    build_store,
+)
+from services.snapshot_file import read_snapshot  # noqa: E402
+
+CHAT_QUESTIONS = [
+    "How do I lower my bill?",
+    "Is solar worth it for me?",
+    "Should I replace my hot water system?",
+    "What rebates can I get?",
+    "How can I make my home warmer in winter?",
+]
+
+
+# ----------------------------
+# ASGI driver
+# ----------------------------
+async def asgi_request(app, method: str, path: str, body: Any = None,
+                       headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+    """Sends one HTTP request through the ASGI app and returns (status, body)."""
+    raw = json.dumps(body).encode() if body is not None else b""
+    path, _, query = path.partition("?")
+    header_list = [(b"host", b"bench"), (b"content-length", str(len(raw)).encode())]
+    if body is not None:
+        header_list.append((b"content-type", b"application/json"))
+    for name, value in (headers or {}).items():
+        header_list.append((name.lower().encode(), value.encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "", "headers": header_list,
+        "client": ("bench", 0), "server": ("bench", 80),
+    }
+    finished = asyncio.Event()
+    sent_body = False
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": raw, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    return status, b"".join(chunks)
+
+
+# ----------------------------
+# Environment
+# ----------------------------
+def build_fakes(args) -> Tuple[Dict[str, List[Dict[str, Any]]], FakeStore, FakeGeminiModel]:
+    """The dataset, the fake Firestore store holding it and the fake Gemini model."""
+    dataset = build_dataset(args.users, args.rebates, args.contractors, seed=args.seed)
+    if args.snapshot:
+        for name, documents in read_snapshot(str(args.snapshot)).items():
+            dataset[name] = [{"id": doc_id, **data} for doc_id, data in documents]
+    store = build_store(dataset, latency_ms=args.firestore_latency_ms)
+    model = FakeGeminiModel(args.gemini_latency_ms, args.gemini_first_token_ms)
+    return dataset, store, model
+
+
+def patch_dependencies(store: FakeStore, model: FakeGeminiModel, snapshot: Optional[Path] = None) -> Callable[[], None]:
+    """
+    Points every dependency of the app at the fakes. Returns a callable that
+    puts the real ones back, so the patches do not outlive their user.
+    """
+    undo: List[Callable[[], None]] = []
+
+    def patch(target: Any, name: str, value: Any) -> None:
+        original = getattr(target, name)
+        setattr(target, name, value)
+        undo.append(lambda: setattr(target, name, original))
+
+    import firebase_admin.firestore
+    patch(firebase_admin.firestore, "client", lambda app=None: FakeFirestore(store))
+
+    import main
+    from routes import auth, chat
+    from services import firestore_data
+    from services.rate_limit import InMemoryRateLimiter
+    from services.registry import registry
+
+    if snapshot:
+        # Boot the indexes from the file, as a server with SNAPSHOT_PATH would
+        patch(main, "SNAPSHOT_PATH", str(snapshot))
+    undo.append(registry.override("firebase", object()))
+    undo.append(registry.override("gemini", model))
+    patch(firestore_data, "_client", FakeAsyncFirestore(store))
+    patch(chat, "rate_limiter", InMemoryRateLimiter(10 ** 9, 60))
+    patch(auth.auth, "verify_id_token", lambda token, check_revoked=False, app=None: {
+        "uid": token, "email": f"{token}@example.com", "exp": time.time() + 3600,
+        # Tokens named "admin..." carry the admin custom claim
+        "admin": token.startswith("admin"),
+    })
+
+    def restore() -> None:
+        while undo:
+            undo.pop()()
+
+    return restore
+
+
+def install_fakes(args) -> Tuple[Any, Dict[str, List[Dict[str, Any]]], FakeGeminiModel, Callable[[], None]]:
+    """
+    Builds the dataset, points every dependency at the fakes and returns the
+    app, the dataset, the fake model and the callable that undoes the patches.
+    """
+    dataset, store, model = build_fakes(args)
+    restore = patch_dependencies(store, model, args.snapshot)
+    import main
+    return main.app, dataset, model, restore
+
+
+def build_scenarios(dataset: Dict[str, List[Dict[str, Any]]], unique_chat: bool) -> Dict[str, Callable[[random.Random], Tuple]]:
+    user_ids = [u["id"] for u in dataset["users"]]
+
+    def chat_message(rng: random.Random) -> str:
+        if unique_chat:
+            return f"{rng.choice(CHAT_QUESTIONS)} ({rng.getrandbits(32)})"
+        return rng.choice(CHAT_QUESTIONS)
+
+    return {
+        "GET /": lambda rng: ("GET", "/", None, None),
+        "POST /auth/me": lambda rng: ("POST", "/auth/me", None, {"Authorization": f"Bearer {rng.choice(user_ids)}"}),
+        "GET /users/{id}": lambda rng: ("GET", f"/users/{rng.choice(user_ids)}", None, None),
+        "POST /rebates/": lambda rng: ("POST", "/rebates/", {
+            "location": rng.choice(STATES), "income": float(rng.randrange(30000, 250000, 1000)),
+        }, None),
+        "GET /rebates/search": lambda rng: (
+            "GET", f"/rebates/search?q={rng.choice(SERVICES).split('_')[0]}&location={rng.choice(STATES)}", None, None,
+        ),
+        "POST /contractors/": lambda rng: ("POST", "/contractors/", {
+            "location": rng.choice(STATES), "services": rng.sample(SERVICES, 2), "limit": 20,
+        }, None),
+        "POST /contractors/ (nearby)": lambda rng: ("POST", "/contractors/", {
+            **dict(zip(("lat", "lon"), STATE_CENTRES[rng.choice(STATES)])),
+            "services": rng.sample(SERVICES, 2), "nearest": 20,
+        }, None),
+        "POST /carbon/calculate": lambda rng: ("POST", "/carbon/calculate", {"user_id": rng.choice(user_ids)}, None),
+        "POST /carbon/calculate-batch": lambda rng: ("POST", "/carbon/calculate-batch", {
+            "user_ids": rng.sample(user_ids, min(100, len(user_ids))),
+        }, None),
+        "POST /chat/": lambda rng: ("POST", "/chat/", {
+            "user_id": rng.choice(user_ids), "message": chat_message(rng),
+        }, None),
+    }
+
+
+# ----------------------------
+# Load generation
+# ----------------------------
+async def run_scenario(app, make_request: Callable, requests: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = requests
+
+    async def worker(worker_id: int):
+        nonlocal remaining
+        rng = random.Random(seed * 1000 + worker_id)
+        while remaining > 0:
+            remaining -= 1
+            method, path, body, headers = make_request(rng)
+            started = time.perf_counter()
+            status, _ = await asgi_request(app, method, path, body, headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "statuses": statuses,
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    app, dataset, model, restore = install_fakes(args)
+    scenarios = build_scenarios(dataset, args.unique_chat)
+    selected = {name: fn for name, fn in scenarios.items() if not args.routes or any(r in name for r in args.routes)}
+
+    await app.router.startup()
+    try:
+        # Warm up caches, indexes and lazy imports before measuring
+        for make_request in selected.values():
+            await run_scenario(app, make_request, min(args.warmup, args.requests), 1, args.seed)
+        results = {}
+        for name, make_request in selected.items():
+            requests = max(args.requests // 10, 1) if name == "POST /carbon/calculate-batch" else args.requests
+            results[name] = await run_scenario(app, make_request, requests, args.concurrency, args.seed)
+    finally:
+        await app.router.shutdown()
+        restore()
+
+    return {
+        "dataset": {k: len(v) for k, v in dataset.items()},
+        "concurrency": args.concurrency,
+        "firestore_latency_ms": args.firestore_latency_ms,
+        "gemini_latency_ms": args.gemini_latency_ms,
+        "gemini_calls": model.calls,
+        "routes": results,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"dataset: {report['dataset']}  concurrency: {report['concurrency']}  "
+          f"firestore latency: {report['firestore_latency_ms']}ms  gemini latency: {report['gemini_latency_ms']}ms")
+    print(f"{'route':<30}{'requests':>10}{'req/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for name, r in report["routes"].items():
+        print(f"{name:<30}{r['requests']:>10}{r['rps']:>12}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}  {r['statuses']}")
+    print(f"gemini calls: {report['gemini_calls']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Veridian API against in-memory fakes.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rebates", type=int, default=200)
+    parser.add_argument("--contractors", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=50, help="Sequential warm-up requests per route")
+    parser.add_argument("--firestore-latency-ms", type=float, default=5.0)
+    parser.add_argument("--gemini-latency-ms", type=float, default=800.0)
+    parser.add_argument("--gemini-first-token-ms", type=float, default=150.0)
+    parser.add_argument("--unique-chat", action="store_true", help="Make every chat message unique (no reply cache hits)")
+    parser.add_argument("--routes", nargs="*", help="Only run routes whose name contains one of these strings")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--snapshot", type=Path, help="Use the collections in this snapshot file (see scripts/snapshot.py) instead of generated ones")
+    parser.add_argument("--json", type=Path, help="Also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# backend/benchmarks/serialization.py
+"""
+Micro-benchmark for encoding list responses.
+
+    cd backend
+    python -m benchmarks.serialization --sizes 1000 5000 10000
+
+Compares, per payload size, the time to turn a page of rebates or contractors
+into response bytes:
+
+  - jsonable_encoder: what FastAPI does for a returned dict without a
+    response model (the previous behaviour), on documents as Firestore
+    returns them;
+  - response_model: FastAPI's path when a response model is declared
+    (validate, then serialize through pydantic);
+  - model_orjson: what the list routes do, i.e. the response model's
+    validation and filtering on documents made plain at load time, encoded
+    by FastJSONResponse (their response_class);
+  - orjson: FastJSONResponse alone, with no response model.
+
+The one-off `to_plain` cost per document is reported separately.
+"""
+import argparse
+import datetime
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse
+
+from benchmarks.fakes import build_dataset
+from routes.contractors import ContractorPage
+from routes.rebates import RebatePage
+from services.serialization import FastJSONResponse, to_plain
+
+
+def _firestore_documents(documents: List[Dict[str, Any]], size: int) -> List[Dict[str, Any]]:
+    """`size` documents with a Firestore timestamp, as the client library returns them."""
+    updated = DatetimeWithNanoseconds(2025, 3, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+    return [{**documents[i % len(documents)], "id": f"doc_{i:06d}", "updated_at": updated} for i in range(size)]
+
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(args) -> List[Dict[str, Any]]:
+    dataset = build_dataset(users=1, rebates=1000, contractors=1000, seed=args.seed)
+    payloads = {
+        "rebates": (dataset["rebates"], RebatePage, lambda docs: {"rebates": docs, "next_cursor": None}),
+        "contractors": (dataset["contractors"], ContractorPage, lambda docs: {
+            "count": len(docs), "total": len(docs), "contractors": docs, "next_cursor": None,
+        }),
+    }
+    starlette_json = JSONResponse(None)
+    fast_json = FastJSONResponse(None)
+
+    results = []
+    for name, (documents, model, page) in payloads.items():
+        adapter = TypeAdapter(model)
+        for size in args.sizes:
+            raw = _firestore_documents(documents, size)
+            load_seconds = _best_of(lambda: [to_plain(doc) for doc in raw], args.repeat)
+            plain_page = page([to_plain(doc) for doc in raw])
+            raw_page = page(raw)
+
+            timings = {
+                "jsonable_encoder": _best_of(lambda: starlette_json.render(jsonable_encoder(raw_page)), args.repeat),
+                "response_model": _best_of(
+                    lambda: starlette_json.render(adapter.dump_python(adapter.validate_python(raw_page), mode="json")),
+                    args.repeat,
+                ),
+                "model_orjson": _best_of(
+                    lambda: fast_json.render(adapter.dump_python(adapter.validate_python(plain_page), mode="json")),
+                    args.repeat,
+                ),
+                "orjson": _best_of(lambda: fast_json.render(plain_page), args.repeat),
+            }
+            results.append({
+                "payload": name,
+                "size": size,
+                "bytes": len(fast_json.render(plain_page)),
+                "to_plain_ms": load_seconds * 1000,
+                **{f"{k}_ms": v * 1000 for k, v in timings.items()},
+                "speedup": timings["jsonable_encoder"] / timings["model_orjson"],
+            })
+    return results
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    header = (f"{'payload':<12} {'size':>6} {'bytes':>10} {'jsonable_encoder':>17} {'response_model':>15}"
+              f" {'model_orjson':>13} {'orjson':>8} {'speedup':>8} {'to_plain (once)':>16}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['payload']:<12} {r['size']:>6} {r['bytes']:>10,} {r['jsonable_encoder_ms']:>14.2f} ms"
+            f" {r['response_model_ms']:>12.2f} ms {r['model_orjson_ms']:>10.2f} ms {r['orjson_ms']:>5.2f} ms {r['speedup']:>7.1f}x"
+            f" {r['to_plain_ms']:>13.2f} ms"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding of list responses.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000], help="Items per payload")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (the best is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    results = run(args)
+    print_report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
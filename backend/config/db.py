@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 from pathlib import Path
 import os
 import json # <-- Import the JSON library
+import threading
 
 # This block robustly finds your .env file for local development
 config_dir = Path(__file__).resolve().parent
@@ -12,25 +13,43 @@ backend_dir = config_dir.parent
 dotenv_path = backend_dir / '.env'
 load_dotenv(dotenv_path=dotenv_path)
 
-# Load the credentials from the environment
-cred_path_or_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-if not cred_path_or_json:
-    raise ValueError("GOOGLE_APPLICATION_CREDENTIALS environment variable not set.")
+# Nothing below runs at import time: credentials are parsed and the app is
+# initialized on the first call to get_app() (normally during startup warm-up).
+_init_lock = threading.Lock()
 
-# --- This is the new, smarter block for handling credentials ---
-try:
-    # First, try to treat the variable as JSON content
-    cred_json = json.loads(cred_path_or_json)
-    cred = credentials.Certificate(cred_json)
-except json.JSONDecodeError:
-    # If that fails, it must be a file path
-    cred = credentials.Certificate(cred_path_or_json)
 
+def _load_credentials():
+    # Load the credentials from the environment
+    cred_path_or_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+    if not cred_path_or_json:
+        raise ValueError("GOOGLE_APPLICATION_CREDENTIALS environment variable not set.")
 
-# --- This block initializes Firebase ONCE, preventing crashes ---
-try:
-    firebase_admin.get_app()
-except ValueError:
-    firebase_admin.initialize_app(cred)
+    # --- This is the new, smarter block for handling credentials ---
+    try:
+        # First, try to treat the variable as JSON content
+        cred_json = json.loads(cred_path_or_json)
+        return credentials.Certificate(cred_json)
+    except json.JSONDecodeError:
+        # If that fails, it must be a file path
+        return credentials.Certificate(cred_path_or_json)
 
-db = firestore.client()
\ No newline at end of file
+
+def get_app() -> firebase_admin.App:
+    """The default Firebase app, initialized ONCE (thread-safe)."""
+    with _init_lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            return firebase_admin.initialize_app(_load_credentials())
+
+
+def get_db():
+    """The synchronous Firestore client, initializing Firebase if needed."""
+    return firestore.client(get_app())
+
+
+def __getattr__(name):
+    # Keeps `from config.db import db` working without an import-time side effect
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,33 @@
 # backend/main.py
+import time
+_import_started = time.perf_counter()
+
+import asyncio
 import logging
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load .env before the routers read their configuration from the environment
+load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from firebase_admin import firestore
 from routes import auth, users, rebates, carbon, contractors, chat
+from services import firestore_data
+from services.audits import latest_audits
+from services.carbon_history import carbon_history
+from services.chat_context import chat_context
+from services.contractor_index import contractor_index
+from services.metrics import REGISTRY, MetricsMiddleware
+from services.rebate_index import rebate_index
+from services.registry import registry
+from services.resilience import DependencyUnavailable, retry_after_header
+from services.serialization import FastJSONResponse
+from services.snapshot_file import SNAPSHOT_PATH, preload_indexes
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
 # ----------------------------
 # Logging Configuration
@@ -12,6 +37,7 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 )
 logger = logging.getLogger("veridian")
+logger.info(f"Imported the app in {IMPORT_SECONDS * 1000:.0f}ms.")
 
 # ----------------------------
 # App Initialization
@@ -19,14 +45,77 @@ logger = logging.getLogger("veridian")
 app = FastAPI(
     title="Veridian API",
     version="1.0.0",
-    description="API for rebates, contractors, carbon tracking, and user management."
+    description="API for rebates, contractors, carbon tracking, and user management.",
+    default_response_class=FastJSONResponse,
 )
-# --- ADD THIS STARTUP EVENT ---
+# Started in the background so the process answers health checks immediately
+_warm_up_task = None
+# Set when warm-up raised; /ready then reports the process as unhealthy
+_warm_up_error = None
+
+def _start_listeners():
+    """Creates the sync Firestore client and attaches the index listeners (blocking)."""
+    # Snapshot listeners run on their own threads, so they use the sync client.
+    db = firestore.client(registry.get("firebase"))
+    # Keep the in-memory rebate and contractor indexes in sync with Firestore.
+    rebate_index.start(db)
+    contractor_index.start(db)
+    carbon_history.start(db)
+    return db
+
+async def _warm_up():
+    """Creates Firebase, Gemini and Redis clients in parallel, then loads the indexes."""
+    started = time.perf_counter()
+    await asyncio.gather(registry.warm_up(), chat.init_redis())
+    if not registry.ready:
+        logger.error("Required services failed to initialize; routes will retry on demand.")
+        return
+    # One shared async Firestore client for every router
+    await firestore_data.init()
+    db = await asyncio.to_thread(_start_listeners)
+    # Drop cached latest audits and chat context as soon as a user saves a new
+    # one, and append each new audit to the user's materialized carbon history.
+    # Started from the loop, which receives the listener's invalidations.
+    latest_audits.subscribe(carbon_history.submit)
+    latest_audits.subscribe(chat_context.on_new_audit)
+    latest_audits.start_listener(db)
+    logger.info(f"Services warmed up in {(time.perf_counter() - started) * 1000:.0f}ms.")
+
+def _warm_up_done(task: asyncio.Task) -> None:
+    """Logs a failed warm-up and marks the process not ready."""
+    global _warm_up_error
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        _warm_up_error = f"{type(error).__name__}: {error}"
+        logger.error("Service warm-up failed; /ready reports not ready.", exc_info=error)
+
 @app.on_event("startup")
 async def startup_event():
-    """Initializes services on application startup."""
-    # This will connect to Redis if the REDIS_URL is set in your environment
-    await chat.init_redis()
+    """
+    Schedules service warm-up; GET /ready reports when it has finished. With
+    SNAPSHOT_PATH set, the indexes first load from that snapshot file, so
+    reads are served from them before Firestore has caught up.
+    """
+    global _warm_up_task, _warm_up_error
+    if SNAPSHOT_PATH:
+        preload_indexes(SNAPSHOT_PATH, [rebate_index, contractor_index])
+    _warm_up_error = None
+    _warm_up_task = asyncio.create_task(_warm_up())
+    _warm_up_task.add_done_callback(_warm_up_done)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detaches Firestore listeners and closes connections on shutdown."""
+    if _warm_up_task is not None and not _warm_up_task.done():
+        _warm_up_task.cancel()
+    rebate_index.stop()
+    contractor_index.stop()
+    latest_audits.stop_listener()
+    carbon_history.stop()
+    firestore_data.close()
+    await chat.close_redis()
 
 # ----------------------------
 # Middleware
@@ -37,7 +126,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets browser clients read the ETag and send it back in If-None-Match
+    expose_headers=["ETag"],
 )
+# Per-route latency, status codes and in-flight requests, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
 
 # ----------------------------
 # Routers
@@ -49,6 +142,19 @@ app.include_router(carbon.router, prefix="/carbon", tags=["Carbon"])
 app.include_router(contractors.router, prefix="/contractors", tags=["Contractors"])
 app.include_router(chat.router, prefix="/chat", tags=["Chat"]) 
 
+# ----------------------------
+# Errors
+# ----------------------------
+@app.exception_handler(DependencyUnavailable)
+async def dependency_unavailable(request, e: DependencyUnavailable):
+    """A dependency that is still starting up (or refusing calls) is a 503, not a 500."""
+    logger.warning(f"{request.url.path}: {e}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "A backing service is temporarily unavailable. Please try again shortly."},
+        headers=retry_after_header(e),
+    )
+
 # ----------------------------
 # Root Endpoint
 # ----------------------------
@@ -59,3 +165,31 @@ async def root():
     """
     logger.info("Health check requested.")
     return {"message": "Veridian API is running"}
+
+@app.get("/ready", tags=["Health"])
+async def ready():
+    """
+    Readiness check: 200 once Firebase is initialized and the rebate and
+    contractor indexes have loaded, 503 before that or if warm-up failed.
+    GET / only says the process is up.
+    """
+    indexes = {"rebates": rebate_index.ready, "contractors": contractor_index.ready}
+    is_ready = registry.ready and all(indexes.values()) and _warm_up_error is None
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={
+            "ready": is_ready,
+            "import_ms": round(IMPORT_SECONDS * 1000, 1),
+            "services": registry.status(),
+            "indexes": indexes,
+            "warm_up_error": _warm_up_error,
+        },
+    )
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics: per-route HTTP latency and status counts, dependency
+    (Firestore, Firebase Auth, Gemini, rate limiter) call latency, and cache counters.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
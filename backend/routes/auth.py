@@ -1,17 +1,56 @@
 # backend/routes/auth.py
+import hashlib
+import os
+import time
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from firebase_admin import auth
+from services.cache import SingleFlight, TTLCache
+from services.metrics import register_cache, track_dependency
+from services.registry import registry
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token") # This is used by FastAPI's docs
 
+# Token cache configuration
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+# Opt-in: ask Firebase whether the token was revoked, and re-ask at least this often
+AUTH_CHECK_REVOKED = os.getenv("AUTH_CHECK_REVOKED", "false").lower() in ("1", "true", "yes")
+AUTH_REVOCATION_RECHECK_SECONDS = float(os.getenv("AUTH_REVOCATION_RECHECK_SECONDS", 300))
+
+# Decoded tokens keyed by SHA-256 of the raw token; each entry expires at the token's `exp`
+_token_cache = TTLCache(AUTH_CACHE_SIZE, ttl=0)
+_verify_flight = SingleFlight()
+register_cache("auth_tokens", _token_cache.stats)
+
+def _cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def _verify_and_cache(token: str, key: str) -> dict:
+    """Verifies the signature off the event loop and caches the decoded token until it expires."""
+    def verify():
+        # Creating the Firebase app on first use parses credentials, so it also stays off the loop
+        return auth.verify_id_token(token, check_revoked=AUTH_CHECK_REVOKED, app=registry.get("firebase"))
+
+    with track_dependency("firebase_auth", "verify_id_token"):
+        decoded_token = await run_in_threadpool(verify)
+    ttl = decoded_token.get("exp", 0) - time.time()
+    if AUTH_CHECK_REVOKED:
+        ttl = min(ttl, AUTH_REVOCATION_RECHECK_SECONDS)
+    if ttl > 0:
+        _token_cache.set(key, decoded_token, ttl=ttl)
+    return decoded_token
+
 # Dependency to verify the Firebase token
 async def verify_firebase_token(token: str = Depends(oauth2_scheme)):
     try:
         # The Authorization header from Flutter will be "Bearer <token>"
         # The oauth2_scheme dependency automatically extracts the <token> part for you.
-        decoded_token = auth.verify_id_token(token)
+        key = _cache_key(token)
+        decoded_token = _token_cache.get(key)
+        if decoded_token is None:
+            decoded_token = await _verify_flight.do(key, lambda: _verify_and_cache(token, key))
         return decoded_token
     except Exception as e:
         raise HTTPException(
@@ -20,6 +59,18 @@ async def verify_firebase_token(token: str = Depends(oauth2_scheme)):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+# Custom claims (set with the Admin SDK) that mark staff and backend service accounts
+PRIVILEGED_CLAIMS = tuple(c.strip() for c in os.getenv("AUTH_PRIVILEGED_CLAIMS", "admin,service").split(",") if c.strip())
+
+# Dependency for endpoints that read other users' data
+async def verify_privileged_token(decoded_token: dict = Depends(verify_firebase_token)):
+    if not any(decoded_token.get(claim) is True for claim in PRIVILEGED_CLAIMS):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This endpoint requires an admin or service account.",
+        )
+    return decoded_token
+
 # --- THIS IS THE CORRECTED LINE ---
 # Change @router.get("/me") to @router.post("/me")
 @router.post("/me")
@@ -1,108 +1,254 @@
 # backend/routes/carbon.py
-from fastapi import APIRouter, HTTPException
-from firebase_admin import firestore
-from pydantic import BaseModel
-from typing import Optional
-
-# --- 1. TYPED MODEL FOR AUDIT ANSWERS ---
-# This validates the data we get from Firestore, preventing errors.
-class AuditAnswers(BaseModel):
-    fridge_age: Optional[str] = None
-    has_dryer: Optional[bool] = False
-    has_dishwasher: Optional[bool] = False
-    insulation: Optional[str] = None
-    window_type: Optional[str] = None
-    hvac_age: Optional[str] = None
-    water_heater: Optional[str] = None
-    has_solar: Optional[bool] = False
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Dict, List, Optional
+
+# The audit model, emission factors and calculations live in services/carbon_model.py
+from services.carbon_model import (
+    AuditAnswers,
+    EMISSION_FACTORS,
+    Emissions,
+    calculate_emissions,
+    calculate_emissions_batch,
+)
+from services import firestore_data
+from services.audits import get_latest_answers_many, latest_audits
+from services.carbon_history import carbon_history
+from services.rebate_index import location_code, rebate_index
+from services.resilience import DependencyUnavailable
+from services.scenarios import match_rebates, scenario_simulator
+from services.serialization import FastJSONResponse
+
+MAX_BATCH_SIZE = 5000
 
 # This Pydantic model defines the expected input for the API endpoint
 class CarbonInput(BaseModel):
     user_id: str
 
-# This remains our central source of truth for emission data
-EMISSION_FACTORS = {
-    "appliances": {
-        "fridge_age": {"old": 450, "medium": 250, "new": 100},
-        "has_dryer": {True: 400, False: 0},
-        "has_dishwasher": {True: 150, False: 0},
-    },
-    "heating_cooling": {
-        "insulation": {"poor": 1000, "average": 500, "good": 100},
-        "hvac_age": {"old": 600, "medium": 300, "new": 100},
-    },
-    "water_heater": {
-        "water_heater": {"electric_storage": 600, "gas_storage": 300, "heat_pump_wh": 150},
-    },
-    "windows": {
-        "window_type": {"single": 350, "double": 100},
-    },
-    "solar": {
-        "has_solar": {True: -2000, False: 0},
-    }
-}
+class CarbonBatchInput(BaseModel):
+    user_ids: List[str] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+    audits: List[AuditAnswers] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
 
-router = APIRouter()
+    @model_validator(mode="after")
+    def not_empty(self):
+        if not self.user_ids and not self.audits:
+            raise ValueError("Provide at least one of user_ids or audits.")
+        return self
+
+# Response models
+class EmissionsResult(BaseModel):
+    emissions: Emissions
+
+class AuditEmissions(BaseModel):
+    index: int
+    emissions: Emissions
+
+class UserEmissions(BaseModel):
+    user_id: str
+    emissions: Emissions
+
+class BatchEmissionsResult(BaseModel):
+    audits: List[AuditEmissions]
+    users: List[UserEmissions]
+    missing: List[str]
+
+class ScenarioRebate(BaseModel):
+    id: str
+    name: Optional[str] = None
+    amount: float
+
+class Scenario(BaseModel):
+    upgrades: Dict[str, Any] = Field(..., description="Answer changes, e.g. {\"has_solar\": true}")
+    labels: List[str]
+    emissions: Emissions
+    saved: float = Field(..., description="Emissions saved against the baseline")
+    rebates: Optional[List[ScenarioRebate]] = Field(None, description="With include_rebates only")
+    rebate_total: Optional[float] = Field(None, description="With include_rebates only")
+
+class ScenarioResult(BaseModel):
+    baseline: Emissions
+    count: int
+    scenarios: List[Scenario]
+
+class HistoryPoint(BaseModel):
+    audit_id: str
+    timestamp: datetime
+    total: float
+
+class LatestHistoryPoint(BaseModel):
+    audit_id: str
+    timestamp: datetime
+    emissions: Emissions
 
-# --- 2. PURE CALCULATION FUNCTION ---
-# This logic is now completely separate from Firestore and the API.
-# It's easy to test and maintain.
-def calculate_emissions(answers: AuditAnswers) -> dict:
-    """Calculates carbon emissions based on a validated AuditAnswers object."""
-    emissions = {
-        "appliances": 0.0, "heating_cooling": 0.0,
-        "water_heater": 0.0, "windows": 0.0, "solar": 0.0
-    }
-
-    # Use the model's properties directly for type-safe access
-    emissions["appliances"] += EMISSION_FACTORS["appliances"]["fridge_age"].get(answers.fridge_age, 100)
-    emissions["appliances"] += EMISSION_FACTORS["appliances"]["has_dryer"].get(answers.has_dryer, 0)
-    emissions["appliances"] += EMISSION_FACTORS["appliances"]["has_dishwasher"].get(answers.has_dishwasher, 0)
-    
-    emissions["heating_cooling"] += EMISSION_FACTORS["heating_cooling"]["insulation"].get(answers.insulation, 100)
-    emissions["heating_cooling"] += EMISSION_FACTORS["heating_cooling"]["hvac_age"].get(answers.hvac_age, 100)
-
-    emissions["water_heater"] += EMISSION_FACTORS["water_heater"]["water_heater"].get(answers.water_heater, 150)
-    
-    emissions["windows"] += EMISSION_FACTORS["windows"]["window_type"].get(answers.window_type, 100)
-    
-    emissions["solar"] += EMISSION_FACTORS["solar"]["has_solar"].get(answers.has_solar, 0)
-
-    emissions["total"] = sum(emissions.values())
-    return emissions
+class CarbonHistoryEntry(BaseModel):
+    audit_id: str
+    timestamp: datetime
+    emissions: Emissions
+
+class CarbonHistoryResult(BaseModel):
+    user_id: str
+    count: int
+    first: HistoryPoint
+    latest: LatestHistoryPoint
+    min: HistoryPoint
+    recent: List[HistoryPoint]
+    rolling_average: float
+    average: float
+    delta_since_first: float
+    updated_at: Optional[datetime] = None
+    entries: Optional[List[CarbonHistoryEntry]] = Field(None, description="When `entries` is requested, newest first")
+
+class ScenarioInput(BaseModel):
+    user_id: Optional[str] = None
+    answers: Optional[AuditAnswers] = Field(None, description="Answers to simulate from (default: the user's latest audit)")
+    include_rebates: bool = Field(False, description="Attach eligible rebates matching each scenario's upgrades")
+    location: Optional[str] = Field(None, description="Rebate location (default: the user's profile)")
+    income: Optional[float] = Field(None, description="Household income for rebate eligibility (default: the user's profile)")
+    limit: Optional[int] = Field(None, ge=1, description="Return only the top scenarios")
+
+    @model_validator(mode="after")
+    def has_source(self):
+        if self.answers is None and not self.user_id:
+            raise ValueError("Provide user_id or answers.")
+        return self
+
+router = APIRouter()
 
 
 # --- 3. CLEANER, MORE ROBUST API ENDPOINT ---
-@router.post("/calculate")
+@router.post("/calculate", response_model=EmissionsResult, response_class=FastJSONResponse)
 async def get_carbon_footprint(input_data: CarbonInput):
     """
     API endpoint to fetch an audit, validate its answers, and calculate the
     carbon footprint using the separated business logic.
     """
     try:
-        db = firestore.client()
-        docs_query = db.collection("audits") \
-            .where("user_id", "==", input_data.user_id) \
-            .order_by("timestamp", direction=firestore.Query.DESCENDING) \
-            .limit(1)
-        
-        docs = list(docs_query.stream())
-        if not docs:
+        # Get the raw answers dictionary (cached, shared with the chat route)
+        raw_answers = await latest_audits.get_answers(input_data.user_id)
+        if raw_answers is None:
             raise HTTPException(status_code=404, detail="No audit found for this user.")
 
-        # Get the raw answers dictionary from Firestore
-        raw_answers = docs[0].to_dict().get("answers", {})
-        
         # Validate and parse the raw data into our Pydantic model
         validated_answers = AuditAnswers(**raw_answers)
-        
+
         # Call the pure function with the validated data
         emissions = calculate_emissions(validated_answers)
-        
+
         return {"emissions": emissions}
-    
-    except HTTPException:
-        raise  # Re-raise known HTTP exceptions (like the 404)
+
+    except (HTTPException, DependencyUnavailable):
+        raise  # Re-raise known HTTP exceptions (like the 404) and 503s
     except Exception as e:
         # Catch any other unexpected errors and return a generic 500
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+
+@router.post("/calculate-batch", response_model=BatchEmissionsResult, response_class=FastJSONResponse)
+async def get_carbon_footprint_batch(input_data: CarbonBatchInput):
+    """
+    Calculates footprints for many households in one vectorized pass.
+    Accepts raw audit answers, user ids (scored from each user's latest audit), or both.
+    Users without an audit are listed under "missing".
+    """
+    try:
+        latest = {}
+        if input_data.user_ids:
+            latest = await get_latest_answers_many(input_data.user_ids)
+
+        found_ids = [uid for uid in latest if latest[uid] is not None]
+        answers = list(input_data.audits) + [AuditAnswers(**latest[uid]) for uid in found_ids]
+        emissions = calculate_emissions_batch(answers)
+
+        n_audits = len(input_data.audits)
+        return {
+            "audits": [
+                {"index": i, "emissions": e} for i, e in enumerate(emissions[:n_audits])
+            ],
+            "users": [
+                {"user_id": uid, "emissions": e} for uid, e in zip(found_ids, emissions[n_audits:])
+            ],
+            "missing": [uid for uid in latest if latest[uid] is None],
+        }
+
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+
+async def _eligible_rebates(input_data: ScenarioInput) -> list:
+    location, income = input_data.location, input_data.income
+    if (location is None or income is None) and input_data.user_id:
+        profile = await firestore_data.get_user(input_data.user_id) or {}
+        location = location if location is not None else profile.get("location")
+        income = income if income is not None else profile.get("annual_income")
+    if not location or not isinstance(income, (int, float)):
+        raise HTTPException(status_code=422, detail="Rebates need a location and income (from the request or the user's profile).")
+
+    location = location_code(location)
+    if rebate_index.ready:
+        return rebate_index.query(location, float(income))
+    return await firestore_data.query_rebates(location, float(income))
+
+
+@router.post("/scenarios", response_model=ScenarioResult, response_model_exclude_unset=True,
+             response_class=FastJSONResponse)
+async def get_upgrade_scenarios(input_data: ScenarioInput):
+    """
+    What-if simulator: every combination of upgrades reachable from the user's
+    current answers, scored in one vectorized pass and ranked by emissions saved.
+    With include_rebates, each scenario lists the eligible rebates that match
+    its upgrades and their total amount.
+    """
+    try:
+        answers = input_data.answers
+        if answers is None:
+            raw_answers = await latest_audits.get_answers(input_data.user_id)
+            if raw_answers is None:
+                raise HTTPException(status_code=404, detail="No audit found for this user.")
+            answers = AuditAnswers(**raw_answers)
+
+        rebates_by_upgrade = None
+        if input_data.include_rebates:
+            rebates_by_upgrade = match_rebates(await _eligible_rebates(input_data))
+
+        return scenario_simulator.simulate(answers, rebates_by_upgrade, input_data.limit)
+
+    except (HTTPException, DependencyUnavailable):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+
+@router.get("/history/{user_id}", response_model=CarbonHistoryResult, response_model_exclude_unset=True,
+            response_class=FastJSONResponse)
+async def get_carbon_history(
+    user_id: str,
+    entries: int = Query(0, ge=0, le=500, description="Also return this many per-audit entries, newest first"),
+):
+    """
+    Footprint trends from the user's materialized history: latest breakdown,
+    minimum, rolling average of recent audits, delta since the first audit and
+    the recent series. One document read; entries cost one read each.
+    Histories that were never backfilled are served as stored and rebuilt in
+    the background (see CarbonHistory.backfill for the full repair).
+    """
+    try:
+        summary = await firestore_data.get_carbon_summary(user_id)
+        if summary is None or not summary.get("backfilled"):
+            carbon_history.schedule_rebuild(user_id)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="No carbon history for this user.")
+
+        summary.pop("total_sum", None)
+        summary.pop("backfilled", None)
+        response = {"user_id": user_id, **summary}
+        if entries:
+            response["entries"] = await firestore_data.get_carbon_entries(user_id, entries)
+        return response
+
+    except (HTTPException, DependencyUnavailable):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
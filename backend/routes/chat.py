@@ -1,14 +1,22 @@
 # backend/routes/chat.py
+import asyncio
 import os
+import json
 import logging
-import time
-from collections import deque
-from fastapi import APIRouter, HTTPException, status
-from fastapi.concurrency import run_in_threadpool
+from contextlib import aclosing
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from firebase_admin import firestore
-import google.generativeai as genai
 from google.api_core import exceptions as google_exceptions
+from services.chat_context import chat_context, render_history
+from services.metrics import register_cache, track_dependency
+from services.reply_cache import ReplyCache
+from services.rate_limit import InMemoryRateLimiter, RateLimiter, RedisRateLimiter
+from services.registry import registry
+from services.resilience import (
+    Bulkhead, CircuitBreaker, DeadlineExceededError, DependencyGuard, DependencyUnavailable, retry_after_header,
+)
 
 # --- Configuration ---
 router = APIRouter()
@@ -18,17 +26,73 @@ logger = logging.getLogger("chat_route")
 MAX_REQUESTS = int(os.getenv("CHAT_MAX_REQUESTS", 5))
 TIMEFRAME_SECONDS = int(os.getenv("CHAT_TIMEFRAME_SECONDS", 60))
 
+# Reply cache configuration
+REPLY_CACHE_SIZE = int(os.getenv("CHAT_REPLY_CACHE_SIZE", 5000))
+REPLY_CACHE_TTL_SECONDS = float(os.getenv("CHAT_REPLY_CACHE_TTL_SECONDS", 3600))
+
+# Gemini isolation: concurrent calls, how long a request may queue for one, and per-call deadlines
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 16))
+GEMINI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GEMINI_QUEUE_TIMEOUT_SECONDS", 2))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 20))
+# Longest gap between streamed chunks
+GEMINI_STREAM_IDLE_SECONDS = float(os.getenv("GEMINI_STREAM_IDLE_SECONDS", 15))
+# Circuit breaker: opens when half the recent calls fail or most are slow, probes again after the cool-down
+GEMINI_BREAKER_FAILURE_RATE = float(os.getenv("GEMINI_BREAKER_FAILURE_RATE", 0.5))
+GEMINI_BREAKER_SLOW_SECONDS = float(os.getenv("GEMINI_BREAKER_SLOW_SECONDS", 10))
+GEMINI_BREAKER_OPEN_SECONDS = float(os.getenv("GEMINI_BREAKER_OPEN_SECONDS", 30))
+
 # --- Gemini API Configuration ---
-try:
+def _create_model():
     gemini_api_key = os.getenv("GEMINI_API_KEY")
     if not gemini_api_key:
         raise ValueError("GEMINI_API_KEY environment variable not set.")
+    # The SDK takes ~0.5s to import, so it is only loaded when the model is first needed
+    import google.generativeai as genai
+
     genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel('gemini-1.0-pro')
-    logger.info("Gemini API configured successfully.")
-except Exception as e:
-    logger.error(f"Failed to configure Gemini API: {e}")
-    model = None
+    return genai.GenerativeModel('gemini-1.0-pro')
+
+# Optional: without an API key the rest of the API still serves, and /chat returns 503
+registry.register("gemini", _create_model, required=False)
+
+def get_model():
+    """The Gemini model, created on first use; None if it is not configured."""
+    try:
+        return registry.get("gemini")
+    except Exception:
+        return None
+
+async def _get_model_async():
+    """`get_model` for request handlers: the first call creates the model on a worker thread."""
+    if registry.initialized("gemini"):
+        return get_model()
+    return await asyncio.to_thread(get_model)
+
+SYSTEM_PROMPT = """You are Veridian, a friendly AI home energy advisor.
+- Provide concise, positive, safe, and actionable advice based on the user's data.
+- Focus ONLY on home energy efficiency, sustainability, and related savings.
+- Politely decline any requests that are off-topic."""
+
+def _counts_against_gemini(e: BaseException) -> bool:
+    """Rejected prompts and blocked replies are our request's fault, not an outage."""
+    if isinstance(e, google_exceptions.TooManyRequests):
+        return True
+    return not isinstance(e, (google_exceptions.ClientError, ValueError))
+
+# Gemini gets its own concurrency limit, so a slow incident can't tie up the
+# whole server, and fails fast with 503 while its circuit is open
+gemini_guard = DependencyGuard(
+    "gemini",
+    Bulkhead("gemini", GEMINI_MAX_CONCURRENCY, GEMINI_QUEUE_TIMEOUT_SECONDS),
+    CircuitBreaker(
+        "gemini",
+        failure_rate=GEMINI_BREAKER_FAILURE_RATE,
+        slow_call_seconds=GEMINI_BREAKER_SLOW_SECONDS,
+        open_seconds=GEMINI_BREAKER_OPEN_SECONDS,
+    ),
+    GEMINI_TIMEOUT_SECONDS,
+    is_failure=_counts_against_gemini,
+)
 
 # --- Pydantic Model ---
 class ChatInput(BaseModel):
@@ -36,74 +100,216 @@ class ChatInput(BaseModel):
     message: str
 
 # --- Rate Limiter ---
-rate_limit_tracker = {}
-
-# --- Helper Functions (Blocking) ---
-def _fetch_user_context_sync(user_id: str):
-    """Fetches user profile and latest audit from Firestore."""
-    db = firestore.client()
-    user_doc = db.collection("users").document(user_id).get()
-    audit_query = db.collection("audits").where("user_id", "==", user_id).order_by("timestamp", direction=firestore.Query.DESCENDING).limit(1)
-    audit_docs = list(audit_query.stream())
-    
-    user_profile = user_doc.to_dict() if user_doc.exists else {"note": "No profile found"}
-    latest_audit = audit_docs[0].to_dict().get("answers", {}) if audit_docs else {}
-    
-    return user_profile, latest_audit
-
-def _generate_gemini_content_sync(prompt: str):
-    """Calls the Gemini API to generate content."""
+# In-memory until init_redis() swaps in the shared Redis backend
+rate_limiter: RateLimiter = InMemoryRateLimiter(MAX_REQUESTS, TIMEFRAME_SECONDS)
+
+# --- Reply Cache ---
+reply_cache = ReplyCache(REPLY_CACHE_SIZE, REPLY_CACHE_TTL_SECONDS)
+register_cache("chat_replies", reply_cache.stats)
+register_cache("chat_context", chat_context.stats)
+
+async def init_redis():
+    """Switches the chat rate limiter to Redis when REDIS_URL is set."""
+    global rate_limiter
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        logger.info("REDIS_URL not set; using the in-memory chat rate limiter.")
+        return
     try:
-        response = model.generate_content(prompt)
-        return response.text
-    except google_exceptions.GoogleAPICallError as e:
+        rate_limiter = await RedisRateLimiter.from_url(redis_url, MAX_REQUESTS, TIMEFRAME_SECONDS, prefix="chat:ratelimit:")
+        logger.info("Chat rate limiter connected to Redis.")
+    except Exception as e:
+        logger.error(f"Failed to connect to Redis, keeping the in-memory rate limiter: {e}")
+
+async def close_redis():
+    await rate_limiter.close()
+
+# --- Helper Functions ---
+def _gemini_error(e: Exception) -> HTTPException:
+    """Maps a Gemini client error onto the HTTP error returned to the app."""
+    if isinstance(e, DeadlineExceededError):
+        logger.warning(f"Gemini call abandoned: {e}")
+        return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="AI service took too long to respond.")
+    if isinstance(e, DependencyUnavailable):
+        logger.warning(f"Gemini call refused: {e}")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service is temporarily unavailable. Please try again shortly.",
+            headers=retry_after_header(e),
+        )
+    if isinstance(e, google_exceptions.GoogleAPICallError):
         logger.error(f"Google API Call Error: {e}")
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"AI service call failed: {e.message}")
+        return HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"AI service call failed: {e.message}")
+    logger.exception(f"Unexpected error during Gemini API call: {e}")
+    return HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="An unexpected error occurred with the AI service.")
+
+async def _generate_gemini_content(prompt: str):
+    """Calls the Gemini API to generate content."""
+    async def generate():
+        response = await get_model().generate_content_async(prompt)
+        return response.text
+
+    try:
+        with track_dependency("gemini", "generate_content"):
+            reply = await gemini_guard.call(generate)
     except Exception as e:
-        logger.exception(f"Unexpected error during Gemini API call: {e}")
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="An unexpected error occurred with the AI service.")
+        raise _gemini_error(e)
+    # Raising here also keeps empty replies out of the reply cache
+    if not reply:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="AI service returned an empty response.")
+    return reply
 
-@router.post("/")
-async def handle_chat(input_data: ChatInput):
-    if not model:
+def _chunk_text(chunk) -> str:
+    # Chunks without text (e.g. a trailing safety verdict) raise ValueError on .text
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _check_rate_limit(user_id: str):
+    with track_dependency("rate_limiter", "hit"):
+        allowed = await rate_limiter.hit(user_id)
+    if not allowed:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests.")
+
+def _render_prompt(message: str, context: str, history) -> str:
+    """
+    The hardened prompt. Built from exactly the inputs of the reply cache key,
+    so a cached reply never depends on anything (e.g. e-mail) the key leaves out.
+    """
+    prompt = f"{SYSTEM_PROMPT}\n\n{context}\n"
+    if history:
+        prompt += f"\nConversation so far:\n{render_history(history)}\n"
+    prompt += f"\nUser message: \"{message}\""
+    return prompt
+
+async def _build_prompt(input_data: ChatInput):
+    """
+    Checks availability and the rate limit, then builds the prompt from the user's context.
+    Returns the prompt and its reply cache key.
+    """
+    if not await _get_model_async():
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="AI service is not configured or available.")
 
     # --- Rate Limiter ---
-    user_id = input_data.user_id
-    current_time = time.time()
-    if user_id not in rate_limit_tracker:
-        rate_limit_tracker[user_id] = deque(maxlen=MAX_REQUESTS)
-    while rate_limit_tracker[user_id] and rate_limit_tracker[user_id][0] < current_time - TIMEFRAME_SECONDS:
-        rate_limit_tracker[user_id].popleft()
-    if len(rate_limit_tracker[user_id]) >= MAX_REQUESTS:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests.")
-    rate_limit_tracker[user_id].append(current_time)
+    await _check_rate_limit(input_data.user_id)
 
+    logger.info(f"Chat request from {input_data.user_id}: {input_data.message}")
+
+    # Compact, cached household context plus the recent conversation
+    with track_dependency("chat", "fetch_context"):
+        context = await chat_context.get_context(input_data.user_id)
+    history = chat_context.history(input_data.user_id)
+
+    return _render_prompt(input_data.message, context, history), ReplyCache.key(input_data.message, context, history)
+
+@router.post("/")
+async def handle_chat(input_data: ChatInput):
+    user_id = input_data.user_id
     try:
-        logger.info(f"Chat request from {user_id}: {input_data.message}")
-        
-        # Fetch data in a threadpool to avoid blocking
-        user_profile, latest_audit = await run_in_threadpool(_fetch_user_context_sync, user_id)
-
-        # Build a hardened prompt
-        system_prompt = """
-        You are Veridian, a friendly AI home energy advisor.
-        - Provide concise, positive, safe, and actionable advice based on the user's data.
-        - Focus ONLY on home energy efficiency, sustainability, and related savings.
-        - Politely decline any requests that are off-topic.
-        """
-        prompt = f"{system_prompt}\n\nUser Profile: {user_profile}\nLatest Home Audit: {latest_audit}\n\nUser message: \"{input_data.message}\""
-        
-        # Generate content in a threadpool
-        reply = await run_in_threadpool(_generate_gemini_content_sync, prompt)
-
-        if not reply:
-            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="AI service returned an empty response.")
+        prompt, cache_key = await _build_prompt(input_data)
+
+        # Serve repeated questions from the cache; identical in-flight requests share one Gemini call
+        reply = await reply_cache.get_or_generate(cache_key, lambda: _generate_gemini_content(prompt))
+        chat_context.remember(user_id, input_data.message, reply)
 
         return {"reply": reply}
 
-    except HTTPException:
-        raise # Re-raise HTTPException to preserve status code and detail
+    except (HTTPException, DependencyUnavailable):
+        raise # Re-raise to preserve the status code and detail
     except Exception as e:
         logger.exception(f"Error processing chat request for user {user_id}: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An error occurred while processing your request.")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An error occurred while processing your request.")
+
+@router.post("/stream")
+async def handle_chat_stream(input_data: ChatInput, request: Request):
+    """
+    Streams the reply as server-sent events while Gemini generates it.
+
+    Emits `token` events with {"text": ...}, then a final `done` event. Errors
+    before the first token use the same HTTP status codes as POST /chat; errors
+    after that, and replies without any text, arrive as an `error` event with
+    the status code and detail.
+    Generation stops as soon as the client disconnects. Cached replies are
+    sent as a single `token` event.
+    """
+    user_id = input_data.user_id
+    try:
+        prompt, cache_key = await _build_prompt(input_data)
+        cached_reply = reply_cache.get(cache_key)
+        if cached_reply is not None:
+            chat_context.remember(user_id, input_data.message, cached_reply)
+            return _stream_events(_cached_events(cached_reply))
+        # The Gemini slot is held until the stream ends
+        try:
+            lease = await gemini_guard.acquire()
+        except DependencyUnavailable as e:
+            raise _gemini_error(e)
+        # Returns once the first chunk has arrived, so upstream failures still map to HTTP errors
+        try:
+            with track_dependency("gemini", "stream_first_chunk"):
+                response = await gemini_guard.run(lambda: get_model().generate_content_async(prompt, stream=True), lease)
+        except Exception as e:
+            gemini_guard.release(lease)
+            raise _gemini_error(e)
+    except (HTTPException, DependencyUnavailable):
+        raise
+    except Exception as e:
+        logger.exception(f"Error processing chat stream request for user {user_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An error occurred while processing your request.")
+
+    async def events():
+        parts = []
+        try:
+            # Closed on every exit, so a client leaving mid-stream also closes the Gemini stream
+            async with aclosing(gemini_guard.iterate(response, lease, GEMINI_STREAM_IDLE_SECONDS)) as chunks:
+                async for chunk in chunks:
+                    if await request.is_disconnected():
+                        logger.info(f"Chat stream for {user_id} cancelled by client.")
+                        return
+                    text = _chunk_text(chunk)
+                    if text:
+                        parts.append(text)
+                        yield _sse("token", {"text": text})
+        except Exception as e:
+            error = _gemini_error(e)
+            yield _sse("error", {"status_code": error.status_code, "detail": error.detail})
+            return
+        finally:
+            gemini_guard.release(lease)
+        if not parts:
+            yield _sse("error", {"status_code": status.HTTP_502_BAD_GATEWAY, "detail": "AI service returned an empty response."})
+            return
+        # Only complete replies are cached and become part of the conversation
+        reply = "".join(parts)
+        reply_cache.set(cache_key, reply)
+        chat_context.remember(user_id, input_data.message, reply)
+        yield _sse("done", {})
+
+    # Also released after the response, in case the client left before the stream started
+    return _stream_events(events(), BackgroundTask(gemini_guard.release, lease))
+
+async def _cached_events(reply: str):
+    yield _sse("token", {"text": reply})
+    yield _sse("done", {})
+
+def _stream_events(events, background: BackgroundTask = None) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background,
+    )
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss counters for the reply cache."""
+    return reply_cache.stats()
+
+@router.get("/health")
+async def get_gemini_health():
+    """Circuit state and concurrency of Gemini calls."""
+    return gemini_guard.stats()
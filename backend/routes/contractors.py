@@ -1,57 +1,213 @@
 # backend/routes/contractors.py
 import logging
-from fastapi import APIRouter, HTTPException, Query
-from firebase_admin import firestore
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+import os
+from fastapi import APIRouter, HTTPException, Request, Response
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, model_validator, validator
+from typing import Callable, List, Literal, Optional, Tuple
+from services import firestore_data
+from services.contractor_index import contractor_index, distance_key, paginate, rank_key
+from services.geo import Point, postcodes
+from services.http_cache import cache_headers, make_etag, not_modified
+from services.pagination import decode_cursor, ndjson_response, stream_page
+from services.resilience import DependencyUnavailable
+from services.serialization import FastJSONResponse
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Radius for proximity searches that give neither radius_km nor nearest
+CONTRACTOR_SEARCH_RADIUS_KM = float(os.getenv("CONTRACTOR_SEARCH_RADIUS_KM", 50))
+MAX_SEARCH_RADIUS_KM = 1000
+
 # ----------------------------
-# Pydantic Model
+# Pydantic Models
 # ----------------------------
 class ContractorFilter(BaseModel):
-    location: str = Field(..., description="State or region code (e.g., VIC, NSW, QLD, SA, AUS)")
+    location: Optional[str] = Field(None, description="State or region code (e.g., VIC, NSW, QLD, SA, AUS); optional with lat/lon or postcode")
     services: List[str] = Field(..., min_items=1, description="List of services required")
+    match_all: bool = Field(False, description="Only return contractors offering every requested service")
+    lat: Optional[float] = Field(None, ge=-90, le=90, description="Search near this point (with lon)")
+    lon: Optional[float] = Field(None, ge=-180, le=180)
+    postcode: Optional[str] = Field(None, description="Search near this postcode's centroid")
+    radius_km: Optional[float] = Field(None, gt=0, le=MAX_SEARCH_RADIUS_KM, description="Only contractors within this distance")
+    nearest: Optional[int] = Field(None, ge=1, le=500, description="Only the k nearest contractors")
+    sort: Literal["distance", "rating"] = Field("distance", description="Order of proximity results")
+    limit: Optional[int] = Field(None, ge=1, le=500, description="Maximum contractors per page (all if omitted)")
+    cursor: Optional[str] = Field(
+        None,
+        validation_alias=AliasChoices("cursor", "start_after"),
+        description="Opaque cursor from a previous page's next_cursor (also accepted as start_after)",
+    )
 
     @validator("location")
     def location_uppercase(cls, v):
-        return v.strip().upper()
+        return v.strip().upper() if v is not None else v
 
     @validator("services", each_item=True)
     def normalize_service(cls, v):
         return v.strip().lower()
 
+    @validator("cursor")
+    def cursor_decodes(cls, v):
+        if v is not None:
+            decode_cursor(v)
+        return v
+
+    @model_validator(mode="after")
+    def search_area(self):
+        if (self.lat is None) != (self.lon is None):
+            raise ValueError("Provide both lat and lon.")
+        near = self.lat is not None or self.postcode is not None
+        if not near and self.location is None:
+            raise ValueError("Provide a location, lat/lon or postcode.")
+        if not near and (self.radius_km is not None or self.nearest is not None):
+            raise ValueError("radius_km and nearest need lat/lon or a postcode.")
+        return self
+
+    @property
+    def near(self) -> bool:
+        return self.lat is not None or self.postcode is not None
+
+
+class Contractor(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: str
+    name: Optional[str] = None
+    services: List[str] = []
+    location: Optional[str] = None
+    contact: Optional[str] = None
+    rating: Optional[float] = None
+    distance_km: Optional[float] = Field(None, description="Distance from the search point (proximity searches only)")
+
+
+class ContractorPage(BaseModel):
+    count: int
+    total: int
+    contractors: List[Contractor]
+    next_cursor: Optional[str] = None
+
+
+def _etag(filter_data: ContractorFilter, *extra) -> str:
+    # Service order doesn't change the result, so it doesn't change the ETag either
+    return make_etag(contractor_index.version, [
+        *extra, filter_data.location, sorted(set(filter_data.services)),
+        filter_data.match_all, filter_data.limit, filter_data.cursor,
+        filter_data.lat, filter_data.lon, filter_data.postcode,
+        filter_data.radius_km, filter_data.nearest, filter_data.sort,
+    ])
+
+
+def _search_point(filter_data: ContractorFilter) -> Point:
+    if filter_data.lat is not None:
+        return filter_data.lat, filter_data.lon
+    point = postcodes.get(filter_data.postcode)
+    if point is None:
+        raise HTTPException(status_code=422, detail=f"Unknown postcode: {filter_data.postcode}")
+    return point
+
+
+def _search_nearby(filter_data: ContractorFilter) -> Tuple[List[dict], Callable]:
+    """Proximity mode; served from the contractor index only."""
+    point = _search_point(filter_data)
+    if not contractor_index.ready:
+        raise HTTPException(status_code=503, detail="Proximity search is unavailable until contractors have loaded.")
+    radius_km = filter_data.radius_km
+    if radius_km is None and filter_data.nearest is None:
+        radius_km = CONTRACTOR_SEARCH_RADIUS_KM
+    contractors = contractor_index.nearby(
+        point, filter_data.services, filter_data.match_all,
+        location=filter_data.location, radius_km=radius_km, k=filter_data.nearest,
+    )
+    return contractors, distance_key if filter_data.sort == "distance" else rank_key
+
 
 # ----------------------------
 # Routes
 # ----------------------------
-@router.post("/", response_model=dict)
-async def get_contractors(filter_data: ContractorFilter):
+@router.post("/", response_model=ContractorPage, response_model_exclude_unset=True,
+             response_class=FastJSONResponse)
+async def get_contractors(filter_data: ContractorFilter, request: Request, response: Response):
     """
     Fetch contractors based on location and a list of required services.
-    Returns contractors from the user's state/region and national providers ("AUS").
-    """
-    try:
-        db = firestore.client()
+    Returns contractors from the user's state/region and national providers ("AUS"),
+    ordered by rating and paged with `limit`/`cursor`.
 
-        # Base query: contractors in the user’s location OR national providers
-        base_query = db.collection("contractors").where(
-            "location", "in", [filter_data.location, "AUS"]
-        )
+    With lat/lon or a postcode, returns contractors near that point instead
+    (within radius_km, the nearest k, or both; within 50 km by default), each
+    with a distance_km, ordered by distance or rating. A location then narrows
+    the search to that state plus national providers.
 
-        # Multi-service filter: contractors offering at least ONE required service
-        query = base_query.where("services", "array_contains_any", filter_data.services)
+    Index-served pages carry a strong ETag; a matching If-None-Match gets a 304.
+    Contractors are plain at load time; the page is checked against ContractorPage and encoded with orjson.
+    """
+    try:
+        key = rank_key
+        if contractor_index.ready:
+            etag = _etag(filter_data)
+            cached = not_modified(request, etag)
+            if cached is not None:
+                return cached
+            response.headers.update(cache_headers(etag))
+        if filter_data.near:
+            contractors, key = _search_nearby(filter_data)
+        elif contractor_index.ready:
+            contractors = contractor_index.query(
+                filter_data.location, filter_data.services, filter_data.match_all
+            )
+        else:
+            contractors = await _query_firestore(filter_data)
 
-        docs = list(query.stream())
-        contractors = [{"id": doc.id, **doc.to_dict()} for doc in docs]
+        page, next_cursor = paginate(contractors, filter_data.limit, filter_data.cursor, key)
 
         if not contractors:
             logger.info(f"No contractors found for {filter_data.location} with services {filter_data.services}")
 
-        return {"count": len(contractors), "contractors": contractors}
+        return {
+            "count": len(page),
+            "total": len(contractors),
+            "contractors": page,
+            "next_cursor": next_cursor,
+        }
 
+    except (HTTPException, DependencyUnavailable):
+        raise
     except Exception as e:
         logger.exception(f"Error fetching contractors for {filter_data}")
         raise HTTPException(status_code=500, detail="Failed to fetch contractors")
+
+
+@router.post("/stream")
+async def stream_contractors(filter_data: ContractorFilter, request: Request):
+    """
+    Same filter, ranking and paging as POST /contractors, streamed as NDJSON:
+    one contractor per line, then {"done": true, "count": ..., "next_cursor": ...}.
+    """
+    headers = None
+    key = rank_key
+    if contractor_index.ready:
+        etag = _etag(filter_data, "stream")
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        headers = cache_headers(etag)
+    if filter_data.near:
+        contractors, key = _search_nearby(filter_data)
+    elif contractor_index.ready:
+        contractors = contractor_index.query(filter_data.location, filter_data.services, filter_data.match_all)
+    else:
+        # Firestore can't return these in rank order without a composite index, so rank in memory
+        contractors = await _query_firestore(filter_data)
+
+    ranked = sorted(contractors, key=key)
+    return ndjson_response(stream_page(ranked, key, filter_data.limit, filter_data.cursor), headers)
+
+
+async def _query_firestore(filter_data: ContractorFilter) -> List[dict]:
+    """Fallback used until the contractor index has loaded its first snapshot."""
+    # Contractors in the user’s location OR national providers, offering at least ONE service
+    contractors = await firestore_data.query_contractors(filter_data.location, filter_data.services)
+    if filter_data.match_all:
+        required = set(filter_data.services)
+        contractors = [c for c in contractors if required.issubset(c.get("services") or [])]
+    return contractors
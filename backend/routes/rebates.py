@@ -1,7 +1,13 @@
 # backend/routes/rebates.py
-from fastapi import APIRouter, HTTPException
-from firebase_admin import firestore
-from pydantic import BaseModel
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, validator
+from services import firestore_data
+from services.http_cache import cache_headers, make_etag, not_modified
+from services.pagination import decode_cursor, ndjson_response, paginate_sorted, stream_page
+from services.rebate_index import rebate_index, rebate_key
+from services.resilience import DependencyUnavailable
+from services.serialization import FastJSONResponse
 
 # Create a router, which is like a mini-FastAPI app
 router = APIRouter()
@@ -10,26 +16,121 @@ router = APIRouter()
 class RebateFilter(BaseModel):
     location: str
     income: float
+    limit: Optional[int] = Field(None, ge=1, le=1000, description="Maximum rebates per page (all if omitted)")
+    cursor: Optional[str] = Field(
+        None,
+        validation_alias=AliasChoices("cursor", "start_after"),
+        description="Opaque cursor from a previous page's next_cursor (also accepted as start_after)",
+    )
+
+    @validator("cursor")
+    def cursor_decodes(cls, v):
+        if v is not None:
+            decode_cursor(v)
+        return v
+
+# Response models; documents may carry extra fields, which are passed through
+class Rebate(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+    amount: Optional[float] = None
+    location: Optional[str] = None
+    income_max: Optional[float] = None
+
+class RebatePage(BaseModel):
+    rebates: List[Rebate]
+    next_cursor: Optional[str] = None
+
+class RebateMatch(Rebate):
+    score: float
+
+class RebateSearchResult(BaseModel):
+    count: int
+    rebates: List[RebateMatch]
+
+def _firestore_page(filter: RebateFilter) -> dict:
+    """Cursor and limit for the Firestore fallback: one rebate past the page shows whether there is more."""
+    return {
+        "limit": filter.limit + 1 if filter.limit is not None else None,
+        "after": decode_cursor(filter.cursor) if filter.cursor else None,
+    }
 
 # Define the endpoint at the root of this router (which will be /rebates)
-@router.post("/")
-async def get_rebates(filter: RebateFilter):
+@router.post("/", response_model=RebatePage, response_model_exclude_unset=True, response_class=FastJSONResponse)
+async def get_rebates(filter: RebateFilter, request: Request, response: Response):
     """
     Fetches rebates from Firestore based on the user's location and income.
     Includes both state-specific and federal ("AUS") rebates.
+    Served from the in-memory rebate index once its first snapshot has loaded,
+    with a strong ETag; a matching If-None-Match gets a 304 and no body.
+    Results are ordered by income_max and paged with `limit`/`cursor`.
+    Rebates are plain at load time; the page is checked against RebatePage and encoded with orjson.
     """
     try:
-        db = firestore.client()
-        
-        # --- THIS IS THE ALTERED QUERY ---
-        # It now checks if the rebate's location is either the user's state OR "AUS".
-        query = db.collection("rebates") \
-                  .where("location", "in", [filter.location, "AUS"]) \
-                  .where("income_max", ">=", filter.income)
-        
-        docs = query.stream()
-        rebates = [{"id": doc.id, **doc.to_dict()} for doc in docs]
-        
-        return {"rebates": rebates}
+        if rebate_index.ready:
+            # Read the version before querying, so the ETag is never newer than the data
+            etag = make_etag(rebate_index.version, [filter.location, filter.income, filter.limit, filter.cursor])
+            cached = not_modified(request, etag)
+            if cached is not None:
+                return cached
+            response.headers.update(cache_headers(etag))
+            rebates = rebate_index.query(filter.location, filter.income)
+            page, next_cursor = paginate_sorted(rebates, rebate_key, filter.limit, filter.cursor)
+        else:
+            # The query checks if the rebate's location is either the user's state OR "AUS".
+            # Firestore starts after the cursor and reads one extra rebate to tell if there is a next page.
+            rebates = await firestore_data.query_rebates(
+                filter.location, filter.income, **_firestore_page(filter))
+            page, next_cursor = paginate_sorted(rebates, rebate_key, filter.limit)
+        return {"rebates": page, "next_cursor": next_cursor}
+    except DependencyUnavailable:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search", response_model=RebateSearchResult, response_model_exclude_unset=True,
+            response_class=FastJSONResponse)
+async def search_rebates(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in rebate names and descriptions"),
+    location: Optional[str] = Query(None, description="Only rebates for this state or national ones"),
+    income: Optional[float] = Query(None, description="Only rebates with income_max at or above this"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Full-text search over rebate names and descriptions, best match first.
+    Words also match as prefixes ("solar pan" finds "solar panels"), and
+    location/income apply the same eligibility rules as POST /rebates.
+    Served from the in-memory index only; 503 until it has loaded.
+    """
+    if not rebate_index.ready:
+        raise HTTPException(status_code=503, detail="Rebate search is warming up, try again shortly")
+    etag = make_etag(rebate_index.version, ["search", q, location, income, limit])
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    rebates = rebate_index.search(q, location, income, limit)
+    response.headers.update(cache_headers(etag))
+    return {"count": len(rebates), "rebates": rebates}
+
+@router.post("/stream")
+async def stream_rebates(filter: RebateFilter, request: Request):
+    """
+    Same filter and paging as POST /rebates, streamed as NDJSON: one rebate per
+    line, then {"done": true, "count": ..., "next_cursor": ...}. Before the
+    index has loaded, rebates are forwarded as Firestore returns them.
+    """
+    if rebate_index.ready:
+        etag = make_etag(rebate_index.version, ["stream", filter.location, filter.income, filter.limit, filter.cursor])
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        rebates = rebate_index.query(filter.location, filter.income)
+        return ndjson_response(stream_page(rebates, rebate_key, filter.limit, filter.cursor), cache_headers(etag))
+
+    rebates = firestore_data.stream_rebates(filter.location, filter.income, **_firestore_page(filter))
+    return ndjson_response(stream_page(rebates, rebate_key, filter.limit))
@@ -1,13 +1,95 @@
 # backend/routes/users.py
-from fastapi import APIRouter, HTTPException
-from config.db import db
+import asyncio
+import logging
+import os
+import re
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, ConfigDict, Field, validator
+from routes.auth import verify_privileged_token
+from services import firestore_data
+from services.pagination import ndjson_line, ndjson_response
+from services.serialization import FastJSONResponse
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-@router.get("/{user_id}")
+MAX_BATCH_USERS = 1000
+# Ids per get_all call, and how many of those calls run at once
+USERS_BATCH_CHUNK_SIZE = int(os.getenv("USERS_BATCH_CHUNK_SIZE", 100))
+USERS_BATCH_CONCURRENCY = int(os.getenv("USERS_BATCH_CONCURRENCY", 4))
+
+# Returned when `fields` is omitted; e-mail and income have to be asked for by name
+DEFAULT_BATCH_FIELDS = ("location", "home_size_sqft", "family_size", "monthly_energy_bill")
+
+_FIELD_PATH = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+class UserProfile(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    email: Optional[str] = None
+    location: Optional[str] = None
+    home_size_sqft: Optional[float] = None
+    family_size: Optional[int] = None
+    annual_income: Optional[float] = None
+    monthly_energy_bill: Optional[float] = None
+
+class UserBatchInput(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_USERS)
+    fields: Optional[List[str]] = Field(None, description="Field paths to return (e.g. location, annual_income); non-PII profile fields if omitted")
+
+    @validator("fields", each_item=True)
+    def simple_field_path(cls, v):
+        if not _FIELD_PATH.match(v):
+            raise ValueError(f"Invalid field path: {v!r}")
+        return v
+
+@router.post("/batch", dependencies=[Depends(verify_privileged_token)])
+async def get_users_batch(input_data: UserBatchInput):
+    """
+    Looks up many users with a few batched Firestore reads, projected to
+    `fields` (DEFAULT_BATCH_FIELDS if omitted). Only tokens with an admin or
+    service claim may call it. Streams NDJSON: one {"id": ..., <fields>} line per
+    user found (in arrival order), then {"done": true, "count": ..., "missing": [...]}.
+    """
+    user_ids = list(dict.fromkeys(input_data.user_ids))
+    chunks = [user_ids[i:i + USERS_BATCH_CHUNK_SIZE] for i in range(0, len(user_ids), USERS_BATCH_CHUNK_SIZE)]
+    fields = input_data.fields or list(DEFAULT_BATCH_FIELDS)
+    semaphore = asyncio.Semaphore(USERS_BATCH_CONCURRENCY)
+
+    async def fetch(chunk: List[str]):
+        async with semaphore:
+            return [item async for item in firestore_data.get_users(chunk, fields)]
+
+    async def lines():
+        found, missing = 0, []
+        tasks = [asyncio.ensure_future(fetch(chunk)) for chunk in chunks]
+        try:
+            for next_chunk in asyncio.as_completed(tasks):
+                out = []
+                for user_id, data in await next_chunk:
+                    if data is None:
+                        missing.append(user_id)
+                    else:
+                        found += 1
+                        out.append(ndjson_line({"id": user_id, **data}))
+                if out:
+                    yield b"".join(out)
+        except Exception as e:
+            logger.exception(f"Batch user lookup failed: {e}")
+            yield ndjson_line({"error": "Failed to fetch users"})
+            return
+        finally:
+            for task in tasks:
+                task.cancel()
+        yield ndjson_line({"done": True, "count": found, "missing": missing})
+
+    return ndjson_response(lines())
+
+@router.get("/{user_id}", response_model=UserProfile, response_model_exclude_unset=True,
+            response_class=FastJSONResponse)
 async def get_user(user_id: str):
-    doc_ref = db.collection("users").document(user_id)
-    doc = doc_ref.get()
-    if doc.exists:
-        return doc.to_dict()
-    raise HTTPException(status_code=404, detail="User not found")
\ No newline at end of file
+    user = await firestore_data.get_user(user_id)
+    if user is not None:
+        return user
+    raise HTTPException(status_code=404, detail="User not found")
@@ -0,0 +1,43 @@
+# backend/scripts/backfill_carbon_history.py
+"""
+Rebuilds materialized carbon histories that are missing or stale.
+
+    cd backend
+    python -m scripts.backfill_carbon_history [--workers 4] [--dry-run]
+    python -m scripts.backfill_carbon_history --user USER_ID [--user USER_ID ...]
+
+Run once after deploying carbon history (users whose audits predate it have
+no backfilled summary) and whenever the audit listener was down, so audits
+it missed are folded in. GET /carbon/history only ever reads the summary.
+"""
+import argparse
+import json
+import logging
+
+from services.carbon_history import CarbonHistory
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill and repair per-user carbon histories.")
+    parser.add_argument("--workers", type=int, default=4, help="Users rebuilt at once")
+    parser.add_argument("--user", action="append", dest="user_ids", help="Only check this user (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="Report stale histories without rebuilding")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    from config.db import get_db
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    args = parse_args(argv)
+    history = CarbonHistory(max_workers=args.workers)
+    history.start(get_db())
+    try:
+        report = history.backfill(args.user_ids, dry_run=args.dry_run)
+    finally:
+        history.stop()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
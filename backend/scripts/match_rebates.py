@@ -0,0 +1,47 @@
+# backend/scripts/match_rebates.py
+"""
+Works out which rebates every user qualifies for, for outreach campaigns.
+
+    cd backend
+    python -m scripts.match_rebates [--chunk-size 2000] [--dry-run]
+    python -m scripts.match_rebates --rebates-snapshot data/catalog.snap
+
+Streams `users`, matches each chunk against the whole rebate catalog in one
+NumPy pass (same rules as POST /rebates) and writes a summary per user to
+`rebate_matches/{user_id}`: the eligible rebate ids, their count and total
+amount. With --rebates-snapshot the catalog comes from a snapshot file (see
+scripts/snapshot.py) instead of Firestore.
+"""
+import argparse
+import json
+import logging
+
+from services.eligibility import ELIGIBILITY_CHUNK_SIZE, ELIGIBILITY_WRITE_WORKERS, run_eligibility_job
+from services.snapshot_file import read_snapshot
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Match every user against the rebate catalog.")
+    parser.add_argument("--chunk-size", type=int, default=ELIGIBILITY_CHUNK_SIZE, help="Users per page and per matrix")
+    parser.add_argument("--write-workers", type=int, default=ELIGIBILITY_WRITE_WORKERS, help="Batches committed at once")
+    parser.add_argument("--rebates-snapshot", help="Read rebates from this snapshot file instead of Firestore")
+    parser.add_argument("--dry-run", action="store_true", help="Match and report without writing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    from config.db import get_db
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    args = parse_args(argv)
+    rebates = None
+    if args.rebates_snapshot:
+        rebates = read_snapshot(args.rebates_snapshot, ["rebates"])["rebates"]
+    report = run_eligibility_job(
+        get_db(), rebates, chunk_size=args.chunk_size, write_workers=args.write_workers, dry_run=args.dry_run,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
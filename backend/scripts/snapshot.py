@@ -0,0 +1,93 @@
+# backend/scripts/snapshot.py
+"""
+Exports Firestore collections to a snapshot file, and back.
+
+    cd backend
+    python -m scripts.snapshot export data/catalog.snap [--audits]
+    python -m scripts.snapshot inspect data/catalog.snap
+    python -m scripts.snapshot import data/catalog.snap [--collections rebates]
+
+Start the API with SNAPSHOT_PATH=data/catalog.snap to load the rebate and
+contractor indexes from the file before Firestore catches up. `import`
+writes a snapshot into whatever project GOOGLE_APPLICATION_CREDENTIALS (or
+the Firestore emulator) points at, e.g. to seed a test environment.
+Timestamps round-trip; geo points and references are stored in their plain
+form ({"latitude", "longitude"} and the document path).
+"""
+import argparse
+import time
+from pathlib import Path
+
+from services.seeding import MAX_BATCH_SIZE
+from services.serialization import document_data
+from services.snapshot_file import SnapshotReader, read_snapshot, write_snapshot
+
+DEFAULT_COLLECTIONS = ["rebates", "contractors"]
+
+
+def export(args) -> None:
+    from config.db import get_db
+
+    db = get_db()
+    names = args.collections or DEFAULT_COLLECTIONS + (["audits"] if args.audits else [])
+    started = time.perf_counter()
+    collections = {
+        name: [(doc.id, document_data(doc)) for doc in db.collection(name).stream()]
+        for name in names
+    }
+    counts = write_snapshot(str(args.path), collections)
+    size = args.path.stat().st_size
+    print(f"Wrote {counts} to {args.path} ({size / 1024:.1f} KiB) in {time.perf_counter() - started:.1f}s.")
+
+
+def inspect(args) -> None:
+    with SnapshotReader(str(args.path)) as reader:
+        print(f"{args.path}: {args.path.stat().st_size / 1024:.1f} KiB, {reader.age_seconds / 3600:.1f}h old")
+        for name, count in reader.collections.items():
+            started = time.perf_counter()
+            reader.documents(name)
+            print(f"  {name:<14}{count:>8} documents  (decoded in {(time.perf_counter() - started) * 1000:.1f}ms)")
+
+
+def import_(args) -> None:
+    from config.db import get_db
+
+    db = get_db()
+    for name, documents in read_snapshot(str(args.path), args.collections).items():
+        collection = db.collection(name)
+        for start in range(0, len(documents), MAX_BATCH_SIZE):
+            batch = db.batch()
+            for doc_id, data in documents[start:start + MAX_BATCH_SIZE]:
+                batch.set(collection.document(doc_id), data)
+            batch.commit()
+        print(f"- Imported {len(documents)} documents into {name}.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export Firestore collections to a snapshot file, or import one.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write collections to a snapshot file")
+    export_parser.add_argument("path", type=Path)
+    export_parser.add_argument("--audits", action="store_true", help="Include the audits collection")
+    export_parser.add_argument("--collections", nargs="+", help=f"Collections to export (default: {' '.join(DEFAULT_COLLECTIONS)})")
+    export_parser.set_defaults(run=export)
+
+    inspect_parser = commands.add_parser("inspect", help="Show what a snapshot file holds")
+    inspect_parser.add_argument("path", type=Path)
+    inspect_parser.set_defaults(run=inspect)
+
+    import_parser = commands.add_parser("import", help="Write a snapshot file's documents to Firestore")
+    import_parser.add_argument("path", type=Path)
+    import_parser.add_argument("--collections", nargs="+", help="Collections to import (default: all in the file)")
+    import_parser.set_defaults(run=import_)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
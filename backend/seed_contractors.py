@@ -7,6 +7,8 @@ from typing import List, Dict, Any
 from firebase_admin import credentials, firestore, initialize_app
 from dotenv import load_dotenv
 
+from services.seeding import sync_collection
+
 # ----------------------------
 # Setup logging
 # ----------------------------
@@ -112,23 +114,22 @@ def validate_contractor(contractor: Dict[str, Any]) -> bool:
     return True
 
 
-def seed_contractors(data: List[Dict[str, Any]]):
+def seed_contractors(data: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Insert contractors into Firestore with validation and error handling."""
     logger.info("Starting contractor seeding...")
 
+    valid = []
     for contractor in data:
         if not validate_contractor(contractor):
             logger.error(f"Skipping invalid contractor: {contractor}")
             continue
+        valid.append(contractor)
 
-        try:
-            # Use set(..., merge=True) so reruns don’t overwrite everything blindly
-            db.collection("contractors").document(contractor["id"]).set(contractor, merge=True)
-            logger.info(f"Seeded: {contractor['id']}")
-        except Exception as e:
-            logger.exception(f"Failed to seed {contractor['id']}: {e}")
+    # Merge so reruns don’t overwrite everything blindly; only changed contractors are written
+    report = sync_collection(db, "contractors", valid, merge=True)
 
     logger.info("Contractor seeding complete.")
+    return report
 
 
 # ----------------------------
@@ -1,9 +1,14 @@
 # backend/seed_rebates_australia_full.py
 
 import os
+import logging
 from firebase_admin import credentials, firestore, initialize_app
 from dotenv import load_dotenv
 
+from services.seeding import sync_collection
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
 load_dotenv()
 key_path = os.getenv("FIREBASE_KEY_PATH")
 if not key_path:
@@ -150,20 +155,11 @@ rebates = [
 ]
 
 print("Seeding full Australian rebates dataset...")
-# Clear the existing collection for a fresh start
-try:
-    for doc in db.collection("rebates").stream():
-        doc.reference.delete()
-    print("Cleared existing rebates collection.")
-except Exception as e:
-    print(f"Could not clear collection (it may not exist yet): {e}")
-
-# Seed the new data
-for rebate in rebates:
-    try:
-        db.collection("rebates").document(rebate["id"]).set(rebate)
-        print(f"  Seeded: {rebate['id']}")
-    except Exception as e:
-        print(f"  ⇢ Failed to seed {rebate['id']}: {e}")
+# Write only new or changed rebates, then delete the ones no longer in the list.
+# The collection is never cleared, so the API keeps serving rebates mid-run.
+report = sync_collection(db, "rebates", rebates, prune=True)
 
-print("Seeding complete.")
\ No newline at end of file
+print(
+    f"Seeding complete: {report['created']} created, {report['updated']} updated, "
+    f"{report['deleted']} deleted, {report['unchanged']} unchanged, {report['failed']} failed."
+)
\ No newline at end of file
@@ -0,0 +1,228 @@
+# backend/services/audits.py
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from services import firestore_data
+from services.cache import SingleFlight, TTLCache
+from services.metrics import register_cache
+
+logger = logging.getLogger(__name__)
+
+AUDIT_CACHE_SIZE = int(os.getenv("AUDIT_CACHE_SIZE", 10000))
+AUDIT_CACHE_TTL_SECONDS = float(os.getenv("AUDIT_CACHE_TTL_SECONDS", 300))
+# Latest-audit queries a batch lookup runs at once
+AUDIT_BATCH_CONCURRENCY = int(os.getenv("AUDIT_BATCH_CONCURRENCY", 16))
+
+# Audits written slightly before startup (or with a skewed client clock) still invalidate
+LISTENER_LOOKBACK = timedelta(minutes=5)
+# The listener's lower bound is moved up this often, so the watched result set stays small
+LISTENER_REANCHOR_SECONDS = float(os.getenv("AUDIT_LISTENER_REANCHOR_SECONDS", 600))
+
+_MISSING = object()
+
+
+class LatestAuditCache:
+    """
+    Bounded TTL + LRU cache of each user's latest audit.
+
+    Concurrent misses for the same user share one Firestore query. Entries are
+    dropped when a new audit is written, either through `invalidate` or the
+    optional `audits` snapshot listener. Users without an audit are cached as
+    None so repeat lookups stay cheap too.
+
+    The cache belongs to the event loop: the listener hands invalidations and
+    subscriber callbacks to the loop instead of running them on the watch thread.
+    """
+
+    def __init__(self, maxsize: int = AUDIT_CACHE_SIZE, ttl: float = AUDIT_CACHE_TTL_SECONDS):
+        self._cache = TTLCache(maxsize, ttl)
+        self._flight = SingleFlight()
+        self._loading: Dict[str, object] = {}
+        self._watch = None
+        self._db = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reanchor_task: Optional[asyncio.Task] = None
+        # Audit id -> timestamp for audits already passed to subscribers since the current anchor
+        self._seen: Dict[str, Any] = {}
+        self._seen_lock = threading.Lock()
+        self._subscribers: List[Callable[[str, Dict[str, Any]], Any]] = []
+
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        audit = self._cache.get(user_id, _MISSING)
+        if audit is not _MISSING:
+            return audit
+        return await self._flight.do(user_id, lambda: self._load(user_id))
+
+    async def get_answers(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The `answers` map of the latest audit, or None if the user has no audit."""
+        audit = await self.get(user_id)
+        return None if audit is None else audit.get("answers", {})
+
+    async def get_many(self, user_ids: List[str], concurrency: int = AUDIT_BATCH_CONCURRENCY) -> List[Optional[Dict[str, Any]]]:
+        """
+        Latest audits for many users, in input order. Cached entries are used,
+        but misses are read straight from Firestore, at most `concurrency`
+        queries at a time, and not stored: a large batch must not evict the
+        entries single-user traffic relies on.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load(user_id: str) -> Optional[Dict[str, Any]]:
+            audit = self._cache.get(user_id, _MISSING)
+            if audit is not _MISSING:
+                return audit
+            async with semaphore:
+                return await firestore_data.get_latest_audit(user_id)
+
+        return list(await asyncio.gather(*(load(user_id) for user_id in user_ids)))
+
+    async def _load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        token = object()
+        self._loading[user_id] = token
+        try:
+            audit = await firestore_data.get_latest_audit(user_id)
+        finally:
+            current = self._loading.get(user_id) is token
+            if current:
+                del self._loading[user_id]
+        # Skip caching if the user was invalidated while the query was running
+        if current:
+            self._cache.set(user_id, audit)
+        return audit
+
+    # ----------------------------
+    # Invalidation
+    # ----------------------------
+    def invalidate(self, user_id: str) -> None:
+        """Call after writing a new audit for `user_id`."""
+        self._cache.pop(user_id)
+        self._loading.pop(user_id, None)
+        self._flight.forget(user_id)
+
+    def _invalidate_many(self, user_ids: List[str]) -> None:
+        for user_id in user_ids:
+            self.invalidate(user_id)
+
+    def subscribe(self, callback: Callable[[str, Dict[str, Any]], Any]) -> None:
+        """
+        Calls `callback(audit_id, audit)` once for each new audit the listener
+        sees, on the event loop the listener was started from.
+        """
+        self._subscribers.append(callback)
+
+    def start_listener(self, db) -> None:
+        """
+        Invalidates users as new audits arrive in Firestore. The query only
+        covers recent audits, and its lower bound is moved up every
+        LISTENER_REANCHOR_SECONDS so it does not grow with every audit saved.
+        """
+        if self._watch is not None:
+            return
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._db = db
+        self._watch = self._listen()
+        if self._loop is not None:
+            self._reanchor_task = self._loop.create_task(self._reanchor_periodically())
+        logger.info("Started audit invalidation listener.")
+
+    def stop_listener(self) -> None:
+        task, self._reanchor_task = self._reanchor_task, None
+        if task is not None:
+            task.cancel()
+        watch, self._watch = self._watch, None
+        if watch is not None:
+            watch.unsubscribe()
+
+    def _listen(self):
+        since = datetime.now(timezone.utc) - LISTENER_LOOKBACK
+        with self._seen_lock:
+            self._seen = {audit_id: ts for audit_id, ts in self._seen.items() if _at_or_after(ts, since)}
+        query = self._db.collection("audits").where("timestamp", ">=", since)
+        return query.on_snapshot(self._on_snapshot)
+
+    def reanchor(self):
+        """
+        Replaces the watch with one starting LISTENER_LOOKBACK ago and returns
+        the old one (still subscribed). The new watch's first snapshot covers
+        everything the old one would still report, so no audit is missed;
+        audits both report are passed to subscribers once.
+        """
+        old, self._watch = self._watch, self._listen()
+        return old
+
+    async def _reanchor_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(LISTENER_REANCHOR_SECONDS)
+            if self._watch is None:
+                return
+            try:
+                old = self.reanchor()
+                # Shielded, so stopping the listener mid-way still detaches the old watch
+                await asyncio.shield(asyncio.to_thread(old.unsubscribe))
+            except Exception:
+                logger.exception("Failed to re-anchor the audit listener; keeping the current watch.")
+
+    def _on_snapshot(self, docs, changes, read_time) -> None:
+        """Runs on the watch thread; the cache and subscribers are updated on the loop."""
+        user_ids: List[str] = []
+        added: List[tuple] = []
+        for change in changes:
+            audit = change.document.to_dict() or {}
+            user_id = audit.get("user_id")
+            if user_id:
+                user_ids.append(user_id)
+            if change.type.name == "ADDED":
+                with self._seen_lock:
+                    if change.document.id in self._seen:
+                        continue
+                    self._seen[change.document.id] = audit.get("timestamp")
+                added.append((change.document.id, audit))
+        if user_ids or added:
+            self._call_soon(self._apply_changes, user_ids, added)
+
+    def _call_soon(self, callback: Callable, *args) -> None:
+        loop = self._loop
+        if loop is None:
+            callback(*args)
+            return
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:  # loop closed during shutdown
+            pass
+
+    def _apply_changes(self, user_ids: List[str], added: List[tuple]) -> None:
+        self._invalidate_many(user_ids)
+        for audit_id, audit in added:
+            for callback in self._subscribers:
+                try:
+                    callback(audit_id, audit)
+                except Exception:
+                    logger.exception(f"Audit subscriber failed for audit {audit_id}")
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._cache.stats(), "inflight": len(self._flight)}
+
+
+def _at_or_after(timestamp: Any, since: datetime) -> bool:
+    try:
+        return timestamp >= since
+    except TypeError:
+        return False
+
+
+latest_audits = LatestAuditCache()
+register_cache("latest_audits", latest_audits.stats)
+
+
+async def get_latest_answers_many(user_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Latest audit answers for each distinct user id (None where there is no audit)."""
+    unique_ids = list(dict.fromkeys(user_ids))
+    audits = await latest_audits.get_many(unique_ids)
+    return {uid: None if audit is None else audit.get("answers", {}) for uid, audit in zip(unique_ids, audits)}
@@ -0,0 +1,274 @@
+# backend/services/carbon_history.py
+import logging
+import os
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from firebase_admin import firestore
+
+from services.carbon_model import AuditAnswers, calculate_emissions, calculate_emissions_batch
+from services.metrics import track_dependency
+from services.seeding import MAX_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLLECTION = "carbon_history"
+ENTRIES_COLLECTION = "entries"
+
+# Number of most recent audits in the rolling average and trend series
+CARBON_HISTORY_WINDOW = int(os.getenv("CARBON_HISTORY_WINDOW", 6))
+
+
+def make_entry(audit_id: str, audit: Dict[str, Any], emissions: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """The history entry (computed breakdown) for one audit document."""
+    if emissions is None:
+        emissions = calculate_emissions(AuditAnswers(**(audit.get("answers") or {})))
+    return {
+        "audit_id": audit_id,
+        "timestamp": audit.get("timestamp") or datetime.now(timezone.utc),
+        "emissions": emissions,
+    }
+
+
+def apply_entry(summary: Optional[Dict[str, Any]], entry: Dict[str, Any], window: int = CARBON_HISTORY_WINDOW) -> Dict[str, Any]:
+    """
+    Folds one entry into the running aggregates without looking at older entries.
+
+    Entries may arrive out of order: `first`, `latest` and the `recent` window
+    are kept by audit timestamp, not by arrival.
+    """
+    summary = summary or {}
+    total = entry["emissions"]["total"]
+    timestamp = entry["timestamp"]
+    point = {"audit_id": entry["audit_id"], "timestamp": timestamp, "total": total}
+
+    first = summary.get("first")
+    if first is None or timestamp < first["timestamp"]:
+        first = point
+    latest = summary.get("latest")
+    if latest is None or timestamp >= latest["timestamp"]:
+        latest = {"audit_id": entry["audit_id"], "timestamp": timestamp, "emissions": entry["emissions"]}
+    minimum = summary.get("min")
+    if minimum is None or total < minimum["total"]:
+        minimum = point
+
+    recent = sorted([*summary.get("recent", []), point], key=lambda p: p["timestamp"])[-window:]
+    count = summary.get("count", 0) + 1
+    total_sum = summary.get("total_sum", 0.0) + total
+
+    return {
+        "count": count,
+        "first": first,
+        "latest": latest,
+        "min": minimum,
+        "recent": recent,
+        "rolling_average": sum(p["total"] for p in recent) / len(recent),
+        "average": total_sum / count,
+        "total_sum": total_sum,
+        "delta_since_first": latest["emissions"]["total"] - first["total"],
+        "backfilled": summary.get("backfilled", False),
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+@firestore.transactional
+def _record_in_transaction(transaction, summary_ref, entry_ref, entry: Dict[str, Any], window: int) -> Optional[Dict[str, Any]]:
+    # Every instance sees every audit; the entry document makes the append idempotent
+    if entry_ref.get(transaction=transaction).exists:
+        return None
+    snapshot = summary_ref.get(transaction=transaction)
+    summary = apply_entry(snapshot.to_dict() if snapshot.exists else None, entry, window)
+    transaction.set(entry_ref, entry)
+    transaction.set(summary_ref, summary)
+    return summary
+
+
+@firestore.transactional
+def _summarize_in_transaction(transaction, summary_ref, entries_ref, window: int) -> Optional[Dict[str, Any]]:
+    # Reading the summary in the transaction serializes this with `record`, so
+    # entries it appended while the rebuild was writing are folded in, not lost
+    summary_ref.get(transaction=transaction)
+    summary = None
+    for doc in entries_ref.get(transaction=transaction):
+        summary = apply_entry(summary, doc.to_dict(), window)
+    if summary is None:
+        transaction.delete(summary_ref)
+        return None
+    summary["backfilled"] = True
+    transaction.set(summary_ref, summary)
+    return summary
+
+
+def needs_rebuild(summary: Optional[Dict[str, Any]], audit_count: int) -> bool:
+    """True if a summary was never backfilled or has missed audits (e.g. written while no listener ran)."""
+    if summary is None:
+        return audit_count > 0
+    return not summary.get("backfilled") or summary.get("count") != audit_count
+
+
+class CarbonHistory:
+    """
+    Materialized per-user footprint history.
+
+    `carbon_history/{user_id}` holds the running aggregates (count, first,
+    latest breakdown, min, rolling average over the last `window` audits,
+    delta since the first audit) and `carbon_history/{user_id}/entries/{audit_id}`
+    the computed breakdown of each audit. New audits from the audit listener
+    are recorded on a small worker pool with the sync client, one transaction
+    each, so dashboards read a single summary document.
+
+    Histories that predate this (never backfilled) are rebuilt on the same
+    pool the first time one of their audits is recorded or their summary is
+    read; `backfill` repairs every user at once, including audits written
+    while no listener was running.
+    """
+
+    def __init__(self, window: int = CARBON_HISTORY_WINDOW, max_workers: int = 2):
+        self.window = window
+        self.max_workers = max_workers
+        self._db = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Users with a rebuild queued or running, so repeated triggers queue one
+        self._rebuilding: set = set()
+        self._rebuilding_lock = threading.Lock()
+
+    def start(self, db) -> None:
+        if self._executor is None:
+            self._db = db
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="carbon-history")
+
+    def stop(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def _summary_ref(self, user_id: str):
+        return self._db.collection(HISTORY_COLLECTION).document(user_id)
+
+    # ----------------------------
+    # Writes
+    # ----------------------------
+    def submit(self, audit_id: str, audit: Dict[str, Any]) -> Optional[Future]:
+        """Queues `record` for a new audit; used as the audit listener callback."""
+        executor = self._executor
+        if executor is None or not audit.get("user_id"):
+            return None
+        return executor.submit(self._record_logged, audit_id, audit)
+
+    def _record_logged(self, audit_id: str, audit: Dict[str, Any]) -> None:
+        try:
+            summary = self.record(audit_id, audit)
+        except Exception:
+            logger.exception(f"Failed to record carbon history for audit {audit_id}")
+            return
+        if summary is not None and not summary.get("backfilled"):
+            self.schedule_rebuild(audit["user_id"])
+
+    def record(self, audit_id: str, audit: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Appends one audit to its user's history. Returns the new summary, or None if it was already recorded."""
+        summary_ref = self._summary_ref(audit["user_id"])
+        entry_ref = summary_ref.collection(ENTRIES_COLLECTION).document(audit_id)
+        entry = make_entry(audit_id, audit)
+        with track_dependency("firestore", "record_carbon_history"):
+            return _record_in_transaction(self._db.transaction(), summary_ref, entry_ref, entry, self.window)
+
+    def schedule_rebuild(self, user_id: str) -> Optional[Future]:
+        """Queues `rebuild` unless one is already queued or running for the user."""
+        executor = self._executor
+        if executor is None:
+            return None
+        with self._rebuilding_lock:
+            if user_id in self._rebuilding:
+                return None
+            self._rebuilding.add(user_id)
+        try:
+            return executor.submit(self._rebuild_logged, user_id)
+        except RuntimeError:  # shutting down
+            self._rebuild_done(user_id)
+            return None
+
+    def _rebuild_logged(self, user_id: str) -> None:
+        try:
+            self.rebuild(user_id)
+        except Exception:
+            logger.exception(f"Failed to rebuild carbon history for {user_id}")
+        finally:
+            self._rebuild_done(user_id)
+
+    def _rebuild_done(self, user_id: str) -> None:
+        with self._rebuilding_lock:
+            self._rebuilding.discard(user_id)
+
+    def rebuild(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Recomputes a user's history from all of their audits: backfills users
+        whose audits predate the history and repairs audits the listener
+        missed. Returns the summary, or None if the user has no audits.
+
+        Entries are written in batches; the summary is then recomputed from the
+        entries in one transaction.
+        """
+        audits = [(doc.id, doc.to_dict() or {}) for doc in
+                  self._db.collection("audits").where("user_id", "==", user_id).stream()]
+        summary_ref = self._summary_ref(user_id)
+        entries_ref = summary_ref.collection(ENTRIES_COLLECTION)
+        emissions = calculate_emissions_batch([AuditAnswers(**(a.get("answers") or {})) for _, a in audits])
+
+        audit_ids = {audit_id for audit_id, _ in audits}
+        writes = [("delete", doc.reference, None) for doc in entries_ref.select([]).stream() if doc.id not in audit_ids]
+        writes += [("set", entries_ref.document(audit_id), make_entry(audit_id, audit, breakdown))
+                   for (audit_id, audit), breakdown in zip(audits, emissions)]
+
+        with track_dependency("firestore", "rebuild_carbon_history"):
+            for start in range(0, len(writes), MAX_BATCH_SIZE):
+                batch = self._db.batch()
+                for op, ref, entry in writes[start:start + MAX_BATCH_SIZE]:
+                    if op == "delete":
+                        batch.delete(ref)
+                    else:
+                        batch.set(ref, entry)
+                batch.commit()
+            summary = _summarize_in_transaction(self._db.transaction(), summary_ref, entries_ref, self.window)
+        logger.info(f"Rebuilt carbon history for {user_id} from {len(audits)} audits.")
+        return summary
+
+    def backfill(self, user_ids: Optional[Iterable[str]] = None, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Rebuilds every history that was never backfilled or whose count
+        disagrees with the user's audits (or only those of `user_ids`).
+        Two projected scans find them: audit user ids and summary counts.
+        Rebuilds run on the worker pool; call `start` first.
+        """
+        audit_counts = Counter(
+            (doc.to_dict() or {}).get("user_id")
+            for doc in self._db.collection("audits").select(["user_id"]).stream()
+        )
+        audit_counts.pop(None, None)
+        summaries = {doc.id: doc.to_dict() or {} for doc in
+                     self._db.collection(HISTORY_COLLECTION).select(["count", "backfilled"]).stream()}
+        candidates = set(audit_counts) | set(summaries) if user_ids is None else set(user_ids)
+        stale = sorted(user_id for user_id in candidates
+                       if needs_rebuild(summaries.get(user_id), audit_counts.get(user_id, 0)))
+
+        report = {"users": len(candidates), "stale": len(stale), "rebuilt": 0, "failed": 0}
+        if dry_run or not stale:
+            return report
+        futures = [self._executor.submit(self.rebuild, user_id) for user_id in stale]
+        for user_id, future in zip(stale, futures):
+            try:
+                future.result()
+                report["rebuilt"] += 1
+            except Exception:
+                logger.exception(f"Failed to rebuild carbon history for {user_id}")
+                report["failed"] += 1
+        return report
+
+
+carbon_history = CarbonHistory()
@@ -0,0 +1,160 @@
+# backend/services/carbon_model.py
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+# --- 1. TYPED MODEL FOR AUDIT ANSWERS ---
+# This validates the data we get from Firestore, preventing errors.
+class AuditAnswers(BaseModel):
+    fridge_age: Optional[str] = None
+    has_dryer: Optional[bool] = False
+    has_dishwasher: Optional[bool] = False
+    insulation: Optional[str] = None
+    window_type: Optional[str] = None
+    hvac_age: Optional[str] = None
+    water_heater: Optional[str] = None
+    has_solar: Optional[bool] = False
+
+# Per-category emissions as returned by the API (one key per EMISSION_FACTORS category, plus the total)
+class Emissions(BaseModel):
+    appliances: float
+    heating_cooling: float
+    water_heater: float
+    windows: float
+    solar: float
+    total: float
+
+# This remains our central source of truth for emission data
+EMISSION_FACTORS = {
+    "appliances": {
+        "fridge_age": {"old": 450, "medium": 250, "new": 100},
+        "has_dryer": {True: 400, False: 0},
+        "has_dishwasher": {True: 150, False: 0},
+    },
+    "heating_cooling": {
+        "insulation": {"poor": 1000, "average": 500, "good": 100},
+        "hvac_age": {"old": 600, "medium": 300, "new": 100},
+    },
+    "water_heater": {
+        "water_heater": {"electric_storage": 600, "gas_storage": 300, "heat_pump_wh": 150},
+    },
+    "windows": {
+        "window_type": {"single": 350, "double": 100},
+    },
+    "solar": {
+        "has_solar": {True: -2000, False: 0},
+    }
+}
+
+# Emissions used when an answer is missing or not in EMISSION_FACTORS
+FACTOR_DEFAULTS = {
+    "fridge_age": 100,
+    "has_dryer": 0,
+    "has_dishwasher": 0,
+    "insulation": 100,
+    "hvac_age": 100,
+    "water_heater": 150,
+    "window_type": 100,
+    "has_solar": 0,
+}
+
+CATEGORIES = list(EMISSION_FACTORS)
+
+
+# --- 2. PURE CALCULATION FUNCTION ---
+# This logic is now completely separate from Firestore and the API.
+# It's easy to test and maintain.
+def calculate_emissions(answers: AuditAnswers) -> dict:
+    """Calculates carbon emissions based on a validated AuditAnswers object."""
+    emissions = {
+        "appliances": 0.0, "heating_cooling": 0.0,
+        "water_heater": 0.0, "windows": 0.0, "solar": 0.0
+    }
+
+    # Use the model's properties directly for type-safe access
+    emissions["appliances"] += EMISSION_FACTORS["appliances"]["fridge_age"].get(answers.fridge_age, FACTOR_DEFAULTS["fridge_age"])
+    emissions["appliances"] += EMISSION_FACTORS["appliances"]["has_dryer"].get(answers.has_dryer, FACTOR_DEFAULTS["has_dryer"])
+    emissions["appliances"] += EMISSION_FACTORS["appliances"]["has_dishwasher"].get(answers.has_dishwasher, FACTOR_DEFAULTS["has_dishwasher"])
+
+    emissions["heating_cooling"] += EMISSION_FACTORS["heating_cooling"]["insulation"].get(answers.insulation, FACTOR_DEFAULTS["insulation"])
+    emissions["heating_cooling"] += EMISSION_FACTORS["heating_cooling"]["hvac_age"].get(answers.hvac_age, FACTOR_DEFAULTS["hvac_age"])
+
+    emissions["water_heater"] += EMISSION_FACTORS["water_heater"]["water_heater"].get(answers.water_heater, FACTOR_DEFAULTS["water_heater"])
+
+    emissions["windows"] += EMISSION_FACTORS["windows"]["window_type"].get(answers.window_type, FACTOR_DEFAULTS["window_type"])
+
+    emissions["solar"] += EMISSION_FACTORS["solar"]["has_solar"].get(answers.has_solar, FACTOR_DEFAULTS["has_solar"])
+
+    emissions["total"] = sum(emissions.values())
+    return emissions
+
+
+# --- 3. VECTORIZED BATCH CALCULATION ---
+class _CompiledField:
+    """Lookup table for one answer field: answer value -> code -> emissions."""
+
+    def __init__(self, name: str, category: int, factors: Dict[Any, float], default: float):
+        self.name = name
+        self.category = category
+        self.options = list(factors)
+        self.codes = {value: code for code, value in enumerate(self.options)}
+        # The extra trailing slot holds the default for unknown answers
+        self.default_code = len(self.options)
+        self.values = np.array([*factors.values(), default], dtype=np.float64)
+
+    def encode(self, value: Any) -> int:
+        return self.codes.get(value, self.default_code)
+
+
+class EmissionTables:
+    """
+    EMISSION_FACTORS compiled into NumPy lookup arrays.
+
+    Answers are encoded once into an (n, fields) matrix of small integer codes,
+    after which every household is scored with one fancy-index per field.
+    The per-category sums are accumulated in the same order as
+    `calculate_emissions`, so results are identical to the scalar function.
+    """
+
+    def __init__(self, factors: Dict[str, Dict[str, Dict[Any, float]]], defaults: Dict[str, float]):
+        self.categories = list(factors)
+        self.fields: List[_CompiledField] = [
+            _CompiledField(name, index, options, defaults[name])
+            for index, category in enumerate(self.categories)
+            for name, options in factors[category].items()
+        ]
+        self.field_index = {f.name: i for i, f in enumerate(self.fields)}
+
+    def encode(self, answers: Sequence[AuditAnswers]) -> np.ndarray:
+        codes = np.empty((len(answers), len(self.fields)), dtype=np.intp)
+        for i, field in enumerate(self.fields):
+            codes[:, i] = np.fromiter(
+                (field.encode(getattr(a, field.name)) for a in answers),
+                dtype=np.intp,
+                count=len(answers),
+            )
+        return codes
+
+    def evaluate(self, codes: np.ndarray) -> np.ndarray:
+        """Returns an (n, categories + 1) matrix; the last column is the total."""
+        out = np.zeros((codes.shape[0], len(self.categories) + 1), dtype=np.float64)
+        for i, field in enumerate(self.fields):
+            out[:, field.category] += field.values[codes[:, i]]
+        for c in range(len(self.categories)):
+            out[:, -1] += out[:, c]
+        return out
+
+    def to_dicts(self, matrix: np.ndarray) -> List[dict]:
+        keys = self.categories + ["total"]
+        return [dict(zip(keys, row)) for row in matrix.tolist()]
+
+
+emission_tables = EmissionTables(EMISSION_FACTORS, FACTOR_DEFAULTS)
+
+
+def calculate_emissions_batch(answers: Sequence[AuditAnswers]) -> List[dict]:
+    """Vectorized `calculate_emissions` over many audits, in input order."""
+    if not answers:
+        return []
+    return emission_tables.to_dicts(emission_tables.evaluate(emission_tables.encode(answers)))
@@ -0,0 +1,171 @@
+# backend/services/chat_context.py
+import asyncio
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from services import firestore_data
+from services.audits import latest_audits
+from services.cache import SingleFlight, TTLCache
+from services.carbon_model import AuditAnswers
+
+CHAT_CONTEXT_CACHE_SIZE = int(os.getenv("CHAT_CONTEXT_CACHE_SIZE", 10000))
+# Profile edits are written straight to Firestore by the app, so they are picked up within this TTL
+CHAT_CONTEXT_TTL_SECONDS = float(os.getenv("CHAT_CONTEXT_TTL_SECONDS", 300))
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", 6))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 600))
+# Conversations idle for longer than this start over
+CHAT_HISTORY_IDLE_SECONDS = float(os.getenv("CHAT_HISTORY_IDLE_SECONDS", 1800))
+
+# Only these profile fields change the advice; e-mail and similar fields are never sent
+PROFILE_FIELDS = (
+    ("location", "location", "{}"),
+    ("home_size_sqft", "home", "{:,.0f} sqft"),
+    ("family_size", "household", "{:.0f} people"),
+    ("annual_income", "income", "${:,.0f}/yr"),
+    ("monthly_energy_bill", "energy bill", "${:,.0f}/month"),
+)
+AUDIT_FIELDS = tuple(AuditAnswers.model_fields)
+
+Turn = Tuple[str, str, int]  # (user message, reply, estimated tokens)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def _format(value: Any, template: str) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    try:
+        return template.format(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def render_context(profile: Optional[Dict[str, Any]], answers: Optional[Dict[str, Any]]) -> str:
+    """
+    The household facts the model needs, one short line each for the profile
+    and the latest audit, e.g. "Profile: location NSW; home 1,800 sqft; ...".
+    """
+    profile = profile or {}
+    parts = []
+    for field, label, template in PROFILE_FIELDS:
+        text = _format(profile.get(field), template)
+        if text is not None:
+            parts.append(f"{label} {text}")
+    lines = [f"Profile: {'; '.join(parts)}" if parts else "Profile: none provided"]
+
+    if answers:
+        audit = []
+        for field in AUDIT_FIELDS:
+            value = answers.get(field)
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = "yes" if value else "no"
+            audit.append(f"{field.replace('_', ' ')} {str(value).replace('_', ' ')}")
+        lines.append(f"Latest audit: {'; '.join(audit) or 'no answers'}")
+    else:
+        lines.append("Latest audit: none yet")
+    return "\n".join(lines)
+
+
+class ConversationWindow:
+    """The most recent exchanges with one user, trimmed to a turn count and token budget."""
+
+    def __init__(self, max_turns: int = CHAT_HISTORY_MAX_TURNS, token_budget: int = CHAT_HISTORY_TOKEN_BUDGET):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.turns: Deque[Turn] = deque()
+        self.tokens = 0
+
+    def add(self, message: str, reply: str) -> None:
+        cost = estimate_tokens(message) + estimate_tokens(reply)
+        self.turns.append((message, reply, cost))
+        self.tokens += cost
+        # Oldest turns go first; a single turn over budget is not kept at all
+        while self.turns and (len(self.turns) > self.max_turns or self.tokens > self.token_budget):
+            self.tokens -= self.turns.popleft()[2]
+
+    def exchanges(self) -> List[Tuple[str, str]]:
+        return [(message, reply) for message, reply, _ in self.turns]
+
+
+def render_history(exchanges: List[Tuple[str, str]]) -> str:
+    return "\n".join(f"User: {message}\nVeridian: {reply}" for message, reply in exchanges)
+
+
+class ChatContextBuilder:
+    """
+    Per-user prompt context for the chat route.
+
+    The rendered household context is cached per user (concurrent misses share
+    one fetch) and dropped when a new audit arrives. Each user also gets a
+    bounded conversation window so follow-up questions have the earlier turns.
+    Both live in process memory.
+    """
+
+    def __init__(self):
+        self._contexts = TTLCache(CHAT_CONTEXT_CACHE_SIZE, CHAT_CONTEXT_TTL_SECONDS)
+        self._histories = TTLCache(CHAT_CONTEXT_CACHE_SIZE, CHAT_HISTORY_IDLE_SECONDS)
+        self._flight = SingleFlight()
+        self._loading: Dict[str, object] = {}
+
+    async def get_context(self, user_id: str) -> str:
+        context = self._contexts.get(user_id)
+        if context is not None:
+            return context
+        return await self._flight.do(user_id, lambda: self._load(user_id))
+
+    async def _load(self, user_id: str) -> str:
+        token = object()
+        self._loading[user_id] = token
+        try:
+            profile, answers = await asyncio.gather(
+                firestore_data.get_user(user_id),
+                latest_audits.get_answers(user_id),
+            )
+        finally:
+            current = self._loading.get(user_id) is token
+            if current:
+                del self._loading[user_id]
+        context = render_context(profile, answers)
+        # Skip caching if the user was invalidated while loading
+        if current:
+            self._contexts.set(user_id, context)
+        return context
+
+    def invalidate(self, user_id: str) -> None:
+        self._contexts.pop(user_id)
+        self._loading.pop(user_id, None)
+        self._flight.forget(user_id)
+
+    def on_new_audit(self, audit_id: str, audit: Dict[str, Any]) -> None:
+        """Audit listener callback; runs on the event loop."""
+        user_id = audit.get("user_id")
+        if user_id:
+            self.invalidate(user_id)
+
+    # ----------------------------
+    # Conversation window
+    # ----------------------------
+    def history(self, user_id: str) -> List[Tuple[str, str]]:
+        window = self._histories.get(user_id)
+        return window.exchanges() if window is not None else []
+
+    def remember(self, user_id: str, message: str, reply: str) -> None:
+        window = self._histories.get(user_id) or ConversationWindow()
+        window.add(message, reply)
+        # Setting again restarts the idle timer
+        self._histories.set(user_id, window)
+
+    def forget(self, user_id: str) -> None:
+        self._histories.pop(user_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._contexts.stats(), "conversations": len(self._histories)}
+
+
+chat_context = ChatContextBuilder()
@@ -0,0 +1,211 @@
+# backend/services/contractor_index.py
+import os
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from services.geo import GridIndex, Point, document_point
+from services.pagination import SortKey, paginate_sorted
+from services.snapshot_index import SnapshotIndex
+
+NATIONAL_LOCATION = "AUS"
+# Postings key for "any location", used by proximity searches
+ANY_LOCATION = "*"
+
+# Grid cell size for the spatial index; ~0.25 degrees is ~28 km
+CONTRACTOR_GRID_CELL_DEG = float(os.getenv("CONTRACTOR_GRID_CELL_DEG", 0.25))
+
+RankKey = SortKey
+
+
+# ----------------------------
+# Ranking & cursors
+# ----------------------------
+def rank_key(contractor: Dict[str, Any]) -> RankKey:
+    """Highest rating first, ties broken by document id so paging is stable."""
+    rating = contractor.get("rating")
+    if not isinstance(rating, (int, float)) or isinstance(rating, bool):
+        rating = 0.0
+    return (-float(rating), contractor["id"])
+
+
+def distance_key(contractor: Dict[str, Any]) -> SortKey:
+    """Nearest first (see `ContractorIndex.nearby`), ties broken by document id."""
+    return (contractor["distance_km"], contractor["id"])
+
+
+def paginate(
+    contractors: List[Dict[str, Any]],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    key: Callable[[Dict[str, Any]], SortKey] = rank_key,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Sorts contractors by `key` (rank by default) and returns the page after
+    `cursor` together with the cursor for the next page (None when there are
+    no more results).
+    """
+    return paginate_sorted(sorted(contractors, key=key), key, limit, cursor)
+
+
+# ----------------------------
+# Index
+# ----------------------------
+class _State:
+    """Everything a search reads, published as one object so readers never see a half-applied batch."""
+
+    __slots__ = ("postings", "records", "grid")
+
+    def __init__(self, postings: Dict[Tuple[str, str], FrozenSet[int]], records: Dict[int, Dict[str, Any]], grid: GridIndex):
+        self.postings = postings
+        self.records = records
+        self.grid = grid
+
+
+class ContractorIndex(SnapshotIndex):
+    """
+    Inverted index over the `contractors` collection.
+
+    Every contractor gets a small integer slot, and each (location, service)
+    pair maps to a frozenset of slots. A search is a union (any service) or
+    intersection (all services) of those sets, merged across the user's
+    location and the national ("AUS") providers.
+
+    Contractors with coordinates (see `geo.document_point`) are also kept in
+    a grid index for nearest / within-radius searches; it is rebuilt with
+    NumPy whenever a batch of changes moves, adds or removes a point.
+
+    Postings, records and the grid are published together in an immutable
+    `_State`, so a reader always resolves slots against the records they were
+    built with, even while freed slots are reused. The slot bookkeeping is
+    only touched by the writer.
+    """
+
+    collection_name = "contractors"
+
+    def __init__(self):
+        super().__init__()
+        self._state = _State({}, {}, GridIndex([], [], CONTRACTOR_GRID_CELL_DEG))
+        self._slots: Dict[str, int] = {}
+        self._keys: Dict[int, List[Tuple[str, str]]] = {}
+        self._free: List[int] = []
+        self._points: Dict[int, Point] = {}
+
+    def _rebuild(self, touched: Iterable[str]) -> None:
+        state = self._state
+        records = dict(state.records)
+        # Posting changes are collected first, so each set is rebuilt once per batch
+        removed: Dict[Tuple[str, str], Set[int]] = {}
+        added: Dict[Tuple[str, str], Set[int]] = {}
+        points_changed = False
+        for doc_id in touched:
+            slot = self._slots.get(doc_id)
+            if slot is not None:
+                for key in self._keys.pop(slot, []):
+                    removed.setdefault(key, set()).add(slot)
+
+            data = self._docs.get(doc_id)
+            if data is None:
+                if slot is not None:
+                    del self._slots[doc_id]
+                    records.pop(slot, None)
+                    self._free.append(slot)
+                    points_changed |= self._points.pop(slot, None) is not None
+                continue
+
+            if slot is None:
+                slot = self._free.pop() if self._free else len(self._slots)
+                self._slots[doc_id] = slot
+            records[slot] = {"id": doc_id, **data}
+
+            point = document_point(data)
+            if point != self._points.get(slot):
+                points_changed = True
+                if point is None:
+                    del self._points[slot]
+                else:
+                    self._points[slot] = point
+
+            services = data.get("services")
+            location = data.get("location")
+            if not isinstance(services, list) or not isinstance(location, str):
+                continue
+            unique = [s for s in dict.fromkeys(services) if isinstance(s, str)]
+            keys = [(location, s) for s in unique] + [(ANY_LOCATION, s) for s in unique]
+            for key in keys:
+                added.setdefault(key, set()).add(slot)
+            self._keys[slot] = keys
+
+        postings = dict(state.postings)
+        for key in removed.keys() | added.keys():
+            # Removals first: a slot freed and reused in this batch must end up added
+            slots = (postings.get(key, frozenset()) - removed.get(key, set())) | added.get(key, set())
+            if slots:
+                postings[key] = slots
+            else:
+                postings.pop(key, None)
+
+        grid = state.grid
+        if points_changed:
+            grid = GridIndex(self._points.keys(), self._points.values(), CONTRACTOR_GRID_CELL_DEG)
+        self._state = _State(postings, records, grid)
+
+    @staticmethod
+    def _match_location(state: _State, location: str, services: List[str], match_all: bool) -> FrozenSet[int]:
+        sets = [state.postings.get((location, s), frozenset()) for s in dict.fromkeys(services)]
+        if not sets:
+            return frozenset()
+        if match_all:
+            return frozenset.intersection(*sets)
+        return frozenset.union(*sets)
+
+    def query(self, location: str, services: List[str], match_all: bool = False) -> List[Dict[str, Any]]:
+        """Returns unranked contractors in `location` or "AUS" offering any (or all) `services`."""
+        state = self._state
+        slots = frozenset()
+        for loc in dict.fromkeys([location, NATIONAL_LOCATION]):
+            slots |= self._match_location(state, loc, services, match_all)
+        records = state.records
+        return [records[s] for s in slots]
+
+    def nearby(
+        self,
+        point: Point,
+        services: List[str],
+        match_all: bool = False,
+        location: Optional[str] = None,
+        radius_km: Optional[float] = None,
+        k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Contractors with coordinates offering any (or all) `services`, nearest
+        first, each with a `distance_km`. Returns those within `radius_km`, the
+        `k` nearest, or the `k` nearest within `radius_km`. With `location`,
+        only contractors in that location or "AUS" are considered.
+        """
+        state = self._state
+        if location is None:
+            slots = self._match_location(state, ANY_LOCATION, services, match_all)
+        else:
+            slots = frozenset()
+            for loc in dict.fromkeys([location, NATIONAL_LOCATION]):
+                slots |= self._match_location(state, loc, services, match_all)
+        grid, records = state.grid, state.records
+        if not slots or not len(grid):
+            return []
+
+        allowed = np.zeros(max(int(grid.ids.max()), max(slots)) + 1, dtype=bool)
+        allowed[list(slots)] = True
+        lat, lon = point
+        if k is None:
+            ids, distances = grid.within(lat, lon, radius_km, allowed)
+        else:
+            ids, distances = grid.nearest(lat, lon, k, allowed, max_km=radius_km)
+
+        return [
+            {**records[slot], "distance_km": round(distance, 3)}
+            for slot, distance in zip(ids.tolist(), distances.tolist())
+        ]
+
+
+contractor_index = ContractorIndex()
@@ -0,0 +1,237 @@
+# backend/services/eligibility.py
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from services.rebate_index import NATIONAL_LOCATION, location_code
+from services.seeding import MAX_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+MATCHES_COLLECTION = "rebate_matches"
+USER_FIELDS = ["location", "annual_income"]
+
+# Users per Firestore page, and so per eligibility matrix (users x rebates booleans)
+ELIGIBILITY_CHUNK_SIZE = int(os.getenv("ELIGIBILITY_CHUNK_SIZE", 2000))
+# Batches committed at once while the next chunk is read and matched
+ELIGIBILITY_WRITE_WORKERS = int(os.getenv("ELIGIBILITY_WRITE_WORKERS", 4))
+
+# Distinct, so a rebate with an unusable location never matches a user whose state has no rebates
+_NO_REBATE_LOCATION = -1
+_NO_USER_LOCATION = -2
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# ----------------------------
+# Encoding
+# ----------------------------
+class RebateMatrix:
+    """
+    The rebate catalog as NumPy columns, sorted like the rebate index
+    (`income_max`, then id). Locations become integer codes; national
+    ("AUS") rebates are flagged so they match every user.
+
+    Rebates without a numeric `income_max` are left out, as the Firestore
+    query in `get_rebates` never returns them.
+    """
+
+    def __init__(self, rebates: Iterable[Tuple[str, Dict[str, Any]]]):
+        rows = sorted(
+            (float(data["income_max"]), doc_id, data)
+            for doc_id, data in rebates if _is_number(data.get("income_max"))
+        )
+        self.ids = [doc_id for _, doc_id, _ in rows]
+        self._id_array = np.array(self.ids, dtype=object)
+        self.income_max = np.array([income for income, _, _ in rows], dtype=np.float64)
+        self.amount = np.array(
+            [float(data["amount"]) if _is_number(data.get("amount")) else 0.0 for _, _, data in rows],
+            dtype=np.float64,
+        )
+        locations = [data.get("location") for _, _, data in rows]
+        self.national = np.array([loc == NATIONAL_LOCATION for loc in locations], dtype=bool)
+        self.codes: Dict[str, int] = {}
+        for loc in locations:
+            if isinstance(loc, str) and loc != NATIONAL_LOCATION:
+                self.codes.setdefault(loc, len(self.codes))
+        self.location = np.array([self.codes.get(loc, _NO_REBATE_LOCATION) for loc in locations], dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def encode_users(self, users: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (location codes, incomes, valid mask) for user profiles. Users without
+        a location or a numeric `annual_income` are not valid; a location with
+        no state rebates still matches national ones.
+        """
+        location = np.full(len(users), _NO_USER_LOCATION, dtype=np.int32)
+        income = np.zeros(len(users), dtype=np.float64)
+        valid = np.zeros(len(users), dtype=bool)
+        for i, user in enumerate(users):
+            loc, value = user.get("location"), user.get("annual_income")
+            if isinstance(loc, str) and loc.strip() and _is_number(value):
+                location[i] = self.codes.get(location_code(loc), _NO_USER_LOCATION)
+                income[i] = value
+                valid[i] = True
+        return location, income, valid
+
+    def eligible(self, location: np.ndarray, income: np.ndarray) -> np.ndarray:
+        """Users x rebates eligibility: same state or national, and income_max >= income."""
+        same_place = (self.location[None, :] == location[:, None]) | self.national[None, :]
+        return same_place & (self.income_max[None, :] >= income[:, None])
+
+    def summarize(self, eligible: np.ndarray, valid: np.ndarray) -> List[Optional[Dict[str, Any]]]:
+        """Per-user match summary for one chunk (None for users that could not be matched)."""
+        counts = eligible.sum(axis=1)
+        totals = eligible @ self.amount
+        # One nonzero over the whole chunk (row-major, so each user's rebates stay in catalog order)
+        ids_per_user = np.split(self._id_array[np.nonzero(eligible)[1]], np.cumsum(counts)[:-1])
+        computed_at = datetime.now(timezone.utc)
+        summaries: List[Optional[Dict[str, Any]]] = []
+        for ids, count, total, ok in zip(ids_per_user, counts.tolist(), totals.tolist(), valid.tolist()):
+            if not ok:
+                summaries.append(None)
+                continue
+            summaries.append({
+                "rebate_ids": ids.tolist(),
+                "count": count,
+                "total_amount": round(total, 2),
+                "computed_at": computed_at,
+            })
+        return summaries
+
+
+# ----------------------------
+# Job
+# ----------------------------
+def stream_users(db, chunk_size: int = ELIGIBILITY_CHUNK_SIZE) -> Iterator[List[Tuple[str, Dict[str, Any]]]]:
+    """Pages through `users` in document id order, fetching only the fields matching needs."""
+    query = db.collection("users").select(USER_FIELDS) \
+        .order_by(FieldPath.document_id()).limit(chunk_size)
+    last = None
+    while True:
+        page = list((query.start_after(last) if last is not None else query).stream())
+        if page:
+            yield [(doc.id, doc.to_dict() or {}) for doc in page]
+        if len(page) < chunk_size:
+            return
+        last = page[-1]
+
+
+def existing_matches(db, user_ids: List[str]) -> Set[str]:
+    """Which of `user_ids` have a `rebate_matches` document, read keys-only."""
+    if not user_ids:
+        return set()
+    matches = db.collection(MATCHES_COLLECTION)
+    docs = db.get_all([matches.document(user_id) for user_id in user_ids], field_paths=[])
+    return {doc.id for doc in docs if doc.exists}
+
+
+def run_eligibility_job(
+    db,
+    rebates: Optional[Iterable[Tuple[str, Dict[str, Any]]]] = None,
+    chunk_size: int = ELIGIBILITY_CHUNK_SIZE,
+    write_workers: int = ELIGIBILITY_WRITE_WORKERS,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Matches every user against the rebate catalog and writes one summary per
+    user to `rebate_matches/{user_id}`: eligible rebate ids (in the order
+    POST /rebates returns them), their count and total amount. Users without
+    a location or income are skipped; if an earlier run wrote a summary for
+    them, it is deleted.
+
+    Rebates are read from Firestore unless given (e.g. from a snapshot file).
+    Users are read a chunk at a time; each chunk is one vectorized matrix,
+    and its writes are committed in batches on a thread pool while the next
+    chunk is read. Returns a summary with counts and throughput.
+    """
+    started = time.perf_counter()
+    if rebates is None:
+        rebates = ((doc.id, doc.to_dict() or {}) for doc in db.collection("rebates").stream())
+    matrix = RebateMatrix(rebates)
+    logger.info(f"Matching users against {len(matrix)} rebates in {len(matrix.codes)} locations.")
+    matches = db.collection(MATCHES_COLLECTION)
+
+    def commit(entries: List[Tuple[str, Optional[Dict[str, Any]]]]) -> None:
+        batch = db.batch()
+        for user_id, summary in entries:
+            if summary is None:
+                batch.delete(matches.document(user_id))
+            else:
+                batch.set(matches.document(user_id), summary)
+        batch.commit()
+
+    users = matched = skipped = written = cleared = failed = 0
+    total_amount = 0.0
+    match_seconds = 0.0
+    pending: Deque[Tuple[int, int, Future]] = deque()
+
+    def settle(sets: int, deletes: int, future: Future) -> None:
+        nonlocal written, cleared, failed
+        try:
+            future.result()
+            written += sets
+            cleared += deletes
+        except Exception as e:
+            failed += sets + deletes
+            logger.exception(f"Failed to commit a batch of {sets + deletes} rebate matches: {e}")
+
+    with ThreadPoolExecutor(max_workers=write_workers) as pool:
+        for chunk in stream_users(db, chunk_size):
+            chunk_started = time.perf_counter()
+            location, income, valid = matrix.encode_users([data for _, data in chunk])
+            summaries = matrix.summarize(matrix.eligible(location, income), valid)
+            match_seconds += time.perf_counter() - chunk_started
+
+            found = [s for s in summaries if s is not None]
+            entries = [(user_id, s) for (user_id, _), s in zip(chunk, summaries) if s is not None]
+            if not dry_run and len(found) < len(chunk):
+                # A None summary deletes the previous matches, so only skipped users that have some get one
+                stale = existing_matches(db, [user_id for (user_id, _), s in zip(chunk, summaries) if s is None])
+                entries += [(user_id, None) for user_id in sorted(stale)]
+            users += len(chunk)
+            skipped += len(chunk) - len(found)
+            matched += sum(1 for s in found if s["count"])
+            total_amount += sum(s["total_amount"] for s in found)
+            if not dry_run:
+                for i in range(0, len(entries), MAX_BATCH_SIZE):
+                    batch = entries[i:i + MAX_BATCH_SIZE]
+                    deletes = sum(1 for _, s in batch if s is None)
+                    pending.append((len(batch) - deletes, deletes, pool.submit(commit, batch)))
+            # Bounded, so summaries do not pile up in memory when writes are slower than reads
+            while len(pending) > 2 * write_workers:
+                settle(*pending.popleft())
+
+        while pending:
+            settle(*pending.popleft())
+
+    seconds = time.perf_counter() - started
+    report = {
+        "rebates": len(matrix),
+        "users": users,
+        "matched": matched,
+        "skipped": skipped,
+        "total_amount": round(total_amount, 2),
+        "written": written,
+        "cleared": cleared,
+        "failed": failed,
+        "match_seconds": round(match_seconds, 3),
+        "seconds": round(seconds, 3),
+        "users_per_second": round(users / seconds, 1) if seconds > 0 else 0.0,
+    }
+    logger.info(
+        f"Matched {users} users ({matched} with rebates, {skipped} skipped) worth ${report['total_amount']:,.0f}; "
+        f"wrote {written}, cleared {cleared}, {failed} failed in {report['seconds']}s ({report['users_per_second']} users/s)"
+    )
+    return report
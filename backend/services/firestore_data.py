@@ -0,0 +1,145 @@
+# backend/services/firestore_data.py
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from firebase_admin import firestore, firestore_async
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from services.metrics import track_dependency, track_stream
+from services.registry import registry
+from services.resilience import DependencyUnavailable
+from services.serialization import document_data
+
+logger = logging.getLogger(__name__)
+
+# Created once at startup and shared by every router
+_client = None
+
+
+# ----------------------------
+# Client lifecycle
+# ----------------------------
+async def init():
+    """
+    Creates the shared AsyncClient; called once by startup, inside the
+    server's event loop. The Firebase app is resolved in a worker thread,
+    since creating it parses credentials.
+    """
+    global _client
+    if _client is None:
+        app = await asyncio.to_thread(registry.get, "firebase")
+        if _client is None:
+            _client = firestore_async.client(app)
+            logger.info("Async Firestore client initialized.")
+    return _client
+
+
+def get_db():
+    """The shared AsyncClient. Raises DependencyUnavailable (a 503) until startup's `init` has run."""
+    if _client is None:
+        raise DependencyUnavailable("firestore", "client not initialized yet")
+    return _client
+
+
+def close() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+def _with_id(doc) -> Dict[str, Any]:
+    return {"id": doc.id, **document_data(doc)}
+
+
+# ----------------------------
+# Users & audits
+# ----------------------------
+async def get_user(user_id: str) -> Optional[Dict[str, Any]]:
+    with track_dependency("firestore", "get_user"):
+        doc = await get_db().collection("users").document(user_id).get()
+    return document_data(doc) if doc.exists else None
+
+
+def get_users(user_ids: List[str], fields: Optional[List[str]] = None) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    Yields (user_id, data) for each id as Firestore returns it (not in input
+    order); data is None for ids with no document. With `fields`, only those
+    field paths are transferred.
+    """
+    users = get_db().collection("users")
+    references = [users.document(user_id) for user_id in user_ids]
+    docs = get_db().get_all(references, field_paths=fields)
+    users = ((doc.id, document_data(doc) if doc.exists else None) async for doc in docs)
+    return track_stream("firestore", "get_users", users)
+
+
+async def get_latest_audit(user_id: str) -> Optional[Dict[str, Any]]:
+    """Returns the user's newest audit document, or None if they have none."""
+    query = get_db().collection("audits") \
+        .where("user_id", "==", user_id) \
+        .order_by("timestamp", direction=firestore.Query.DESCENDING) \
+        .limit(1)
+    with track_dependency("firestore", "get_latest_audit"):
+        async for doc in query.stream():
+            return document_data(doc)
+    return None
+
+
+async def get_carbon_summary(user_id: str) -> Optional[Dict[str, Any]]:
+    """The materialized carbon history summary (see services/carbon_history.py)."""
+    with track_dependency("firestore", "get_carbon_summary"):
+        doc = await get_db().collection("carbon_history").document(user_id).get()
+    return document_data(doc) if doc.exists else None
+
+
+async def get_carbon_entries(user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """The user's per-audit carbon history entries, newest first."""
+    query = get_db().collection("carbon_history").document(user_id).collection("entries") \
+        .order_by("timestamp", direction=firestore.Query.DESCENDING)
+    if limit is not None:
+        query = query.limit(limit)
+    with track_dependency("firestore", "get_carbon_entries"):
+        return [document_data(doc) async for doc in query.stream()]
+
+
+# ----------------------------
+# Catalogs
+# ----------------------------
+def _rebates_query(location: str, income: float, limit: Optional[int] = None, after: Optional[Tuple[float, str]] = None):
+    # Ordered by income_max, then document id, matching the rebate index and its cursors.
+    # A cursor (income_max, id) is applied by Firestore, so a page only reads its own documents.
+    query = get_db().collection("rebates") \
+        .where("location", "in", [location, "AUS"]) \
+        .where("income_max", ">=", income) \
+        .order_by("income_max") \
+        .order_by(FieldPath.document_id())
+    if after is not None:
+        query = query.start_after({"income_max": after[0], FieldPath.document_id(): after[1]})
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+async def query_rebates(location: str, income: float, limit: Optional[int] = None,
+                        after: Optional[Tuple[float, str]] = None) -> List[Dict[str, Any]]:
+    """State-specific and federal ("AUS") rebates with income_max >= income, after the `after` sort key."""
+    with track_dependency("firestore", "query_rebates"):
+        return [_with_id(doc) async for doc in _rebates_query(location, income, limit, after).stream()]
+
+
+def stream_rebates(location: str, income: float, limit: Optional[int] = None,
+                   after: Optional[Tuple[float, str]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Same as `query_rebates`, but yields each rebate as Firestore returns it."""
+    docs = _rebates_query(location, income, limit, after).stream()
+    return track_stream("firestore", "stream_rebates", (_with_id(doc) async for doc in docs))
+
+
+async def query_contractors(location: str, services: List[str]) -> List[Dict[str, Any]]:
+    """Contractors in `location` or "AUS" offering at least one of `services`."""
+    query = get_db().collection("contractors") \
+        .where("location", "in", [location, "AUS"]) \
+        .where("services", "array_contains_any", services)
+    with track_dependency("firestore", "query_contractors"):
+        return [_with_id(doc) async for doc in query.stream()]
@@ -0,0 +1,233 @@
+# backend/services/geo.py
+import csv
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# CSV of postcode centroids (postcode,latitude,longitude); postcodes are unresolvable without it
+POSTCODES_PATH = os.getenv("POSTCODES_PATH")
+# Nearest-k searches over at most this many candidate points skip the grid and measure them all
+GEO_BRUTE_FORCE_POINTS = int(os.getenv("GEO_BRUTE_FORCE_POINTS", 1024))
+
+Point = Tuple[float, float]  # (latitude, longitude) in degrees
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km from one point to arrays of points (all in degrees)."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# ----------------------------
+# Postcodes
+# ----------------------------
+class PostcodeTable:
+    """Postcode -> centroid, read from a CSV on first use."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._points: Optional[Dict[str, Point]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Point]:
+        points: Dict[str, Point] = {}
+        if not self.path:
+            return points
+        try:
+            with open(self.path, newline="") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        points[row["postcode"].strip()] = (float(row["latitude"]), float(row["longitude"]))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+            logger.info(f"Loaded {len(points)} postcode centroids from {self.path}.")
+        except OSError as e:
+            logger.error(f"Failed to read postcode centroids from {self.path}: {e}")
+        return points
+
+    def get(self, postcode: Any) -> Optional[Point]:
+        if self._points is None:
+            with self._lock:
+                if self._points is None:
+                    self._points = self._load()
+        return self._points.get(str(postcode).strip())
+
+
+postcodes = PostcodeTable(POSTCODES_PATH)
+
+
+def _valid(lat: Any, lon: Any) -> Optional[Point]:
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (lat, lon)):
+        return None
+    if -90 <= lat <= 90 and -180 <= lon <= 180:
+        return float(lat), float(lon)
+    return None
+
+
+def document_point(data: Dict[str, Any]) -> Optional[Point]:
+    """
+    A document's coordinates: `lat`/`lon` fields, a `geo` point (stored as a
+    Firestore GeoPoint) or, failing those, its `postcode` centroid.
+    """
+    point = _valid(data.get("lat"), data.get("lon"))
+    if point is None and isinstance(data.get("geo"), dict):
+        point = _valid(data["geo"].get("latitude"), data["geo"].get("longitude"))
+    if point is None and data.get("postcode") is not None:
+        point = postcodes.get(data["postcode"])
+    return point
+
+
+# ----------------------------
+# Grid index
+# ----------------------------
+class GridIndex:
+    """
+    Immutable bucket grid over points, NumPy-backed.
+
+    Points are sorted by their `cell_deg` x `cell_deg` cell, so each occupied
+    cell is a contiguous range of the coordinate arrays. Queries visit only
+    the cells that can hold an answer and compute exact distances for the
+    points in them with one vectorized haversine.
+    """
+
+    def __init__(self, ids: Iterable[int], points: Iterable[Point], cell_deg: float):
+        self.cell_deg = cell_deg
+        ids = np.fromiter(ids, dtype=np.int64)
+        coords = np.array(list(points), dtype=np.float64).reshape(-1, 2)
+        rows = np.floor(coords[:, 0] / cell_deg).astype(np.int64)
+        cols = np.floor(coords[:, 1] / cell_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        self.ids, self.lats, self.lons = ids[order], coords[order, 0], coords[order, 1]
+        rows, cols = rows[order], cols[order]
+
+        self._cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        if len(order):
+            starts = np.flatnonzero(np.r_[True, (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])])
+            ends = np.r_[starts[1:], len(order)]
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self._cells[(int(rows[start]), int(cols[start]))] = (start, end)
+            self._row_range = (int(rows.min()), int(rows.max()))
+            self._col_range = (int(cols.min()), int(cols.max()))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def _gather(self, cells: Iterable[Tuple[int, int]]) -> np.ndarray:
+        ranges = [self._cells[c] for c in cells if c in self._cells]
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end) for start, end in ranges])
+
+    def _measure(self, lat: float, lon: float, positions: np.ndarray, allowed: Optional[np.ndarray]):
+        ids = self.ids[positions]
+        if allowed is not None:
+            keep = allowed[ids]
+            ids, positions = ids[keep], positions[keep]
+        return ids, haversine_km(lat, lon, self.lats[positions], self.lons[positions])
+
+    def within(self, lat: float, lon: float, radius_km: float, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids and distances of points within `radius_km`, nearest first. `allowed` masks ids."""
+        if not self._cells:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        dlat = radius_km / KM_PER_DEGREE
+        # Longitude degrees shrink towards the poles; use the widest latitude in range
+        widest = min(abs(lat) + dlat, 89.9)
+        dlon = min(radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest))), 180.0)
+        r0, r1 = self._cell_of(lat - dlat, 0)[0], self._cell_of(lat + dlat, 0)[0]
+        c0, c1 = self._cell_of(0, lon - dlon)[1], self._cell_of(0, lon + dlon)[1]
+        if (r1 - r0 + 1) * (c1 - c0 + 1) > len(self._cells):
+            # Big radius: cheaper to filter the occupied cells than to probe every cell in the box
+            cells = [c for c in self._cells if r0 <= c[0] <= r1 and c0 <= c[1] <= c1]
+        else:
+            cells = [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+        ids, distances = self._measure(lat, lon, self._gather(cells), allowed)
+        keep = distances <= radius_km
+        ids, distances = ids[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")
+        return ids[order], distances[order]
+
+    def _ring_cells(self, row: int, col: int, ring: int) -> List[Tuple[int, int]]:
+        """The cells on one ring around (row, col) that fall inside the occupied bounding box."""
+        if ring == 0:
+            return [(row, col)]
+        (r0, r1), (c0, c1) = self._row_range, self._col_range
+        cols = range(max(col - ring, c0), min(col + ring, c1) + 1)
+        rows = range(max(row - ring + 1, r0), min(row + ring - 1, r1) + 1)
+        cells = [(r, c) for r in (row - ring, row + ring) if r0 <= r <= r1 for c in cols]
+        cells += [(r, c) for c in (col - ring, col + ring) if c0 <= c <= c1 for r in rows]
+        return cells
+
+    def nearest(self, lat: float, lon: float, k: int, allowed: Optional[np.ndarray] = None,
+                max_km: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The `k` nearest points (optionally no further than `max_km`), nearest first.
+
+        Searches rings of cells outward, from the first ring that reaches the
+        occupied cells to the one that covers them all, until the k-th
+        distance is closer than anything an unvisited ring could hold. When
+        `allowed` leaves few points, or the rings have passed over more points
+        than it allows, the allowed points are all measured instead.
+        """
+        if not self._cells or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        mask = None if allowed is None else allowed[self.ids]
+        candidates = len(self.ids) if mask is None else int(np.count_nonzero(mask))
+        k = min(k, candidates)
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        if candidates <= GEO_BRUTE_FORCE_POINTS:
+            return self._closest(lat, lon, mask, k, max_km)
+
+        row, col = self._cell_of(lat, lon)
+        (r0, r1), (c0, c1) = self._row_range, self._col_range
+        first = max(r0 - row, row - r1, c0 - col, col - c1, 0)
+        last = max(abs(row - r0), abs(row - r1), abs(col - c0), abs(col - c1))
+        position_parts: List[np.ndarray] = []
+        distance_parts: List[np.ndarray] = []
+        found = scanned = 0
+        for ring in range(first, last + 1):
+            positions = self._gather(self._ring_cells(row, col, ring))
+            scanned += len(positions)
+            if scanned > candidates:
+                return self._closest(lat, lon, mask, k, max_km)
+            if mask is not None:
+                positions = positions[mask[positions]]
+            if len(positions):
+                position_parts.append(positions)
+                distance_parts.append(haversine_km(lat, lon, self.lats[positions], self.lons[positions]))
+                found += len(positions)
+            # Anything outside the visited rings is at least this far away
+            widest = min(abs(lat) + (ring + 1) * self.cell_deg, 89.9)
+            covered = ring * self.cell_deg * KM_PER_DEGREE * math.cos(math.radians(widest))
+            if found >= k and np.partition(np.concatenate(distance_parts), k - 1)[k - 1] <= covered:
+                break
+            if max_km is not None and covered >= max_km:
+                break
+        if not position_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return self._select(np.concatenate(position_parts), np.concatenate(distance_parts), k, max_km)
+
+    def _closest(self, lat: float, lon: float, mask: Optional[np.ndarray], k: int, max_km: Optional[float]):
+        positions = np.arange(len(self.ids)) if mask is None else np.flatnonzero(mask)
+        return self._select(positions, haversine_km(lat, lon, self.lats[positions], self.lons[positions]), k, max_km)
+
+    def _select(self, positions: np.ndarray, distances: np.ndarray, k: int, max_km: Optional[float]):
+        if max_km is not None:
+            keep = distances <= max_km
+            positions, distances = positions[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")[:k]
+        return self.ids[positions[order]], distances[order]
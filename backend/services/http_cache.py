@@ -0,0 +1,36 @@
+# backend/services/http_cache.py
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+# Catalog responses may be kept by the client but must be revalidated with If-None-Match
+CATALOG_MAX_AGE_SECONDS = int(os.getenv("CATALOG_MAX_AGE_SECONDS", 0))
+CATALOG_CACHE_CONTROL = f"private, max-age={CATALOG_MAX_AGE_SECONDS}, must-revalidate"
+
+
+def make_etag(version: str, params: Any) -> str:
+    """Strong ETag for one response: the data version plus the (JSON-able) request parameters."""
+    raw = json.dumps([version, params], sort_keys=True, default=str)
+    return '"' + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix on the client's tag is ignored."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client already holds `etag`, otherwise None."""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
@@ -0,0 +1,274 @@
+# backend/services/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from starlette.routing import Match
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# ----------------------------
+# Metric types
+# ----------------------------
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        lines = self._header()
+        names = self.labelnames + ("le",)
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Reads its samples from `collect()` at scrape time, e.g. cache hit counters."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], kind: str,
+                 collect: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def render(self) -> List[str]:
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self._collect().items())
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests = REGISTRY.counter(
+    "veridian_http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"))
+http_latency = REGISTRY.histogram(
+    "veridian_http_request_duration_seconds", "HTTP request latency, including streaming the body.", ("method", "route"))
+http_in_flight = REGISTRY.gauge(
+    "veridian_http_requests_in_flight", "HTTP requests currently being handled.", ("method", "route"))
+dependency_calls = REGISTRY.counter(
+    "veridian_dependency_calls_total", "Calls to external dependencies by outcome.", ("dependency", "operation", "outcome"))
+dependency_latency = REGISTRY.histogram(
+    "veridian_dependency_duration_seconds", "Latency of calls to external dependencies.", ("dependency", "operation"))
+
+
+# Caches report their own counters; they are read at scrape time
+_caches: Dict[str, Callable[[], Dict[str, int]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, int]]) -> None:
+    """Exposes a cache's `stats()` (hits, misses, size) under the given cache label."""
+    _caches[name] = stats
+
+
+def _cache_stat(key: str) -> Callable[[], Dict[LabelValues, float]]:
+    return lambda: {(name,): stats().get(key, 0) for name, stats in list(_caches.items())}
+
+
+REGISTRY.register(CallbackMetric("veridian_cache_hits_total", "Cache hits.", ("cache",), "counter", _cache_stat("hits")))
+REGISTRY.register(CallbackMetric("veridian_cache_misses_total", "Cache misses.", ("cache",), "counter", _cache_stat("misses")))
+REGISTRY.register(CallbackMetric("veridian_cache_entries", "Entries currently cached.", ("cache",), "gauge", _cache_stat("size")))
+
+
+@contextmanager
+def track_dependency(dependency: str, operation: str) -> Iterator[None]:
+    """Times the enclosed block (sync or async code) as one call to `dependency`."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        dependency_latency.observe(dependency, operation, value=time.perf_counter() - started)
+        dependency_calls.inc(dependency, operation, outcome)
+
+
+async def track_stream(dependency: str, operation: str, items: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """
+    Yields from `items` and records them as one call to `dependency`. Only the
+    time spent waiting for items counts, not the time the consumer spends on
+    each one, and a consumer that stops early (closing the stream) is ok.
+    """
+    iterator = items.__aiter__()
+    waited = 0.0
+    outcome = "error"
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                waited += time.perf_counter() - started
+            try:
+                yield item
+            except GeneratorExit:
+                outcome = "ok"
+                raise
+        outcome = "ok"
+    finally:
+        dependency_latency.observe(dependency, operation, value=waited)
+        dependency_calls.inc(dependency, operation, outcome)
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+# ----------------------------
+# ASGI middleware
+# ----------------------------
+class MetricsMiddleware:
+    """
+    Records latency, status codes and in-flight requests per route template
+    (e.g. "/users/{user_id}"), so ids in paths don't create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _route_for(self, scope) -> str:
+        router = scope["app"].router
+        for route in router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_for(scope)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc(method, route)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method, route)
+            http_latency.observe(method, route, value=time.perf_counter() - started)
+            http_requests.inc(method, route, str(status))
@@ -0,0 +1,124 @@
+# backend/services/pagination.py
+import base64
+import json
+from bisect import bisect_right
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi.responses import StreamingResponse
+
+from services.serialization import dumps
+
+SortKey = Tuple[float, str]
+Item = Dict[str, Any]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Lines per chunk when streaming from memory; Firestore-backed streams send each document as it arrives
+NDJSON_BATCH_SIZE = 64
+
+
+# ----------------------------
+# Cursors
+# ----------------------------
+def encode_cursor(key: SortKey) -> str:
+    """Opaque cursor for the item with sort key `key`; the next page starts after it."""
+    raw = json.dumps([key[0], key[1]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Raises ValueError if the cursor was not produced by `encode_cursor`."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, doc_id = json.loads(raw)
+        return (float(value), str(doc_id))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def paginate_sorted(
+    items: List[Item],
+    key: Callable[[Item], SortKey],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Item], Optional[str]]:
+    """
+    Returns the page of `items` (already sorted by `key`) after `cursor`,
+    with the cursor for the next page (None when there are no more results).
+    """
+    start = bisect_right(items, decode_cursor(cursor), key=key) if cursor else 0
+    if limit is None:
+        return items[start:], None
+    page = items[start:start + limit]
+    has_more = start + limit < len(items)
+    return page, encode_cursor(key(page[-1])) if has_more and page else None
+
+
+# ----------------------------
+# NDJSON streaming
+# ----------------------------
+def ndjson_line(item: Any) -> bytes:
+    return dumps(item) + b"\n"
+
+
+async def stream_page(
+    items: Union[Iterable[Item], AsyncIterator[Item]],
+    key: Callable[[Item], SortKey],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yields one page of `items` (sorted by `key`) as NDJSON: one document per
+    line, then a final {"done": true, "count": n, "next_cursor": ...} line.
+
+    Async iterables (Firestore streams) are forwarded document by document;
+    in-memory lists are sent in chunks of NDJSON_BATCH_SIZE lines. A cursor
+    given here is applied by skipping items, so Firestore queries should
+    start after it themselves (`start_after`) and pass no cursor.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    is_async = hasattr(items, "__aiter__")
+    if not is_async and after is not None and isinstance(items, list):
+        items = items[bisect_right(items, after, key=key):]
+        after = None
+    batch_size = 1 if is_async else NDJSON_BATCH_SIZE
+
+    count, last_key, next_cursor = 0, None, None
+    buffer: List[bytes] = []
+
+    async def source():
+        if is_async:
+            try:
+                async for item in items:
+                    yield item
+            finally:
+                if hasattr(items, "aclose"):
+                    await items.aclose()
+        else:
+            for item in items:
+                yield item
+
+    documents = source()
+    try:
+        async for item in documents:
+            item_key = key(item)
+            if after is not None and item_key <= after:
+                continue
+            if limit is not None and count == limit:
+                next_cursor = encode_cursor(last_key)
+                break
+            buffer.append(ndjson_line(item))
+            count, last_key = count + 1, item_key
+            if len(buffer) >= batch_size:
+                yield b"".join(buffer)
+                buffer.clear()
+    finally:
+        # Stops the underlying Firestore stream once the page is full
+        await documents.aclose()
+
+    buffer.append(ndjson_line({"done": True, "count": count, "next_cursor": next_cursor}))
+    yield b"".join(buffer)
+
+
+def ndjson_response(lines: AsyncIterator[bytes], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers=headers)
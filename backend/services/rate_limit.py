@@ -0,0 +1,135 @@
+# backend/services/rate_limit.py
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Deque
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Sliding-window limiter: at most `max_requests` per key within `window_seconds`."""
+
+    def __init__(self, max_requests: int, window_seconds: float):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+
+    async def hit(self, key: str) -> bool:
+        """Records a request for `key`. Returns False (and records nothing) if it is over the limit."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+# ----------------------------
+# In-memory backend
+# ----------------------------
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Per-process limiter for single-worker deployments and local development.
+
+    Keys are kept in least-recently-active order, so keys idle for a whole
+    window are evicted on the next hit, and `max_keys` caps memory under a
+    flood of distinct users.
+    """
+
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: float,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(max_requests, window_seconds)
+        self.max_keys = max_keys
+        self._clock = clock
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    async def hit(self, key: str) -> bool:
+        now = self._clock()
+        cutoff = now - self.window_seconds
+        hits = self._hits.pop(key, None)
+        if hits is None:
+            hits = deque(maxlen=self.max_requests)
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+
+        allowed = len(hits) < self.max_requests
+        if allowed:
+            hits.append(now)
+        self._hits[key] = hits
+        self._evict(cutoff)
+        return allowed
+
+    def _evict(self, cutoff: float) -> None:
+        while self._hits:
+            oldest_key, oldest_hits = next(iter(self._hits.items()))
+            idle = not oldest_hits or oldest_hits[-1] <= cutoff
+            if not idle and len(self._hits) <= self.max_keys:
+                break
+            del self._hits[oldest_key]
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+
+# ----------------------------
+# Redis backend
+# ----------------------------
+# Trims the key's sorted set to the window and adds the request only if there
+# is room, all atomically. Uses the Redis clock so every worker agrees on "now".
+_SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local window_us = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local member = ARGV[3]
+local t = redis.call('TIME')
+local now_us = tonumber(t[1]) * 1000000 + tonumber(t[2])
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now_us - window_us)
+if redis.call('ZCARD', key) >= limit then
+    return 0
+end
+redis.call('ZADD', key, now_us, member)
+redis.call('PEXPIRE', key, math.ceil(window_us / 1000))
+return 1
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Limiter shared by every worker through a Redis sorted set per key.
+
+    If Redis is unreachable the request is allowed and a warning is logged,
+    so a limiter outage never takes the endpoint down with it.
+    """
+
+    def __init__(self, client, max_requests: int, window_seconds: float, prefix: str = "ratelimit:"):
+        super().__init__(max_requests, window_seconds)
+        self.prefix = prefix
+        self._client = client
+        self._script = client.register_script(_SLIDING_WINDOW_LUA)
+
+    @classmethod
+    async def from_url(cls, url: str, max_requests: int, window_seconds: float, **kwargs) -> "RedisRateLimiter":
+        """Connects to `url` and checks the connection with a PING."""
+        import redis.asyncio as redis
+
+        client = redis.from_url(url)
+        await client.ping()
+        return cls(client, max_requests, window_seconds, **kwargs)
+
+    async def hit(self, key: str) -> bool:
+        try:
+            allowed = await self._script(
+                keys=[self.prefix + key],
+                args=[int(self.window_seconds * 1_000_000), self.max_requests, uuid.uuid4().hex],
+            )
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, allowing request: {e}")
+            return True
+        return bool(allowed)
+
+    async def close(self) -> None:
+        await self._client.aclose()
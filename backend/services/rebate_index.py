@@ -0,0 +1,137 @@
+# backend/services/rebate_index.py
+import heapq
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.snapshot_index import SnapshotIndex
+from services.text_search import BM25Index
+
+NATIONAL_LOCATION = "AUS"
+
+# Name words count this many times a description word in search ranking
+NAME_WEIGHT = 3
+
+
+class _Bucket:
+    """All rebates for one location, sorted by `income_max` (ascending)."""
+
+    __slots__ = ("income_max", "rebates")
+
+    def __init__(self, entries: List[Tuple[float, str, Dict[str, Any]]]):
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self.income_max = [e[0] for e in entries]
+        self.rebates = [e[2] for e in entries]
+
+
+def location_code(location: str) -> str:
+    """State code from a profile location, e.g. "NSW" or "NSW, 2000" -> "NSW"."""
+    return location.split(",")[0].strip().upper()
+
+
+def rebate_key(rebate: Dict[str, Any]) -> Tuple[float, str]:
+    """Sort (and cursor) key: income_max, ties broken by document id."""
+    return (float(rebate["income_max"]), rebate["id"])
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else ""
+
+
+class RebateIndex(SnapshotIndex):
+    """
+    In-memory eligibility index over the `rebates` collection.
+
+    Mirrors the Firestore query `location in [loc, "AUS"] and income_max >= income`:
+    each location bucket is bisected on `income_max`, and the user's bucket is
+    merged with the national one so results stay ordered by `rebate_key`.
+
+    Names and descriptions also feed a BM25 full-text index, updated per
+    changed document, for `search`.
+    """
+
+    collection_name = "rebates"
+
+    def __init__(self):
+        super().__init__()
+        self._buckets: Dict[str, _Bucket] = {}
+        self._locations: Dict[str, str] = {}
+        self._text = BM25Index()
+
+    def _rebuild(self, touched: Iterable[str]) -> None:
+        stale = set()
+        text_updates = []
+        for doc_id in touched:
+            if doc_id in self._locations:
+                stale.add(self._locations.pop(doc_id))
+            data = self._docs.get(doc_id)
+            text_updates.append((doc_id, None if data is None else [
+                (_text(data.get("name")), NAME_WEIGHT), (_text(data.get("description")), 1),
+            ]))
+            # Firestore skips documents whose income_max is missing or not a number.
+            if data is not None and _is_number(data.get("income_max")):
+                location = data.get("location")
+                self._locations[doc_id] = location
+                stale.add(location)
+        self._text.update_many(text_updates)
+
+        grouped: Dict[str, List[Tuple[float, str, Dict[str, Any]]]] = {loc: [] for loc in stale}
+        for doc_id, location in self._locations.items():
+            if location in grouped:
+                data = self._docs[doc_id]
+                grouped[location].append((data["income_max"], doc_id, {"id": doc_id, **data}))
+
+        buckets = dict(self._buckets)
+        for location, entries in grouped.items():
+            if entries:
+                buckets[location] = _Bucket(entries)
+            else:
+                buckets.pop(location, None)
+        self._buckets = buckets
+
+    def query(self, location: str, income: float) -> List[Dict[str, Any]]:
+        """Returns rebates for `location` and national rebates with income_max >= income."""
+        buckets = self._buckets
+        matches = []
+        for loc in dict.fromkeys([location, NATIONAL_LOCATION]):
+            bucket = buckets.get(loc)
+            if bucket is None:
+                continue
+            start = bisect_left(bucket.income_max, income)
+            matches.append(bucket.rebates[start:])
+        if len(matches) == 1:
+            return list(matches[0])
+        return list(heapq.merge(*matches, key=rebate_key))
+
+    def search(
+        self,
+        text: str,
+        location: Optional[str] = None,
+        income: Optional[float] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rebates whose name or description matches `text`, best BM25 score
+        first, each with its `score`. With a location and/or income, only
+        rebates passing the same eligibility rules as `query` are searched.
+        """
+        docs = self._docs
+        scores = self._text.search(text)
+        results = []
+        for doc_id, score in scores.items():
+            data = docs.get(doc_id)
+            if data is None:
+                continue
+            if location is not None and data.get("location") not in (location, NATIONAL_LOCATION):
+                continue
+            if income is not None and not (_is_number(data.get("income_max")) and data["income_max"] >= income):
+                continue
+            results.append((-score, doc_id, data))
+        top = heapq.nsmallest(limit, results)
+        return [{"id": doc_id, **data, "score": round(-score, 4)} for score, doc_id, data in top]
+
+
+rebate_index = RebateIndex()
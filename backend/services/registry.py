@@ -0,0 +1,134 @@
+# backend/services/registry.py
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from services.metrics import REGISTRY, CallbackMetric
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+
+class _Service:
+    __slots__ = ("name", "factory", "required", "instance", "error", "seconds", "lock")
+
+    def __init__(self, name: str, factory: Callable[[], Any], required: bool):
+        self.name = name
+        self.factory = factory
+        self.required = required
+        self.instance: Any = _UNSET
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.lock = threading.Lock()
+
+
+class ServiceRegistry:
+    """
+    Named, lazily created process-wide dependencies (Firebase, Gemini, ...).
+
+    `get(name)` runs the factory on first use, once, even under concurrent
+    callers; a factory that raises is retried on the next `get`. Startup calls
+    `warm_up()` to create everything in parallel worker threads, so requests
+    rarely pay the cost. Required services decide `ready`; optional ones
+    (e.g. Gemini without an API key) only show up in `status()`.
+    """
+
+    def __init__(self):
+        self._services: Dict[str, _Service] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], required: bool = True) -> None:
+        self._services[name] = _Service(name, factory, required)
+
+    def override(self, name: str, instance: Any) -> Callable[[], None]:
+        """
+        Replaces a service with a ready-made instance (benchmarks, tests).
+        Returns a callable that puts the previous service back.
+        """
+        previous = self._services.get(name)
+        if previous is None:
+            service = _Service(name, lambda: instance, True)
+        else:
+            service = _Service(name, previous.factory, previous.required)
+        service.instance, service.seconds = instance, 0.0
+        self._services[name] = service
+
+        def restore() -> None:
+            if previous is None:
+                self._services.pop(name, None)
+            else:
+                self._services[name] = previous
+        return restore
+
+    def get(self, name: str) -> Any:
+        service = self._services[name]
+        instance = service.instance
+        if instance is not _UNSET:
+            return instance
+        with service.lock:
+            if service.instance is _UNSET:
+                started = time.perf_counter()
+                try:
+                    service.instance = service.factory()
+                    service.error = None
+                except Exception as e:
+                    service.error = str(e)
+                    raise
+                finally:
+                    service.seconds = time.perf_counter() - started
+                logger.info(f"Initialized service '{name}' in {service.seconds * 1000:.0f}ms.")
+            return service.instance
+
+    def initialized(self, name: str) -> bool:
+        """Whether `get(name)` would return without running the factory."""
+        return self._services[name].instance is not _UNSET
+
+    async def warm_up(self, names: Optional[Iterable[str]] = None) -> None:
+        """Initializes the given (default: all) services concurrently, off the event loop."""
+        names = list(names) if names is not None else list(self._services)
+
+        async def init(name: str) -> None:
+            try:
+                await asyncio.to_thread(self.get, name)
+            except Exception as e:
+                log = logger.error if self._services[name].required else logger.warning
+                log(f"Failed to initialize service '{name}': {e}")
+
+        await asyncio.gather(*(init(name) for name in names))
+
+    @property
+    def ready(self) -> bool:
+        return all(s.instance is not _UNSET for s in self._services.values() if s.required)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            s.name: {
+                "ready": s.instance is not _UNSET,
+                "required": s.required,
+                "init_ms": round(s.seconds * 1000, 1) if s.seconds is not None else None,
+                "error": s.error,
+            }
+            for s in self._services.values()
+        }
+
+
+registry = ServiceRegistry()
+
+
+def _firebase_app():
+    # Parses credentials and initializes the default Firebase app
+    from config.db import get_app
+    return get_app()
+
+
+registry.register("firebase", _firebase_app)
+
+
+def _init_seconds() -> Dict[tuple, float]:
+    return {(name,): s["init_ms"] / 1000 for name, s in registry.status().items() if s["init_ms"] is not None}
+
+
+REGISTRY.register(CallbackMetric(
+    "veridian_service_init_seconds", "Time taken to initialize each service.", ("service",), "gauge", _init_seconds))
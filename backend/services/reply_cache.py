@@ -0,0 +1,58 @@
+# backend/services/reply_cache.py
+import hashlib
+import json
+import re
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from services.cache import SingleFlight, TTLCache
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = " .!?"
+
+
+def normalize_message(message: str) -> str:
+    """Case-folds and collapses whitespace so trivially different phrasings share a key."""
+    return _WHITESPACE.sub(" ", message.casefold()).strip().rstrip(_TRAILING_PUNCTUATION)
+
+
+class ReplyCache:
+    """
+    Caches AI replies by (normalized message, rendered household context,
+    conversation so far), so follow-ups in different conversations never share
+    a reply.
+
+    Misses for the same key that arrive while a reply is being generated wait
+    for that one upstream call instead of starting their own.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+        self._flight = SingleFlight()
+        self.coalesced = 0
+
+    @staticmethod
+    def key(message: str, context: str, history: Sequence[Tuple[str, str]] = ()) -> str:
+        raw = json.dumps([normalize_message(message), context, list(history)], separators=(",", ":"))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, reply: str) -> None:
+        self._cache.set(key, reply)
+
+    async def get_or_generate(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        reply = self._cache.get(key)
+        if reply is not None:
+            return reply
+        if key in self._flight:
+            self.coalesced += 1
+        return await self._flight.do(key, lambda: self._generate_and_store(key, generate))
+
+    async def _generate_and_store(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        reply = await generate()
+        self._cache.set(key, reply)
+        return reply
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._cache.stats(), "coalesced": self.coalesced, "inflight": len(self._flight)}
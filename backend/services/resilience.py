@@ -0,0 +1,366 @@
+# backend/services/resilience.py
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from services.metrics import REGISTRY, CallbackMetric
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DependencyUnavailable(Exception):
+    """A call was refused or abandoned by a guard; `retry_after` is a hint in seconds."""
+
+    def __init__(self, dependency: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"{dependency} unavailable: {reason}")
+        self.dependency = dependency
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(DependencyUnavailable):
+    pass
+
+
+class BulkheadFullError(DependencyUnavailable):
+    pass
+
+
+class DeadlineExceededError(DependencyUnavailable):
+    pass
+
+
+# ----------------------------
+# Bulkhead
+# ----------------------------
+class Bulkhead:
+    """
+    Caps concurrent calls to one dependency. Callers wait at most
+    `queue_timeout` seconds for a slot, and no more than `max_waiting` wait at
+    once; everyone else is refused straight away with BulkheadFullError.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, queue_timeout: float, max_waiting: Optional[int] = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.max_waiting = max_concurrent * 2 if max_waiting is None else max_waiting
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked():
+            if self.waiting >= self.max_waiting:
+                self._reject()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def _reject(self):
+        self.rejected += 1
+        raise BulkheadFullError(self.name, "too many concurrent calls")
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+# ----------------------------
+# Circuit breaker
+# ----------------------------
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over the outcomes of the last `window` calls.
+
+    The circuit opens once at least `min_calls` outcomes are recorded and the
+    share of failures reaches `failure_rate`, or the share of calls slower than
+    `slow_call_seconds` reaches `slow_rate`. While open, calls fail fast. After
+    `open_seconds` it lets `half_open_calls` probes through: if they all succeed
+    (and are not slow) it closes, otherwise it opens again.
+
+    Meant to be used from the event loop only.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)  # (failed, slow)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes = self._probe_successes = 0
+            logger.info(f"Circuit {self.name} half-open; probing.")
+        return self._state
+
+    def before_call(self) -> bool:
+        """
+        Raises CircuitOpenError if the call may not go ahead. Returns True if
+        the call is a half-open probe; pass that flag to the `on_*` methods.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return False
+        if state == self.HALF_OPEN and self._probes < self.half_open_calls:
+            self._probes += 1
+            return True
+        self.rejected += 1
+        retry_after = self._opened_at + self.open_seconds - self._clock() if state == self.OPEN else 1.0
+        raise CircuitOpenError(self.name, "circuit open", max(1.0, retry_after))
+
+    def on_success(self, duration: float, probe: bool) -> None:
+        slow = duration >= self.slow_call_seconds
+        if probe:
+            if self._state != self.HALF_OPEN:
+                return
+            self._probes -= 1
+            if slow:
+                self._trip("slow probe")
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                logger.info(f"Circuit {self.name} closed.")
+        elif self._state == self.CLOSED:
+            self._record(False, slow)
+
+    def on_failure(self, probe: bool) -> None:
+        if probe:
+            if self._state == self.HALF_OPEN:
+                self._trip("failed probe")
+        elif self._state == self.CLOSED:
+            self._record(True, False)
+
+    def on_cancel(self, probe: bool) -> None:
+        """The call ended without an outcome (e.g. the client went away)."""
+        if probe and self._state == self.HALF_OPEN:
+            self._probes -= 1
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        self._outcomes.append((failed, slow))
+        n = len(self._outcomes)
+        if n < self.min_calls:
+            return
+        failures = sum(f for f, _ in self._outcomes)
+        slow_calls = sum(s for _, s in self._outcomes)
+        if failures >= self.failure_rate * n:
+            self._trip(f"{failures}/{n} calls failed")
+        elif slow_calls >= self.slow_rate * n:
+            self._trip(f"{slow_calls}/{n} calls slower than {self.slow_call_seconds}s")
+
+    def _trip(self, reason: str) -> None:
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self._probes = self._probe_successes = 0
+        self.opened += 1
+        logger.warning(f"Circuit {self.name} opened ({reason}); failing fast for {self.open_seconds}s.")
+
+
+# ----------------------------
+# Guard
+# ----------------------------
+class Lease:
+    """One admitted call: a bulkhead slot and, in half-open, a probe."""
+
+    __slots__ = ("probe", "settled", "released")
+
+    def __init__(self, probe: bool):
+        self.probe = probe
+        self.settled = False
+        self.released = False
+
+
+class DependencyGuard:
+    """
+    Bulkhead + deadline + circuit breaker around calls to one async dependency.
+
+    `call()` covers request/response calls. Streams hold their slot for the
+    whole stream: `acquire()` before starting, `run()` for the call that opens
+    it, `iterate()` over the chunks and `release()` at the end.
+    `is_failure` decides which exceptions count against the breaker (e.g. not
+    a rejected prompt); timeouts always do.
+    """
+
+    def __init__(self, name: str, bulkhead: Bulkhead, breaker: CircuitBreaker, timeout: float,
+                 is_failure: Callable[[BaseException], bool] = lambda e: True):
+        self.name = name
+        self.bulkhead = bulkhead
+        self.breaker = breaker
+        self.timeout = timeout
+        self.is_failure = is_failure
+        _guards[name] = self
+
+    async def acquire(self) -> Lease:
+        lease = Lease(self.breaker.before_call())
+        try:
+            await self.bulkhead.acquire()
+        except BaseException:
+            self.breaker.on_cancel(lease.probe)
+            raise
+        return lease
+
+    def release(self, lease: Lease) -> None:
+        """Gives the slot back; safe to call more than once."""
+        if lease.released:
+            return
+        lease.released = True
+        self.bulkhead.release()
+        if not lease.settled:
+            lease.settled = True
+            self.breaker.on_cancel(lease.probe)
+
+    def _failed(self, lease: Lease) -> None:
+        lease.settled = True
+        self.breaker.on_failure(lease.probe)
+
+    def _succeeded(self, lease: Lease, duration: float) -> None:
+        lease.settled = True
+        self.breaker.on_success(duration, lease.probe)
+
+    async def run(self, fn: Callable[[], Awaitable[T]], lease: Lease, timeout: Optional[float] = None) -> T:
+        """Runs `fn` under the deadline and records the outcome; `lease` is the caller's slot."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(timeout):
+                result = await fn()
+        except TimeoutError:
+            self._failed(lease)
+            raise DeadlineExceededError(self.name, f"no response within {timeout}s")
+        except Exception as e:
+            if self.is_failure(e):
+                self._failed(lease)
+            else:
+                self._succeeded(lease, time.monotonic() - started)
+            raise
+        self._succeeded(lease, time.monotonic() - started)
+        return result
+
+    async def call(self, fn: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        lease = await self.acquire()
+        try:
+            return await self.run(fn, lease, timeout)
+        finally:
+            self.release(lease)
+
+    async def iterate(self, items: AsyncIterator[T], lease: Lease, idle_timeout: Optional[float] = None) -> AsyncIterator[T]:
+        """
+        Yields from a stream opened with `run`, failing if an item takes longer
+        than `idle_timeout` to arrive. Only errors are recorded; the opening
+        call already counted as the stream's outcome. Closing the returned
+        generator closes `items`.
+        """
+        idle_timeout = self.timeout if idle_timeout is None else idle_timeout
+        iterator = items.__aiter__()
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(idle_timeout):
+                        item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    self._failed(lease)
+                    raise DeadlineExceededError(self.name, f"stream stalled for {idle_timeout}s")
+                except Exception as e:
+                    if self.is_failure(e):
+                        self._failed(lease)
+                    raise
+                yield item
+        finally:
+            # Closing this generator (e.g. the client went away) closes the upstream stream too
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "active": self.bulkhead.active,
+            "waiting": self.bulkhead.waiting,
+            "bulkhead_rejected": self.bulkhead.rejected,
+            "circuit_rejected": self.breaker.rejected,
+            "circuit_opened": self.breaker.opened,
+        }
+
+
+def retry_after_header(e: DependencyUnavailable) -> Dict[str, str]:
+    return {"Retry-After": str(math.ceil(e.retry_after))}
+
+
+# Guards report their own state; it is read at scrape time
+_guards: Dict[str, DependencyGuard] = {}
+_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+
+def _guard_stat(read: Callable[[DependencyGuard], float]) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    return lambda: {(name,): read(guard) for name, guard in list(_guards.items())}
+
+
+REGISTRY.register(CallbackMetric(
+    "veridian_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ("dependency",), "gauge",
+    _guard_stat(lambda g: _STATE_VALUES[g.breaker.state])))
+REGISTRY.register(CallbackMetric(
+    "veridian_circuit_opened_total", "Times the circuit breaker opened.", ("dependency",), "counter",
+    _guard_stat(lambda g: g.breaker.opened)))
+REGISTRY.register(CallbackMetric(
+    "veridian_circuit_rejected_total", "Calls refused because the circuit was open.", ("dependency",), "counter",
+    _guard_stat(lambda g: g.breaker.rejected)))
+REGISTRY.register(CallbackMetric(
+    "veridian_bulkhead_active", "Calls currently holding a bulkhead slot.", ("dependency",), "gauge",
+    _guard_stat(lambda g: g.bulkhead.active)))
+REGISTRY.register(CallbackMetric(
+    "veridian_bulkhead_waiting", "Calls waiting for a bulkhead slot.", ("dependency",), "gauge",
+    _guard_stat(lambda g: g.bulkhead.waiting)))
+REGISTRY.register(CallbackMetric(
+    "veridian_bulkhead_rejected_total", "Calls refused because the bulkhead was full.", ("dependency",), "counter",
+    _guard_stat(lambda g: g.bulkhead.rejected)))
@@ -0,0 +1,122 @@
+# backend/services/scenarios.py
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from services.carbon_model import AuditAnswers, EmissionTables, emission_tables
+
+# Answers a household can change by upgrading, with the words that identify a
+# rebate for that upgrade in its name or description. Dryer and dishwasher
+# ownership are lifestyle choices rather than upgrades, so they stay fixed.
+UPGRADES: Dict[str, Dict[str, Any]] = {
+    "has_solar": {"label": "Install solar panels", "keywords": ["solar"]},
+    "water_heater": {"label": "Upgrade the water heater", "keywords": ["hot water", "water heater", "heat pump"]},
+    "insulation": {"label": "Improve insulation", "keywords": ["insulation"]},
+    "hvac_age": {"label": "Replace heating/cooling", "keywords": ["heating", "cooling", "hvac", "air con", "reverse cycle"]},
+    "window_type": {"label": "Upgrade windows", "keywords": ["window", "glazing"]},
+    "fridge_age": {"label": "Replace the fridge", "keywords": ["fridge", "appliance"]},
+}
+
+
+def _rebate_amount(rebate: Dict[str, Any]) -> float:
+    amount = rebate.get("amount")
+    return float(amount) if isinstance(amount, (int, float)) and not isinstance(amount, bool) else 0.0
+
+
+def match_rebates(rebates: Sequence[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Upgrade field -> eligible rebates whose name or description mentions that upgrade."""
+    texts = [f"{r.get('name', '')} {r.get('description', '')}".casefold() for r in rebates]
+    return {
+        field: [r for r, text in zip(rebates, texts) if any(k in text for k in upgrade["keywords"])]
+        for field, upgrade in UPGRADES.items()
+    }
+
+
+class ScenarioSimulator:
+    """
+    Enumerates every upgrade combination reachable from one household's answers.
+
+    For each upgradable field, the reachable values are the current one plus
+    every option with lower emissions. The cartesian product of those choices
+    (at most a few thousand rows) is built as one code matrix and scored with
+    a single `EmissionTables.evaluate` call.
+    """
+
+    def __init__(self, tables: EmissionTables, upgrades: Dict[str, Dict[str, Any]]):
+        self.tables = tables
+        self.upgrades = upgrades
+        self.upgrade_fields = [tables.field_index[name] for name in upgrades]
+
+    def simulate(
+        self,
+        answers: AuditAnswers,
+        rebates_by_upgrade: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Returns the baseline emissions and the scenarios ranked by emissions
+        saved (fewer upgrades first on ties). With `rebates_by_upgrade`, each
+        scenario lists the rebates matching its upgrades and their total.
+        """
+        tables = self.tables
+        base = tables.encode([answers])[0]
+
+        columns, choices = [], []
+        for i in self.upgrade_fields:
+            field = tables.fields[i]
+            current = field.values[base[i]]
+            better = [code for code in range(len(field.options)) if field.values[code] < current]
+            if better:
+                columns.append(i)
+                choices.append(np.array([base[i], *better], dtype=np.intp))
+
+        codes = base[None, :].copy()
+        if columns:
+            grid = np.meshgrid(*choices, indexing="ij")
+            combos = np.stack([g.ravel() for g in grid], axis=1)
+            codes = np.repeat(base[None, :], len(combos), axis=0)
+            codes[:, columns] = combos
+
+        matrix = tables.evaluate(codes)
+        # Row 0 picks the current value for every field, i.e. the baseline
+        saved = matrix[0, -1] - matrix[:, -1]
+        changed = codes[:, columns] != base[columns]
+        n_changes = changed.sum(axis=1)
+        order = np.lexsort((n_changes, -saved))
+        order = order[n_changes[order] > 0]
+        if limit is not None:
+            order = order[:limit]
+
+        keys = tables.categories + ["total"]
+        scenarios = []
+        for row in order.tolist():
+            upgrades = {}
+            for j, i in enumerate(columns):
+                if changed[row, j]:
+                    field = tables.fields[i]
+                    upgrades[field.name] = field.options[codes[row, i]]
+            scenario = {
+                "upgrades": upgrades,
+                "labels": [self.upgrades[name]["label"] for name in upgrades],
+                "emissions": dict(zip(keys, matrix[row].tolist())),
+                "saved": float(saved[row]),
+            }
+            if rebates_by_upgrade is not None:
+                matched = {}
+                for name in upgrades:
+                    for rebate in rebates_by_upgrade.get(name, ()):
+                        matched.setdefault(rebate["id"], rebate)
+                scenario["rebates"] = [
+                    {"id": r["id"], "name": r.get("name"), "amount": _rebate_amount(r)} for r in matched.values()
+                ]
+                scenario["rebate_total"] = sum(_rebate_amount(r) for r in matched.values())
+            scenarios.append(scenario)
+
+        return {
+            "baseline": dict(zip(keys, matrix[0].tolist())),
+            "count": len(scenarios),
+            "scenarios": scenarios,
+        }
+
+
+scenario_simulator = ScenarioSimulator(emission_tables, UPGRADES)
@@ -0,0 +1,113 @@
+# backend/services/seeding.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Firestore accepts at most 500 writes per batch
+MAX_BATCH_SIZE = 500
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def diff_documents(
+    existing: Dict[str, Dict[str, Any]],
+    desired: Dict[str, Dict[str, Any]],
+    merge: bool = False,
+    prune: bool = False,
+) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Returns (created, updated, deleted) document ids.
+
+    With `merge`, a document only counts as changed if one of the desired
+    fields differs, mirroring `set(..., merge=True)`. With `prune`, documents
+    missing from `desired` are deleted.
+    """
+    created, updated = [], []
+    for doc_id, data in desired.items():
+        current = existing.get(doc_id)
+        if current is None:
+            created.append(doc_id)
+        elif merge:
+            if any(current.get(k, object()) != v for k, v in data.items()):
+                updated.append(doc_id)
+        elif current != data:
+            updated.append(doc_id)
+    deleted = [doc_id for doc_id in existing if doc_id not in desired] if prune else []
+    return created, updated, deleted
+
+
+def sync_collection(
+    db,
+    collection: str,
+    documents: List[Dict[str, Any]],
+    id_field: str = "id",
+    merge: bool = False,
+    prune: bool = False,
+    batch_size: int = MAX_BATCH_SIZE,
+    max_workers: int = 4,
+) -> Dict[str, Any]:
+    """
+    Makes `collection` match `documents`, writing only what changed.
+
+    Existing documents are read once and diffed against the desired set.
+    Changed documents are written in batches of up to `batch_size`, committed
+    by `max_workers` threads. Deletes run only after every upsert has been
+    committed, so readers never see an empty collection mid-run.
+    Returns a summary with counts and throughput.
+    """
+    started = time.perf_counter()
+    col = db.collection(collection)
+    desired = {doc[id_field]: doc for doc in documents}
+    existing = {doc.id: doc.to_dict() or {} for doc in col.stream()}
+    created, updated, deleted = diff_documents(existing, desired, merge=merge, prune=prune)
+
+    def commit_upserts(ids: List[str]) -> int:
+        batch = db.batch()
+        for doc_id in ids:
+            batch.set(col.document(doc_id), desired[doc_id], merge=merge)
+        batch.commit()
+        return len(ids)
+
+    def commit_deletes(ids: List[str]) -> int:
+        batch = db.batch()
+        for doc_id in ids:
+            batch.delete(col.document(doc_id))
+        batch.commit()
+        return len(ids)
+
+    written, failed = 0, 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for commit, ids in ((commit_upserts, created + updated), (commit_deletes, deleted)):
+            chunks = _chunks(ids, batch_size)
+            futures = [pool.submit(commit, chunk) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                try:
+                    written += future.result()
+                except Exception as e:
+                    failed += len(chunk)
+                    logger.exception(f"Failed to commit a batch of {len(chunk)} writes to '{collection}': {e}")
+
+    seconds = time.perf_counter() - started
+    report = {
+        "collection": collection,
+        "total": len(desired),
+        "created": len(created),
+        "updated": len(updated),
+        "unchanged": len(desired) - len(created) - len(updated),
+        "deleted": len(deleted),
+        "written": written,
+        "failed": failed,
+        "seconds": round(seconds, 3),
+        "writes_per_second": round(written / seconds, 1) if seconds > 0 else 0.0,
+    }
+    logger.info(
+        f"Synced '{collection}': {report['created']} created, {report['updated']} updated, "
+        f"{report['deleted']} deleted, {report['unchanged']} unchanged, {failed} failed "
+        f"in {report['seconds']}s ({report['writes_per_second']} writes/s)"
+    )
+    return report
@@ -0,0 +1,72 @@
+# backend/services/serialization.py
+import base64
+import datetime
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from google.cloud.firestore_v1 import GeoPoint
+from google.cloud.firestore_v1.base_document import BaseDocumentReference
+
+# Non-string keys and numpy values are encoded rather than rejected, as jsonable_encoder did
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+
+def to_plain(value: Any) -> Any:
+    """
+    Converts Firestore-native values into types orjson encodes natively:
+    timestamps become plain datetimes, geo points {"latitude", "longitude"},
+    references their path and bytes base64 text. Run once when a document is
+    loaded, so responses never pay for it.
+    """
+    if type(value) in _SCALARS:
+        return value
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    if isinstance(value, DatetimeWithNanoseconds):
+        return datetime.datetime(
+            value.year, value.month, value.day, value.hour, value.minute, value.second,
+            value.microsecond, value.tzinfo,
+        )
+    if isinstance(value, GeoPoint):
+        return {"latitude": value.latitude, "longitude": value.longitude}
+    if isinstance(value, BaseDocumentReference):
+        return value.path
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    return value
+
+
+def document_data(doc) -> dict:
+    """A snapshot's fields as plain Python values ({} for empty documents)."""
+    return to_plain(doc.to_dict() or {})
+
+
+def _default(value: Any) -> Any:
+    # Anything not converted at load time (e.g. values built by hand)
+    value = to_plain(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (str, dict)):
+        return value
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded by orjson; the app's default response_class. Routes
+    still return plain data, so their response models validate and filter it;
+    documents are already plain at load time, which keeps that pass cheap.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
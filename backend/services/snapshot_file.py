@@ -0,0 +1,193 @@
+# backend/services/snapshot_file.py
+import datetime
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from services.snapshot_index import SnapshotIndex
+
+logger = logging.getLogger(__name__)
+
+# Boot the in-memory indexes from this snapshot file before Firestore catches up
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+
+MAGIC = b"VRDNSNAP"
+FORMAT_VERSION = 1
+COMPRESSION_LEVEL = 6
+
+# magic, format version, flags (unused), created at (unix seconds), collections
+_HEADER = struct.Struct("<8sHHdI")
+# name length, then (offset, compressed length, documents, crc32 of the compressed bytes)
+_NAME = struct.Struct("<H")
+_ENTRY = struct.Struct("<QQII")
+
+# Datetimes are tagged so they come back as datetimes, not ISO strings
+_DATETIME_TAG = "$datetime"
+
+Document = Tuple[str, Dict[str, Any]]
+
+
+class SnapshotError(Exception):
+    """The file is not a snapshot this version can read, or is corrupt."""
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {_DATETIME_TAG: value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__} in a snapshot")
+
+
+def _restore(value: Any) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and _DATETIME_TAG in value:
+            return datetime.datetime.fromisoformat(value[_DATETIME_TAG])
+        return {key: _restore(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_restore(item) for item in value]
+    return value
+
+
+# ----------------------------
+# Writing
+# ----------------------------
+def write_snapshot(path: str, collections: Dict[str, Iterable[Document]]) -> Dict[str, int]:
+    """
+    Writes (id, data) documents per collection to `path` and returns the
+    document count per collection. Data must be plain (see `to_plain`). The
+    file is written next to `path` and renamed into place, so readers never
+    see a partial snapshot.
+    """
+    sections: List[Tuple[bytes, bytes, int]] = []
+    for name, documents in collections.items():
+        pairs = [[doc_id, data] for doc_id, data in documents]
+        raw = orjson.dumps(pairs, default=_encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        sections.append((name.encode(), zlib.compress(raw, COMPRESSION_LEVEL), len(pairs)))
+
+    offset = _HEADER.size + sum(_NAME.size + len(name) + _ENTRY.size for name, _, _ in sections)
+    directory = []
+    for name, body, count in sections:
+        directory.append(_NAME.pack(len(name)) + name + _ENTRY.pack(offset, len(body), count, zlib.crc32(body)))
+        offset += len(body)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, time.time(), len(sections)))
+        f.writelines(directory)
+        f.writelines(body for _, body, _ in sections)
+    os.replace(tmp_path, path)
+    return {name.decode(): count for name, _, count in sections}
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+class SnapshotReader:
+    """
+    Open snapshot file. Opening it reads only the header and the collection
+    directory; each collection is read and decompressed when asked for, so
+    booting one index does not pay for the others.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._size = os.fstat(self._file.fileno()).st_size
+            self._sections = self._read_directory()
+        except Exception:
+            self._file.close()
+            raise
+
+    def _read(self, size: int) -> bytes:
+        data = self._file.read(size)
+        if len(data) != size:
+            raise SnapshotError(f"{self.path} is truncated")
+        return data
+
+    def _read_directory(self) -> Dict[str, Tuple[int, int, int, int]]:
+        if self._size < _HEADER.size:
+            raise SnapshotError(f"{self.path} is not a snapshot file")
+        magic, version, _, self.created_at, count = _HEADER.unpack(self._read(_HEADER.size))
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path} is not a snapshot file")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"{self.path} has snapshot format {version}; expected {FORMAT_VERSION}")
+
+        sections = {}
+        try:
+            for _ in range(count):
+                (length,) = _NAME.unpack(self._read(_NAME.size))
+                name = self._read(length).decode()
+                sections[name] = _ENTRY.unpack(self._read(_ENTRY.size))
+        except UnicodeDecodeError as e:
+            raise SnapshotError(f"{self.path} has a corrupt directory: {e}")
+        for name, (offset, length, _, _) in sections.items():
+            if offset + length > self._size:
+                raise SnapshotError(f"{self.path} is truncated (collection '{name}')")
+        return sections
+
+    @property
+    def collections(self) -> Dict[str, int]:
+        """Collection name -> document count."""
+        return {name: entry[2] for name, entry in self._sections.items()}
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.created_at
+
+    def documents(self, name: str) -> List[Document]:
+        """The (id, data) documents of one collection; KeyError if it is not in the file."""
+        offset, length, _, crc = self._sections[name]
+        self._file.seek(offset)
+        body = self._read(length)
+        if zlib.crc32(body) != crc:
+            raise SnapshotError(f"{self.path} is corrupt (collection '{name}' fails its checksum)")
+        raw = zlib.decompress(body)
+        pairs = orjson.loads(raw)
+        if _DATETIME_TAG.encode() not in raw:
+            return [(doc_id, data) for doc_id, data in pairs]
+        return [(doc_id, _restore(data)) for doc_id, data in pairs]
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def preload_indexes(path: str, indexes: Iterable[SnapshotIndex]) -> bool:
+    """
+    Loads each index's collection from the snapshot at `path`, so the indexes
+    serve reads before their Firestore listeners deliver the first snapshot.
+    Returns False (and logs) if the file is missing or unreadable; the
+    indexes then load from Firestore as usual.
+    """
+    started = time.perf_counter()
+    try:
+        with SnapshotReader(path) as reader:
+            for index in indexes:
+                if index.collection_name in reader.collections:
+                    index.load(reader.documents(index.collection_name))
+            age = reader.age_seconds
+    except (OSError, SnapshotError, ValueError) as e:
+        logger.error(f"Could not boot from snapshot {path}: {e}")
+        return False
+    logger.info(
+        f"Loaded indexes from snapshot {path} ({age / 3600:.1f}h old) in "
+        f"{(time.perf_counter() - started) * 1000:.1f}ms; catching up from Firestore."
+    )
+    return True
+
+
+def read_snapshot(path: str, names: Optional[Iterable[str]] = None) -> Dict[str, List[Document]]:
+    """Every collection in the snapshot (or just `names`), fully decoded."""
+    with SnapshotReader(path) as reader:
+        return {name: reader.documents(name) for name in (names or reader.collections)}
@@ -0,0 +1,144 @@
+# backend/services/snapshot_index.py
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import orjson
+
+from services.serialization import document_data
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotIndex:
+    """
+    Process-local, read-only view of a small Firestore collection.
+
+    A single `on_snapshot` listener feeds every document change into `_docs`.
+    Subclasses turn that into whatever lookup structure they need by
+    overriding `_rebuild`, which is called with the ids touched by each batch
+    of changes. Readers never take the lock: subclasses should build new
+    structures and swap them in with a single assignment.
+
+    `version` is a content hash of the whole collection (the XOR of per-document
+    hashes, so it is updated incrementally and is identical on every instance
+    serving the same data). It changes whenever any document does.
+
+    `load` can seed the index from a snapshot file before the listener
+    starts; the listener's first snapshot then brings it up to date.
+    """
+
+    collection_name: str = ""
+
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._watch = None
+        self._doc_hashes: Dict[str, int] = {}
+        self._digest = 0
+        self._version = ""
+        # Ids loaded from a snapshot file, until the listener's first snapshot reconciles them
+        self._preloaded: Optional[Set[str]] = None
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    def start(self, db) -> None:
+        """Attaches the snapshot listener. Safe to call more than once."""
+        with self._lock:
+            if self._watch is not None:
+                return
+            self._watch = db.collection(self.collection_name).on_snapshot(self._on_snapshot)
+        logger.info(f"Started snapshot listener for '{self.collection_name}'.")
+
+    def stop(self) -> None:
+        with self._lock:
+            watch, self._watch = self._watch, None
+        if watch is not None:
+            watch.unsubscribe()
+
+    @property
+    def ready(self) -> bool:
+        """True once the first full snapshot has been applied."""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    @property
+    def version(self) -> str:
+        """Content version of the collection; empty until the first snapshot."""
+        return self._version
+
+    @staticmethod
+    def _hash_document(doc_id: str, data: Dict[str, Any]) -> int:
+        raw = orjson.dumps([doc_id, data], default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "big")
+
+    # ----------------------------
+    # Snapshot handling
+    # ----------------------------
+    def _publish(self, touched: Set[str]) -> None:
+        self._rebuild(touched)
+        # Published after the rebuild, so a reader that sees the new
+        # version also sees the new data
+        self._version = f"{len(self._docs)}-{self._digest:016x}"
+
+    def load(self, documents: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Seeds the index with plain (id, data) documents, e.g. from a snapshot
+        file, and marks it ready. Ignored once the listener has delivered data.
+        """
+        with self._lock:
+            if self.ready:
+                return
+            touched: Set[str] = set()
+            for doc_id, data in documents:
+                self._digest ^= self._doc_hashes.pop(doc_id, 0)
+                self._docs[doc_id] = data
+                self._doc_hashes[doc_id] = self._hash_document(doc_id, data)
+                self._digest ^= self._doc_hashes[doc_id]
+                touched.add(doc_id)
+            self._preloaded = set(self._docs)
+            self._publish(touched)
+        self._ready.set()
+
+    def _on_snapshot(self, docs, changes, read_time) -> None:
+        """Runs on the Firestore watch thread for every batch of changes."""
+        try:
+            with self._lock:
+                touched: Set[str] = set()
+                if self._preloaded is not None:
+                    # The first snapshot lists every document: anything loaded
+                    # from the file but missing here was deleted since
+                    current = {doc.id for doc in docs}
+                    for doc_id in self._preloaded - current:
+                        self._digest ^= self._doc_hashes.pop(doc_id, 0)
+                        self._docs.pop(doc_id, None)
+                        touched.add(doc_id)
+                    self._preloaded = None
+                for change in changes:
+                    doc = change.document
+                    if change.type.name != "REMOVED":
+                        data = document_data(doc)
+                        if data == self._docs.get(doc.id):
+                            # Unchanged, e.g. a preloaded document re-sent by the first snapshot
+                            continue
+                    self._digest ^= self._doc_hashes.pop(doc.id, 0)
+                    if change.type.name == "REMOVED":
+                        self._docs.pop(doc.id, None)
+                    else:
+                        self._docs[doc.id] = data
+                        self._doc_hashes[doc.id] = self._hash_document(doc.id, data)
+                        self._digest ^= self._doc_hashes[doc.id]
+                    touched.add(doc.id)
+                self._publish(touched)
+            self._ready.set()
+        except Exception:
+            logger.exception(f"Failed to apply snapshot changes for '{self.collection_name}'")
+
+    def _rebuild(self, touched: Iterable[str]) -> None:
+        """Refreshes derived structures after `_docs` changed. Called under the lock."""
+        raise NotImplementedError
@@ -0,0 +1,100 @@
+# backend/tests/conftest.py
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fakes import FakeFirestore, build_dataset, build_store  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def dataset():
+    return build_dataset(users=40, rebates=120, contractors=150, seed=3)
+
+
+@pytest.fixture
+def store(dataset):
+    return build_store(dataset)
+
+
+@pytest.fixture
+def db(store):
+    return FakeFirestore(store)
+
+
+@pytest.fixture
+def start(db):
+    """Attaches snapshot indexes to the fake store, waits for their first snapshot and stops them afterwards."""
+    indexes = []
+
+    def start(index):
+        index.start(db)
+        assert index.wait_ready(5)
+        indexes.append(index)
+        return index
+
+    yield start
+    for index in indexes:
+        index.stop()
+
+
+@pytest.fixture(scope="session")
+async def booted_app():
+    """
+    The app started once against the benchmark fakes, with its indexes and
+    listeners running. The dependency patches are only active during startup
+    and shutdown; `api` applies them around each test that uses the app.
+    Yields (app, dataset, store, fake Gemini model).
+    """
+    import main
+    from benchmarks.run_endpoints import build_fakes, parse_args, patch_dependencies
+    from services.contractor_index import contractor_index
+    from services.rebate_index import rebate_index
+
+    app = main.app
+    dataset, store, model = build_fakes(parse_args([
+        "--users", "60", "--rebates", "150", "--contractors", "200",
+        "--firestore-latency-ms", "0", "--gemini-latency-ms", "1", "--gemini-first-token-ms", "1",
+    ]))
+    restore = patch_dependencies(store, model)
+    try:
+        await app.router.startup()
+        await main._warm_up_task
+        while not (rebate_index.ready and contractor_index.ready):
+            await asyncio.sleep(0.01)
+    finally:
+        restore()
+    yield app, dataset, store, model
+    restore = patch_dependencies(store, model)
+    try:
+        await app.router.shutdown()
+    finally:
+        restore()
+
+
+@pytest.fixture
+async def api(booted_app):
+    """
+    The booted app with its dependencies pointed at the fakes for this test only.
+    Yields (httpx client, dataset, fake Gemini model).
+    """
+    import httpx
+
+    from benchmarks.run_endpoints import patch_dependencies
+
+    app, dataset, store, model = booted_app
+    restore = patch_dependencies(store, model)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client, dataset, model
+    finally:
+        restore()
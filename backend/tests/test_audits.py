@@ -0,0 +1,119 @@
+# backend/tests/test_audits.py
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services import audits
+from services.audits import LatestAuditCache
+
+pytestmark = pytest.mark.anyio
+
+
+def save_audit(db, audit_id, user_id, timestamp=None):
+    db.collection("audits").document(audit_id).set({
+        "user_id": user_id,
+        "answers": {"fridge_age": "new"},
+        "timestamp": timestamp or datetime.now(timezone.utc),
+    })
+
+
+async def settle():
+    for _ in range(3):
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def cache(db):
+    cache = LatestAuditCache()
+    seen = []
+    cache.subscribe(lambda audit_id, audit: seen.append((audit_id, threading.get_ident())))
+    cache.start_listener(db)
+    cache.seen = seen
+    yield cache
+    cache.stop_listener()
+
+
+async def test_new_audit_invalidates_on_the_loop(cache, db):
+    cache._cache.set("user_1", {"answers": {}})
+    invalidated_on = []
+    invalidate = cache.invalidate
+    cache.invalidate = lambda uid: (invalidated_on.append(threading.get_ident()), invalidate(uid))
+
+    writer = threading.Thread(target=save_audit, args=(db, "a1", "user_1"))
+    writer.start()
+    writer.join()
+    await settle()
+
+    loop_thread = threading.get_ident()
+    assert invalidated_on == [loop_thread]
+    assert cache._cache.get("user_1", None) is None
+    assert cache.seen == [("a1", loop_thread)]
+
+
+async def test_listener_ignores_audits_before_the_lookback(cache, db):
+    save_audit(db, "old", "user_2", datetime.now(timezone.utc) - 2 * audits.LISTENER_LOOKBACK)
+    await settle()
+    assert cache.seen == []
+
+
+async def test_reanchor_moves_the_lower_bound_without_repeats(cache, db, store):
+    save_audit(db, "a1", "user_1")
+    await settle()
+    first = cache._watch
+
+    old = cache.reanchor()
+    assert old is first and cache._watch is not first
+    old.unsubscribe()
+    await settle()
+    # The new watch's first snapshot reports a1 again; subscribers only saw it once
+    assert [audit_id for audit_id, _ in cache.seen] == ["a1"]
+    assert sum(w.query.collection == "audits" for w in store.watches) == 1
+
+    save_audit(db, "a2", "user_1")
+    await settle()
+    assert [audit_id for audit_id, _ in cache.seen] == ["a1", "a2"]
+
+
+async def test_reanchor_forgets_audits_older_than_the_new_bound(cache):
+    cache._seen["expired"] = datetime.now(timezone.utc) - timedelta(hours=1)
+    cache._seen["recent"] = datetime.now(timezone.utc)
+    cache.reanchor().unsubscribe()
+    assert set(cache._seen) == {"recent"}
+
+
+async def test_periodic_reanchor(db, store, monkeypatch):
+    monkeypatch.setattr(audits, "LISTENER_REANCHOR_SECONDS", 0.01)
+    cache = LatestAuditCache()
+    cache.start_listener(db)
+    first = cache._watch
+    await asyncio.sleep(0.1)
+    assert cache._watch is not first
+    cache.stop_listener()
+    await asyncio.sleep(0.05)
+    assert cache._reanchor_task is None
+    assert not any(w.query.collection == "audits" for w in store.watches)
+
+
+async def test_batch_lookup_bounds_queries_and_leaves_the_cache_alone(monkeypatch):
+    running = peak = 0
+
+    async def get_latest_audit(user_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return None if user_id.endswith("7") else {"answers": {"user": user_id}}
+
+    monkeypatch.setattr(audits.firestore_data, "get_latest_audit", get_latest_audit)
+    monkeypatch.setattr(audits, "latest_audits", LatestAuditCache(maxsize=10))
+    audits.latest_audits._cache.set("cached", {"answers": {"from": "cache"}})
+
+    user_ids = [f"u{n}" for n in range(200)] + ["cached", "u1"]
+    answers = await audits.get_latest_answers_many(user_ids)
+    assert list(answers) == user_ids[:-1]
+    assert answers["cached"] == {"from": "cache"} and answers["u1"] == {"user": "u1"} and answers["u17"] is None
+    assert peak == audits.AUDIT_BATCH_CONCURRENCY
+    assert len(audits.latest_audits._cache) == 1
@@ -0,0 +1,92 @@
+# backend/tests/test_auth.py
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from routes import auth as auth_routes
+from services.cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def verify(monkeypatch):
+    """Fake `auth.verify_id_token` recording (token, check_revoked, thread) per call."""
+    calls = []
+    lifetime = {"seconds": 3600.0}
+
+    def verify_id_token(token, check_revoked=False, app=None):
+        calls.append((token, check_revoked, threading.get_ident()))
+        if token == "bad":
+            raise ValueError("signature mismatch")
+        time.sleep(0.02)
+        return {"uid": token, "exp": time.time() + lifetime["seconds"]}
+
+    monkeypatch.setattr(auth_routes.auth, "verify_id_token", verify_id_token)
+    monkeypatch.setattr(auth_routes.registry, "get", lambda name: None)
+    monkeypatch.setattr(auth_routes, "_token_cache", TTLCache(100, ttl=0))
+    verify_id_token.calls = calls
+    verify_id_token.lifetime = lifetime
+    return verify_id_token
+
+
+async def test_verified_tokens_are_cached(verify):
+    first = await auth_routes.verify_firebase_token("alice")
+    second = await auth_routes.verify_firebase_token("alice")
+    assert first["uid"] == second["uid"] == "alice"
+    assert len(verify.calls) == 1
+    await auth_routes.verify_firebase_token("bob")
+    assert [token for token, _, _ in verify.calls] == ["alice", "bob"]
+
+
+async def test_concurrent_misses_verify_once_off_the_loop(verify):
+    results = await asyncio.gather(*(auth_routes.verify_firebase_token("carol") for _ in range(20)))
+    assert {r["uid"] for r in results} == {"carol"}
+    assert len(verify.calls) == 1
+    assert verify.calls[0][2] != threading.get_ident()
+
+
+async def test_entries_expire_with_the_token(verify):
+    verify.lifetime["seconds"] = 0.05
+    await auth_routes.verify_firebase_token("dave")
+    await asyncio.sleep(0.1)
+    await auth_routes.verify_firebase_token("dave")
+    assert len(verify.calls) == 2
+
+    verify.lifetime["seconds"] = -1
+    await auth_routes.verify_firebase_token("erin")
+    await auth_routes.verify_firebase_token("erin")
+    assert len(verify.calls) == 4
+
+
+async def test_revocation_check_is_opt_in_and_rechecked(verify, monkeypatch):
+    await auth_routes.verify_firebase_token("frank")
+    assert verify.calls[-1][1] is False
+
+    monkeypatch.setattr(auth_routes, "AUTH_CHECK_REVOKED", True)
+    monkeypatch.setattr(auth_routes, "AUTH_REVOCATION_RECHECK_SECONDS", 0.05)
+    await auth_routes.verify_firebase_token("grace")
+    await auth_routes.verify_firebase_token("grace")
+    assert verify.calls[-1][:2] == ("grace", True) and len(verify.calls) == 2
+    await asyncio.sleep(0.1)
+    await auth_routes.verify_firebase_token("grace")
+    assert len(verify.calls) == 3
+
+
+async def test_invalid_tokens_are_rejected_and_not_cached(verify):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            await auth_routes.verify_firebase_token("bad")
+        assert error.value.status_code == 401
+    assert len(verify.calls) == 2
+
+
+async def test_me_returns_the_token_user(api):
+    client, _, _ = api
+    response = await client.post("/auth/me", headers={"Authorization": "Bearer user_000001"})
+    assert response.status_code == 200
+    assert response.json()["uid"] == "user_000001"
+    assert (await client.post("/auth/me")).status_code == 401
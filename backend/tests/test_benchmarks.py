@@ -0,0 +1,88 @@
+# backend/tests/test_benchmarks.py
+import threading
+
+import pytest
+
+from benchmarks.fakes import build_dataset
+from benchmarks.run_endpoints import asgi_request, build_scenarios, patch_dependencies, run_scenario
+
+
+def test_dataset_is_reproducible():
+    first = build_dataset(users=20, rebates=30, contractors=40, seed=11)
+    assert first == build_dataset(users=20, rebates=30, contractors=40, seed=11)
+    assert first != build_dataset(users=20, rebates=30, contractors=40, seed=12)
+    assert {k: len(v) for k, v in first.items()} == {"users": 20, "audits": 40, "rebates": 30, "contractors": 40}
+
+
+def test_fake_queries_filter_order_and_limit(db, dataset):
+    rebates = db.collection("rebates").where("location", "in", ["NSW", "AUS"]) \
+        .where("income_max", ">=", 100000).order_by("income_max").limit(5)
+    got = [d.to_dict() for d in rebates.stream()]
+    expected = sorted(
+        (r for r in dataset["rebates"] if r["location"] in ("NSW", "AUS") and r["income_max"] >= 100000),
+        key=lambda r: (r["income_max"], r["id"]),
+    )[:5]
+    assert [r["id"] for r in got] == [r["id"] for r in expected]
+
+    projected = next(iter(db.collection("users").select(["location"]).limit(1).stream()))
+    assert set(projected.to_dict()) == {"location"}
+
+
+def test_fake_listeners_see_writes(db):
+    seen, initial = [], threading.Event()
+
+    def on_snapshot(docs, changes, read_time):
+        seen.extend((c.type.name, c.document.id) for c in changes)
+        initial.set()
+
+    watch = db.collection("rebates").where("location", "==", "TAS").on_snapshot(on_snapshot)
+    assert initial.wait(5)
+    db.collection("rebates").document("r_new").set({"location": "TAS", "income_max": 1})
+    db.collection("rebates").document("r_new").update({"location": "VIC"})
+    watch.unsubscribe()
+    db.collection("rebates").document("r_other").set({"location": "TAS", "income_max": 1})
+    assert seen[-2:] == [("ADDED", "r_new"), ("REMOVED", "r_new")]
+    assert ("ADDED", "r_other") not in seen
+
+
+@pytest.mark.anyio
+async def test_every_scenario_succeeds(api):
+    from main import app
+
+    _, dataset, _ = api
+    for name, make_request in build_scenarios(dataset, unique_chat=True).items():
+        result = await run_scenario(app, make_request, requests=6, concurrency=3, seed=1)
+        assert result["requests"] == 6, name
+        assert set(result["statuses"]) == {200}, (name, result["statuses"])
+        assert result["p50_ms"] <= result["p99_ms"]
+
+
+@pytest.mark.anyio
+async def test_asgi_request_returns_status_and_body(api):
+    from main import app
+
+    status, body = await asgi_request(app, "GET", "/users/nobody")
+    assert status == 404 and b"User not found" in body
+
+
+def test_patches_are_undone(booted_app, store):
+    import firebase_admin.firestore
+    from firebase_admin import auth
+
+    from routes import chat
+    from services import firestore_data
+    from services.registry import registry
+
+    def current():
+        return (firebase_admin.firestore.client, auth.verify_id_token, firestore_data._client, chat.rate_limiter,
+                registry.status()["gemini"]["ready"])
+
+    # Outside a test using `api`, the app's startup patches are no longer in place
+    real = current()
+    assert real[2] is None
+    restore = patch_dependencies(store, object())
+    patched = current()
+    assert all(a is not b for a, b in zip(patched[:4], real[:4])) and patched[4]
+    assert auth.verify_id_token("admin_1")["admin"]
+    restore()
+    assert current() == real
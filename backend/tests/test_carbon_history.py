@@ -0,0 +1,219 @@
+# backend/tests/test_carbon_history.py
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.carbon_history import HISTORY_COLLECTION, CarbonHistory, apply_entry, make_entry, needs_rebuild
+from services.carbon_model import AuditAnswers, calculate_emissions
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def add_audit(db, audit_id, user_id, days=0, answers=None):
+    audit = {"user_id": user_id, "answers": answers or {"insulation": "poor"}, "timestamp": NOW + timedelta(days=days)}
+    db.collection("audits").document(audit_id).set(audit)
+    return audit
+
+
+def audits_of(dataset, user_id):
+    return [a for a in dataset["audits"] if a["user_id"] == user_id]
+
+
+def summary_of(db, user_id):
+    return db.collection(HISTORY_COLLECTION).document(user_id).get().to_dict()
+
+
+def wait_rebuilt(history, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while history._rebuilding:
+        assert time.monotonic() < deadline, "rebuild never finished"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def history(db):
+    history = CarbonHistory(window=3)
+    history.start(db)
+    yield history
+    history.stop()
+
+
+def test_apply_entry_keeps_timestamp_order():
+    totals = {}
+    entries = []
+    for day, insulation in ((2, "poor"), (0, "good"), (1, "average")):
+        audit = {"answers": {"insulation": insulation}, "timestamp": NOW + timedelta(days=day)}
+        entries.append(make_entry(f"a{day}", audit))
+        totals[f"a{day}"] = calculate_emissions(AuditAnswers(insulation=insulation))["total"]
+
+    summary = None
+    for entry in entries:
+        summary = apply_entry(summary, entry, window=2)
+    assert summary["count"] == 3
+    assert summary["first"]["audit_id"] == "a0" and summary["latest"]["audit_id"] == "a2"
+    assert [p["audit_id"] for p in summary["recent"]] == ["a1", "a2"]
+    assert summary["average"] == pytest.approx(sum(totals.values()) / 3)
+    assert summary["delta_since_first"] == pytest.approx(totals["a2"] - totals["a0"])
+    assert summary["backfilled"] is False
+
+
+def test_needs_rebuild():
+    assert needs_rebuild(None, 2) and not needs_rebuild(None, 0)
+    assert needs_rebuild({"count": 2}, 2)
+    assert not needs_rebuild({"count": 2, "backfilled": True}, 2)
+    assert needs_rebuild({"count": 1, "backfilled": True}, 2)
+
+
+def test_record_is_idempotent(history, db):
+    audit = add_audit(db, "new_1", "solo")
+    assert history.record("new_1", audit)
+    assert not history.record("new_1", audit)
+    assert summary_of(db, "solo")["count"] == 1
+
+
+def test_rebuild_backfills_a_summary_created_by_record(history, db, dataset):
+    user = dataset["users"][0]["id"]
+    old = audits_of(dataset, user)
+    assert old
+    history.record("new_1", add_audit(db, "new_1", user))
+    summary = summary_of(db, user)
+    assert summary["count"] == 1 and needs_rebuild(summary, len(old) + 1)
+
+    rebuilt = history.rebuild(user)
+    assert rebuilt["count"] == len(old) + 1 and rebuilt["backfilled"]
+    assert summary_of(db, user) == rebuilt
+    assert not needs_rebuild(rebuilt, len(old) + 1)
+
+    # Later audits keep the backfilled flag, so the count check stays the only trigger
+    history.record("new_2", add_audit(db, "new_2", user, days=1))
+    summary = summary_of(db, user)
+    assert summary["count"] == len(old) + 2 and summary["backfilled"]
+    assert summary["latest"]["audit_id"] == "new_2"
+
+
+def test_rebuild_drops_entries_of_deleted_audits(history, db, dataset):
+    user = dataset["users"][1]["id"]
+    audits = audits_of(dataset, user)
+    history.rebuild(user)
+    db.collection("audits").document(audits[0]["id"]).delete()
+
+    summary = history.rebuild(user)
+    assert summary["count"] == len(audits) - 1
+    entries = db.collection(HISTORY_COLLECTION).document(user).collection("entries").stream()
+    assert {doc.id for doc in entries} == {a["id"] for a in audits[1:]}
+
+
+def test_rebuild_merges_entries_recorded_meanwhile(history, db, dataset):
+    user = dataset["users"][2]["id"]
+    old = audits_of(dataset, user)
+    make_batch = db.batch
+
+    def batch():
+        # The listener records a new audit while the rebuild is writing entries
+        written = make_batch()
+        commit = written.commit
+
+        def commit_then_record():
+            commit()
+            if not db.collection("audits").document("late").get().exists:
+                history.record("late", add_audit(db, "late", user, days=5))
+        written.commit = commit_then_record
+        return written
+
+    db.batch = batch
+    summary = history.rebuild(user)
+    assert summary["count"] == len(old) + 1
+    assert summary["latest"]["audit_id"] == "late"
+    assert summary_of(db, user)["count"] == len(old) + 1
+
+
+def test_listener_backfills_on_first_new_audit(history, db, dataset):
+    user = dataset["users"][3]["id"]
+    old = audits_of(dataset, user)
+    history.submit("new_1", add_audit(db, "new_1", user)).result()
+    wait_rebuilt(history)
+    summary = summary_of(db, user)
+    assert summary["count"] == len(old) + 1 and summary["backfilled"]
+
+    rebuilds = []
+    history.rebuild = rebuilds.append
+    history.submit("new_2", add_audit(db, "new_2", user, days=1)).result()
+    assert rebuilds == [] and summary_of(db, user)["count"] == len(old) + 2
+
+
+def test_schedule_rebuild_queues_one_per_user(history, db, dataset):
+    user = dataset["users"][4]["id"]
+    rebuild = history.rebuild
+    started, release = [], threading.Event()
+
+    def slow_rebuild(user_id):
+        started.append(user_id)
+        release.wait(5)
+        return rebuild(user_id)
+
+    history.rebuild = slow_rebuild
+    first = history.schedule_rebuild(user)
+    assert history.schedule_rebuild(user) is None
+    release.set()
+    first.result()
+    wait_rebuilt(history)
+    assert started == [user] and summary_of(db, user)["backfilled"]
+    assert CarbonHistory().schedule_rebuild(user) is None  # not started
+
+
+def test_backfill_repairs_stale_histories(history, db, dataset):
+    users = [u["id"] for u in dataset["users"]]
+    with_audits = {a["user_id"] for a in dataset["audits"]}
+    assert history.backfill(dry_run=True) == {"users": len(with_audits), "stale": len(with_audits),
+                                              "rebuilt": 0, "failed": 0}
+    report = history.backfill()
+    assert report["rebuilt"] == report["stale"] == len(with_audits) and report["failed"] == 0
+    for user in with_audits:
+        summary = summary_of(db, user)
+        assert summary["backfilled"] and summary["count"] == len(audits_of(dataset, user))
+
+    # An audit the listener missed, and a user whose audits were all deleted
+    add_audit(db, "missed", users[0], days=30)
+    gone = next(u for u in users[1:] if u in with_audits)
+    for audit in audits_of(dataset, gone):
+        db.collection("audits").document(audit["id"]).delete()
+    report = history.backfill()
+    assert report["stale"] == report["rebuilt"] == 2
+    assert summary_of(db, users[0])["latest"]["audit_id"] == "missed"
+    assert not db.collection(HISTORY_COLLECTION).document(gone).get().exists
+    assert history.backfill(dry_run=True)["stale"] == 0
+
+
+@pytest.mark.anyio
+async def test_route_only_reads_the_summary(api, monkeypatch):
+    from firebase_admin import firestore
+
+    from services.carbon_history import carbon_history
+
+    client, dataset, _ = api
+    db = firestore.client()
+    user = dataset["users"][5]["id"]
+    old = audits_of(dataset, user)
+    assert carbon_history.started
+    scheduled = []
+    monkeypatch.setattr(carbon_history, "schedule_rebuild", scheduled.append)
+    carbon_history.record("hist_new", add_audit(db, "hist_new", user, days=400))
+
+    # A history that was never backfilled is served as stored and queued for a rebuild
+    response = await client.get(f"/carbon/history/{user}", params={"entries": 50})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 1 == len(body["entries"])
+    assert "backfilled" not in body and "total_sum" not in body
+    assert user in scheduled
+
+    carbon_history.rebuild(user)
+    scheduled.clear()
+    body = (await client.get(f"/carbon/history/{user}", params={"entries": 50})).json()
+    assert body["count"] == len(old) + 1 == len(body["entries"])
+    assert scheduled == []
+
+    assert (await client.get("/carbon/history/nobody")).status_code == 404
+    assert scheduled == ["nobody"]
@@ -0,0 +1,42 @@
+# backend/tests/test_carbon_model.py
+import itertools
+
+import pytest
+
+from services.carbon_model import (
+    EMISSION_FACTORS, AuditAnswers, calculate_emissions, calculate_emissions_batch,
+)
+
+FIELDS = {name: list(options) for category in EMISSION_FACTORS.values() for name, options in category.items()}
+
+
+def answer_space():
+    """Every combination of known answers, plus households with missing or unknown answers."""
+    names = list(FIELDS)
+    for values in itertools.product(*(FIELDS[name] for name in names)):
+        yield AuditAnswers(**dict(zip(names, values)))
+    for name in names:
+        base = {n: FIELDS[n][0] for n in names}
+        yield AuditAnswers(**{**base, name: None})
+        yield AuditAnswers.construct(**{**base, name: "unknown"})
+
+
+def test_batch_matches_scalar_over_answer_space():
+    answers = list(answer_space())
+    assert calculate_emissions_batch(answers) == [calculate_emissions(a) for a in answers]
+
+
+def test_batch_keeps_input_order_and_handles_empty():
+    answers = list(answer_space())[::-37]
+    assert calculate_emissions_batch(answers) == [calculate_emissions(a) for a in answers]
+    assert calculate_emissions_batch([]) == []
+
+
+@pytest.mark.anyio
+async def test_calculate_batch_route_matches_scalar(api):
+    client, _, _ = api
+    answers = list(itertools.islice(answer_space(), 0, 4000, 250))
+    body = {"audits": [a.dict() for a in answers]}
+    response = await client.post("/carbon/calculate-batch", json=body)
+    assert response.status_code == 200
+    assert [item["emissions"] for item in response.json()["audits"]] == [calculate_emissions(a) for a in answers]
@@ -0,0 +1,120 @@
+# backend/tests/test_chat_context.py
+import asyncio
+
+import pytest
+
+from services import chat_context as chat_context_module
+from services.chat_context import ChatContextBuilder, ConversationWindow, estimate_tokens, render_context, render_history
+
+
+def test_render_context_keeps_only_advice_fields():
+    profile = {"location": "NSW", "home_size_sqft": 1800, "family_size": 4, "annual_income": 95000.5,
+               "monthly_energy_bill": "", "email": "someone@example.com", "name": "Sam"}
+    answers = {"fridge_age": "old", "has_solar": False, "water_heater": "gas_storage", "unknown": "x"}
+    context = render_context(profile, answers)
+    assert context == (
+        "Profile: location NSW; home 1,800 sqft; household 4 people; income $95,000/yr\n"
+        "Latest audit: fridge age old; water heater gas storage; has solar no"
+    )
+    assert "example.com" not in context and "Sam" not in context
+
+
+def test_render_context_without_data():
+    assert render_context(None, None) == "Profile: none provided\nLatest audit: none yet"
+    assert render_context({"home_size_sqft": "big"}, {}).startswith("Profile: home big\n")
+
+
+def test_window_trims_by_turns_and_tokens():
+    window = ConversationWindow(max_turns=2, token_budget=1000)
+    for n in range(3):
+        window.add(f"q{n}", f"a{n}")
+    assert window.exchanges() == [("q1", "a1"), ("q2", "a2")]
+
+    window = ConversationWindow(max_turns=10, token_budget=15)
+    window.add("x" * 20, "y" * 20)
+    window.add("x" * 20, "y" * 20)
+    assert len(window.exchanges()) == 1 and window.tokens == 10
+    window.add("z" * 200, "")
+    assert window.exchanges() == [] and window.tokens == 0
+    assert estimate_tokens("") == 1 and estimate_tokens("abcde") == 2
+
+
+def test_render_history():
+    assert render_history([("hi", "hello"), ("more?", "sure")]) == "User: hi\nVeridian: hello\nUser: more?\nVeridian: sure"
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Counts profile and audit fetches; each takes a moment so concurrent calls overlap."""
+    calls = []
+
+    async def get_user(user_id):
+        calls.append(user_id)
+        await asyncio.sleep(0.02)
+        return {"location": f"loc-{len(calls)}"}
+
+    async def get_answers(user_id):
+        return {"has_solar": True}
+
+    monkeypatch.setattr(chat_context_module.firestore_data, "get_user", get_user)
+    monkeypatch.setattr(chat_context_module.latest_audits, "get_answers", get_answers)
+    return calls
+
+
+@pytest.mark.anyio
+async def test_context_is_cached_and_coalesced(loads):
+    builder = ChatContextBuilder()
+    first = await asyncio.gather(*(builder.get_context("u1") for _ in range(5)))
+    assert len(set(first)) == 1 and loads == ["u1"]
+    assert await builder.get_context("u1") == first[0]
+    assert loads == ["u1"]
+
+
+@pytest.mark.anyio
+async def test_new_audit_invalidates_context(loads):
+    builder = ChatContextBuilder()
+    before = await builder.get_context("u1")
+    builder.on_new_audit("a1", {"user_id": "u1"})
+    builder.on_new_audit("a2", {})
+    after = await builder.get_context("u1")
+    assert loads == ["u1", "u1"] and after != before
+
+
+@pytest.mark.anyio
+async def test_invalidation_during_load_is_not_cached(loads):
+    builder = ChatContextBuilder()
+    loading = asyncio.ensure_future(builder.get_context("u1"))
+    await asyncio.sleep(0.005)
+    builder.invalidate("u1")
+    await loading
+    assert builder._contexts.get("u1") is None
+    await builder.get_context("u1")
+    assert loads == ["u1", "u1"]
+
+
+def test_conversation_history_is_per_user():
+    builder = ChatContextBuilder()
+    builder.remember("u1", "hi", "hello")
+    builder.remember("u1", "and?", "more")
+    builder.remember("u2", "other", "reply")
+    assert builder.history("u1") == [("hi", "hello"), ("and?", "more")]
+    assert builder.stats()["conversations"] == 2
+    builder.forget("u1")
+    assert builder.history("u1") == [] and builder.history("u2") == [("other", "reply")]
+
+
+@pytest.mark.anyio
+async def test_chat_route_sends_the_previous_turn(api):
+    from routes.chat import chat_context
+
+    client, dataset, model = api
+    user = dataset["users"][7]["id"]
+    chat_context.forget(user)
+    first = await client.post("/chat/", json={"user_id": user, "message": "Context test: is solar worth it?"})
+    assert first.status_code == 200
+    assert chat_context.history(user) == [("Context test: is solar worth it?", first.json()["reply"])]
+
+    second = await client.post("/chat/", json={"user_id": user, "message": "Context test: and a battery?"})
+    assert second.status_code == 200
+    assert [m for m, _ in chat_context.history(user)] == ["Context test: is solar worth it?", "Context test: and a battery?"]
+    chat_context.forget(user)
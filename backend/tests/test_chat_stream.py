@@ -0,0 +1,111 @@
+# backend/tests/test_chat_stream.py
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.fakes import FakeAsyncFirestore, FakeGeminiResponse
+from routes import chat
+from services import firestore_data
+from services.rate_limit import InMemoryRateLimiter
+from services.reply_cache import ReplyCache
+
+pytestmark = pytest.mark.anyio
+
+
+class ScriptedStream:
+    """Gemini stream yielding `chunks`; records whether it was closed early."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+        self.served = 0
+
+    async def __aiter__(self):
+        try:
+            for text in self.chunks:
+                self.served += 1
+                yield FakeGeminiResponse(text)
+                await asyncio.sleep(0)
+        finally:
+            self.closed = True
+
+
+class ScriptedModel:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.streams = []
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.streams.append(ScriptedStream(self.chunks))
+        return self.streams[-1]
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after=None):
+        self.checks = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.disconnect_after is not None and self.checks > self.disconnect_after
+
+
+@pytest.fixture
+def model(store, monkeypatch):
+    model = ScriptedModel(["Seal ", "the ", "draughts."])
+    monkeypatch.setattr(firestore_data, "_client", FakeAsyncFirestore(store))
+    monkeypatch.setattr(chat, "get_model", lambda: model)
+    monkeypatch.setattr(chat, "rate_limiter", InMemoryRateLimiter(1000, 60))
+    monkeypatch.setattr(chat, "reply_cache", ReplyCache(100, 60))
+    return model
+
+
+async def run_stream(dataset, message, request=None):
+    body = chat.ChatInput(user_id=dataset["users"][0]["id"], message=message)
+    response = await chat.handle_chat_stream(body, request or FakeRequest())
+    raw = "".join([part async for part in response.body_iterator])
+    if response.background is not None:
+        await response.background()
+    events = []
+    for block in raw.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+async def test_streams_tokens_then_done_and_caches(model, dataset):
+    events = await run_stream(dataset, "How do I save on heating?")
+    assert events == [("token", {"text": "Seal "}), ("token", {"text": "the "}),
+                      ("token", {"text": "draughts."}), ("done", {})]
+    assert model.streams[0].closed
+    assert chat.reply_cache.stats()["size"] == 1
+    assert chat.gemini_guard.stats()["active"] == 0
+
+
+async def test_empty_stream_is_an_error_not_done(model, dataset):
+    model.chunks = ["", ""]
+    events = await run_stream(dataset, "Anything?")
+    assert events == [("error", {"status_code": 502, "detail": "AI service returned an empty response."})]
+    assert chat.reply_cache.stats()["size"] == 0
+
+
+async def test_client_disconnect_closes_the_gemini_stream(model, dataset):
+    model.chunks = [f"word{i} " for i in range(50)]
+    events = await run_stream(dataset, "Tell me everything", FakeRequest(disconnect_after=2))
+    stream = model.streams[0]
+    assert [e for e, _ in events] == ["token", "token"]
+    assert stream.closed and stream.served < 50
+    assert chat.gemini_guard.stats()["active"] == 0
+
+
+async def test_iterate_closes_the_source_when_closed_early():
+    source = ScriptedStream(["a", "b", "c"])
+    lease = await chat.gemini_guard.acquire()
+    try:
+        items = chat.gemini_guard.iterate(source, lease)
+        assert (await items.__anext__()).text == "a"
+        await items.aclose()
+    finally:
+        chat.gemini_guard.release(lease)
+    assert source.closed and source.served == 1
@@ -0,0 +1,82 @@
+# backend/tests/test_contractor_index.py
+import pytest
+
+from services.contractor_index import ContractorIndex, paginate, rank_key
+
+
+def reference(contractors, location, services, match_all=False):
+    """Contractors in `location` or "AUS" offering any (or all) of `services`, ranked."""
+    def offers(c):
+        have = set(c.get("services") or [])
+        return set(services) <= have if match_all else bool(set(services) & have)
+    return sorted((c for c in contractors if c.get("location") in (location, "AUS") and offers(c)), key=rank_key)
+
+
+@pytest.fixture
+def index(start):
+    return start(ContractorIndex())
+
+
+@pytest.mark.parametrize("location", ["NSW", "VIC", "WA", "AUS"])
+@pytest.mark.parametrize("services,match_all", [
+    (["solar"], False),
+    (["solar", "battery"], False),
+    (["solar", "battery"], True),
+    (["insulation", "windows", "lighting"], False),
+])
+def test_query_matches_reference(index, dataset, location, services, match_all):
+    expected = reference(dataset["contractors"], location, services, match_all)
+    got = sorted(index.query(location, services, match_all), key=rank_key)
+    assert [c["id"] for c in got] == [c["id"] for c in expected]
+
+
+def test_paginate_walks_every_result_once(index):
+    contractors = index.query("NSW", ["solar", "battery", "windows"])
+    seen, cursor = [], None
+    while True:
+        page, cursor = paginate(contractors, limit=7, cursor=cursor)
+        seen.extend(c["id"] for c in page)
+        if cursor is None:
+            break
+    assert seen == [c["id"] for c in sorted(contractors, key=rank_key)]
+
+
+def test_listener_applies_changes(index, db):
+    contractors = db.collection("contractors")
+    contractors.document("c_new").set({"name": "New", "services": ["geothermal"], "location": "TAS", "rating": 5})
+    assert [c["id"] for c in index.query("TAS", ["geothermal"])] == ["c_new"]
+
+    contractors.document("c_new").update({"services": ["solar"]})
+    assert index.query("TAS", ["geothermal"]) == []
+
+    contractors.document("c_new").delete()
+    assert "c_new" not in {c["id"] for c in index.query("TAS", ["solar"])}
+
+
+def test_published_state_survives_slot_reuse(index, db, dataset):
+    """A reader holding the previous state keeps resolving slots to the contractors it matched."""
+    victim = next(c for c in dataset["contractors"] if c["location"] == "NSW" and "solar" in c["services"])
+    before = index._state
+    matched = {before.records[s]["id"] for s in before.postings[("NSW", "solar")]}
+
+    contractors = db.collection("contractors")
+    contractors.document(victim["id"]).delete()
+    # Takes the freed slot
+    contractors.document("c_reuse").set({"name": "Reuse", "services": ["hot_water"], "location": "WA", "rating": 1})
+
+    assert {before.records[s]["id"] for s in before.postings[("NSW", "solar")]} == matched
+    after = index._state
+    assert victim["id"] not in {after.records[s]["id"] for s in after.postings[("NSW", "solar")]}
+    assert "c_reuse" in {c["id"] for c in index.query("WA", ["hot_water"])}
+
+
+@pytest.mark.anyio
+async def test_post_contractors_is_ranked_and_paged(api):
+    client, dataset, _ = api
+    body = {"location": "VIC", "services": ["solar", "battery"], "limit": 5}
+    first = (await client.post("/contractors/", json=body)).json()
+    second = (await client.post("/contractors/", json={**body, "cursor": first["next_cursor"]})).json()
+
+    expected = reference(dataset["contractors"], "VIC", ["solar", "battery"])
+    assert first["total"] == len(expected)
+    assert [c["id"] for c in first["contractors"] + second["contractors"]] == [c["id"] for c in expected[:10]]
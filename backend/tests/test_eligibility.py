@@ -0,0 +1,101 @@
+# backend/tests/test_eligibility.py
+import pytest
+
+from services.eligibility import MATCHES_COLLECTION, RebateMatrix, run_eligibility_job
+from services.rebate_index import RebateIndex, location_code
+
+# Rebates the matrix must treat exactly like the rebate index does
+ODD_REBATES = {
+    "odd_none": {"name": "No location", "location": None, "income_max": 10 ** 9, "amount": 1},
+    "odd_int": {"name": "Numeric location", "location": 7, "income_max": 10 ** 9, "amount": 1},
+    "odd_text_income": {"name": "Text income", "location": "NSW", "income_max": "lots", "amount": 1},
+    "odd_bool_amount": {"name": "Bool amount", "location": "AUS", "income_max": 10 ** 9, "amount": True},
+}
+ODD_USERS = {
+    "u_postcode": {"location": "nsw, 2000", "annual_income": 50000},
+    "u_no_rebates_state": {"location": "ZZ", "annual_income": 1000},
+    "u_blank": {"location": "  ", "annual_income": 1000},
+    "u_no_location": {"annual_income": 1000},
+    "u_bool_income": {"location": "VIC", "annual_income": True},
+    "u_rich": {"location": "QLD", "annual_income": 10 ** 12},
+}
+
+
+@pytest.fixture
+def catalog(db, start):
+    for doc_id, data in ODD_REBATES.items():
+        db.collection("rebates").document(doc_id).set(data)
+    for doc_id, data in ODD_USERS.items():
+        db.collection("users").document(doc_id).set(data)
+    return start(RebateIndex())
+
+
+def matches(db):
+    return {doc.id: doc.to_dict() for doc in db.collection(MATCHES_COLLECTION).stream()}
+
+
+def expected_matches(db, index):
+    """What POST /rebates returns for each user's profile, or None for users it cannot match."""
+    expected = {}
+    for doc in db.collection("users").stream():
+        user = doc.to_dict()
+        location, income = user.get("location"), user.get("annual_income")
+        valid = isinstance(location, str) and location.strip() and isinstance(income, (int, float)) \
+            and not isinstance(income, bool)
+        expected[doc.id] = [r["id"] for r in index.query(location_code(location), income)] if valid else None
+    return expected
+
+
+@pytest.mark.parametrize("chunk_size", [7, 2000])
+def test_job_matches_the_rebate_index(db, catalog, chunk_size):
+    report = run_eligibility_job(db, chunk_size=chunk_size, write_workers=2)
+    expected = expected_matches(db, catalog)
+    written = matches(db)
+
+    assert written.keys() == {user_id for user_id, ids in expected.items() if ids is not None}
+    for user_id, summary in written.items():
+        assert summary["rebate_ids"] == expected[user_id], user_id
+        assert summary["count"] == len(expected[user_id])
+    assert written["u_no_rebates_state"]["rebate_ids"] == [r["id"] for r in catalog.query("AUS", 1000)]
+    assert not {"odd_none", "odd_int", "odd_text_income"} & set(written["u_no_rebates_state"]["rebate_ids"])
+    assert report["users"] == len(expected) and report["skipped"] == 3
+    assert report["written"] == len(written) and report["failed"] == 0
+
+
+def test_totals_use_numeric_amounts(db, catalog):
+    run_eligibility_job(db)
+    by_id = {doc.id: doc.to_dict() for doc in db.collection("rebates").stream()}
+    for summary in matches(db).values():
+        amounts = [by_id[r]["amount"] for r in summary["rebate_ids"]]
+        total = sum(a for a in amounts if isinstance(a, (int, float)) and not isinstance(a, bool))
+        assert summary["total_amount"] == pytest.approx(total)
+
+
+def test_skipped_users_lose_their_old_matches(db, catalog, monkeypatch):
+    run_eligibility_job(db)
+    assert "u_postcode" in matches(db)
+    db.collection("users").document("u_postcode").update({"location": None})
+    deleted = []
+    delete = type(db.batch()).delete
+    monkeypatch.setattr(type(db.batch()), "delete", lambda self, ref: (deleted.append(ref.id), delete(self, ref)))
+    report = run_eligibility_job(db)
+    assert "u_postcode" not in matches(db)
+    # Only the user that had matches is deleted; the other skipped users cost no writes
+    assert deleted == ["u_postcode"]
+    assert report["cleared"] == 1 and report["skipped"] == 4
+
+
+def test_dry_run_writes_nothing(db, catalog):
+    report = run_eligibility_job(db, dry_run=True)
+    assert matches(db) == {} and report["written"] == 0 and report["users"] > 0
+
+
+def test_matrix_from_given_rebates():
+    matrix = RebateMatrix([("b", {"location": "NSW", "income_max": 5}), ("a", {"location": "NSW", "income_max": 5}),
+                           ("c", {"location": 3, "income_max": 9}), ("d", {"location": "AUS", "income_max": 1})])
+    assert matrix.ids == ["d", "a", "b", "c"]
+    location, income, valid = matrix.encode_users([{"location": "XX", "annual_income": 0},
+                                                   {"location": "NSW", "annual_income": 5}])
+    eligible = matrix.eligible(location, income)
+    assert eligible.tolist() == [[True, False, False, False], [False, True, True, False]]
+    assert valid.tolist() == [True, True]
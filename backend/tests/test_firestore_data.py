@@ -0,0 +1,115 @@
+# backend/tests/test_firestore_data.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeAsyncFirestore
+from services import firestore_data
+from services.registry import ServiceRegistry
+from services.resilience import DependencyUnavailable
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    client = FakeAsyncFirestore(store)
+    monkeypatch.setattr(firestore_data, "_client", client)
+    return client
+
+
+async def test_get_user(client, dataset):
+    user = dataset["users"][0]
+    assert (await firestore_data.get_user(user["id"]))["email"] == user["email"]
+    assert await firestore_data.get_user("nobody") is None
+
+
+async def test_get_users_projects_and_reports_missing(client, dataset):
+    ids = [u["id"] for u in dataset["users"][:5]] + ["nobody"]
+    found = {uid: data async for uid, data in firestore_data.get_users(ids, ["location"])}
+    assert set(found) == set(ids)
+    assert found["nobody"] is None
+    assert all(set(data) == {"location"} for uid, data in found.items() if uid != "nobody")
+
+
+async def test_get_latest_audit_is_newest(client, dataset):
+    user_id = dataset["users"][0]["id"]
+    audits = [a for a in dataset["audits"] if a["user_id"] == user_id]
+    latest = await firestore_data.get_latest_audit(user_id)
+    assert latest["timestamp"] == max(a["timestamp"] for a in audits)
+    assert await firestore_data.get_latest_audit("nobody") is None
+
+
+async def test_query_rebates_and_contractors(client, dataset):
+    rebates = await firestore_data.query_rebates("NSW", 100000)
+    expected = {r["id"] for r in dataset["rebates"]
+                if r["location"] in ("NSW", "AUS") and r["income_max"] >= 100000}
+    assert {r["id"] for r in rebates} == expected
+    assert [r["income_max"] for r in rebates] == sorted(r["income_max"] for r in rebates)
+    assert [r["id"] async for r in firestore_data.stream_rebates("NSW", 100000)] == [r["id"] for r in rebates]
+
+    contractors = await firestore_data.query_contractors("VIC", ["solar"])
+    assert {c["id"] for c in contractors} == {
+        c["id"] for c in dataset["contractors"] if c["location"] in ("VIC", "AUS") and "solar" in c["services"]
+    }
+
+
+async def test_streams_closed_early_are_recorded_as_ok(client, monkeypatch):
+    from services import metrics
+
+    calls = []
+    monkeypatch.setattr(metrics.dependency_calls, "inc", lambda *labels, amount=1.0: calls.append(labels))
+    rebates = firestore_data.stream_rebates("NSW", 0)
+    async for _ in rebates:
+        break
+    await rebates.aclose()
+    users = firestore_data.get_users(["nobody"])
+    assert [item async for item in users] == [("nobody", None)]
+    assert calls == [("firestore", "stream_rebates", "ok"), ("firestore", "get_users", "ok")]
+
+
+async def test_reads_do_not_block_each_other(client, store, dataset, monkeypatch):
+    """Each read waits on the event loop, so concurrent reads overlap instead of queueing."""
+    monkeypatch.setattr(store, "latency", 0.05)
+    ids = [u["id"] for u in dataset["users"][:20]]
+    started = time.perf_counter()
+    users = await asyncio.gather(*(firestore_data.get_user(uid) for uid in ids))
+    assert all(users)
+    assert time.perf_counter() - started < 0.5
+
+
+async def test_client_requires_init_which_resolves_firebase_off_the_loop(store, monkeypatch):
+    monkeypatch.setattr(firestore_data, "_client", None)
+    with pytest.raises(DependencyUnavailable):
+        firestore_data.get_db()
+
+    resolved_on = []
+    registry = ServiceRegistry()
+    registry.register("firebase", lambda: resolved_on.append(threading.get_ident()) or "app")
+    monkeypatch.setattr(firestore_data, "registry", registry)
+    monkeypatch.setattr(firestore_data.firestore_async, "client", lambda app: FakeAsyncFirestore(store))
+    client = await firestore_data.init()
+    assert resolved_on and resolved_on[0] != threading.get_ident()
+    assert firestore_data.get_db() is client and await firestore_data.init() is client
+
+
+async def test_routes_answer_503_before_init(api, monkeypatch):
+    client, dataset, _ = api
+    monkeypatch.setattr(firestore_data, "_client", None)
+    user = dataset["users"][0]["id"]
+    for method, path, body in (("GET", f"/users/{user}", None), ("POST", "/carbon/calculate", {"user_id": "uncached_user"}),
+                               ("GET", f"/carbon/history/{user}", None)):
+        response = await client.request(method, path, json=body)
+        assert response.status_code == 503, path
+        assert response.headers["retry-after"] == "1"
+
+
+async def test_get_user_route(api):
+    client, dataset, _ = api
+    user = dataset["users"][3]
+    response = await client.get(f"/users/{user['id']}")
+    assert response.status_code == 200
+    assert response.json()["location"] == user["location"]
+    assert (await client.get("/users/nobody")).status_code == 404
@@ -0,0 +1,117 @@
+# backend/tests/test_geo.py
+import time
+
+import numpy as np
+import pytest
+
+from services import geo
+from services.geo import GridIndex, PostcodeTable, document_point, haversine_km
+
+
+def random_points(rng, n):
+    # Clustered like Australian contractors: a few metro areas plus a rural spread
+    centres = np.array([(-33.87, 151.21), (-37.81, 144.96), (-27.47, 153.03), (-31.95, 115.86)])
+    metro = centres[rng.integers(len(centres), size=n)] + rng.normal(0, 0.4, size=(n, 2))
+    rural = np.column_stack([rng.uniform(-43, -11, n), rng.uniform(113, 154, n)])
+    return np.where(rng.random((n, 1)) < 0.8, metro, rural)
+
+
+def brute_nearest(points, lat, lon, k, allowed=None, max_km=None):
+    ids = np.arange(len(points)) if allowed is None else np.flatnonzero(allowed[:len(points)])
+    distances = haversine_km(lat, lon, points[ids, 0], points[ids, 1])
+    if max_km is not None:
+        ids, distances = ids[distances <= max_km], distances[distances <= max_km]
+    order = np.argsort(distances, kind="stable")[:k]
+    return ids[order], distances[order]
+
+
+@pytest.fixture(scope="module")
+def grid():
+    rng = np.random.default_rng(7)
+    points = random_points(rng, 5000)
+    return GridIndex(range(len(points)), map(tuple, points), cell_deg=0.25), points
+
+
+QUERIES = [(-33.9, 151.2), (-37.0, 145.5), (-20.0, 130.0), (-42.9, 147.3), (51.5, -0.1), (-33.0, -70.0)]
+
+
+@pytest.mark.parametrize("brute_force_points", [0, 1024])
+@pytest.mark.parametrize("density", [1.0, 0.3, 0.01, 0.0005])
+def test_nearest_matches_brute_force(grid, monkeypatch, brute_force_points, density):
+    monkeypatch.setattr(geo, "GEO_BRUTE_FORCE_POINTS", brute_force_points)
+    index, points = grid
+    rng = np.random.default_rng(int(density * 10000))
+    allowed = None if density == 1.0 else rng.random(len(points) + 3) < density
+    for lat, lon in QUERIES:
+        for k, max_km in ((1, None), (10, None), (50, 200.0), (10000, None)):
+            got_ids, got_distances = index.nearest(lat, lon, k, allowed, max_km=max_km)
+            ids, distances = brute_nearest(points, lat, lon, k, allowed, max_km)
+            assert got_ids.tolist() == ids.tolist(), (lat, lon, k, max_km)
+            assert np.allclose(got_distances, distances)
+
+
+def test_within_matches_brute_force(grid):
+    index, points = grid
+    for lat, lon in QUERIES:
+        for radius in (5.0, 80.0, 2000.0):
+            ids, distances = index.within(lat, lon, radius)
+            expected, expected_distances = brute_nearest(points, lat, lon, len(points), max_km=radius)
+            assert sorted(ids.tolist()) == sorted(expected.tolist())
+            assert np.all(np.diff(distances) >= 0)
+
+
+def test_empty_grid_and_no_candidates():
+    empty = GridIndex([], [], 0.25)
+    assert len(empty) == 0 and empty.nearest(0, 0, 5)[0].size == 0 and empty.within(0, 0, 10)[0].size == 0
+    index = GridIndex([0, 1], [(-33.0, 151.0), (-34.0, 151.0)], 0.25)
+    assert index.nearest(-33, 151, 5, np.zeros(2, dtype=bool))[0].size == 0
+    assert index.nearest(-33, 151, 0)[0].size == 0
+    assert index.nearest(-33, 151, 5)[0].tolist() == [0, 1]
+
+
+def test_nearest_with_few_allowed_points_is_fast(monkeypatch):
+    rng = np.random.default_rng(3)
+    points = random_points(rng, 100_000)
+    index = GridIndex(range(len(points)), map(tuple, points), cell_deg=0.25)
+    allowed = np.zeros(len(points), dtype=bool)
+    allowed[rng.choice(len(points), 5, replace=False)] = True
+
+    for brute_force_points in (0, geo.GEO_BRUTE_FORCE_POINTS):
+        monkeypatch.setattr(geo, "GEO_BRUTE_FORCE_POINTS", brute_force_points)
+        index.nearest(-33.9, 151.2, 20, allowed)
+        started = time.perf_counter()
+        for lat, lon in QUERIES * 5:
+            ids, _ = index.nearest(lat, lon, 20, allowed)
+            assert len(ids) == 5
+        per_query = (time.perf_counter() - started) / (len(QUERIES) * 5)
+        # Asking for more neighbours than are allowed must not walk every ring of the grid
+        assert per_query < 0.02, (brute_force_points, per_query)
+
+
+def test_document_point(tmp_path, monkeypatch):
+    path = tmp_path / "postcodes.csv"
+    path.write_text("postcode,latitude,longitude\n2000,-33.87,151.21\nbad,x,1\n")
+    monkeypatch.setattr(geo, "postcodes", PostcodeTable(str(path)))
+    assert document_point({"lat": -33, "lon": 151}) == (-33.0, 151.0)
+    assert document_point({"lat": True, "lon": 151, "geo": {"latitude": -30, "longitude": 150}}) == (-30.0, 150.0)
+    assert document_point({"lat": 95, "lon": 151, "postcode": 2000}) == (-33.87, 151.21)
+    assert document_point({"postcode": "bad"}) is None
+    assert document_point({}) is None
+    assert PostcodeTable(None).get("2000") is None
+
+
+@pytest.mark.anyio
+async def test_contractors_near_a_point(api):
+    client, dataset, _ = api
+    body = {"location": "NSW", "services": ["solar"], "lat": -33.87, "lon": 151.21, "nearest": 3}
+    response = await client.post("/contractors/", json=body)
+    assert response.status_code == 200
+    got = response.json()["contractors"]
+
+    candidates = [c for c in dataset["contractors"] if "solar" in c["services"] and c["location"] in ("NSW", "AUS")
+                  and c.get("lat") is not None]
+    points = np.array([(c["lat"], c["lon"]) for c in candidates])
+    distances = haversine_km(-33.87, 151.21, points[:, 0], points[:, 1])
+    expected = [candidates[i]["id"] for i in np.argsort(distances)[:3]]
+    assert [c["id"] for c in got] == expected
+    assert [c["distance_km"] for c in got] == sorted(c["distance_km"] for c in got)
@@ -0,0 +1,81 @@
+# backend/tests/test_http_cache.py
+import pytest
+
+from services.http_cache import etag_matches, make_etag
+from services.rebate_index import RebateIndex
+
+
+def test_make_etag():
+    etag = make_etag("10-abc", ["NSW", 90000])
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("10-abc", ["NSW", 90000])
+    assert etag != make_etag("10-abd", ["NSW", 90000])
+    assert etag != make_etag("10-abc", ["NSW", 90001])
+
+
+def test_etag_matches():
+    etag = make_etag("v", [])
+    assert etag_matches(etag, etag)
+    assert etag_matches(f"W/{etag}", etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_version_ignores_rewrites_of_unchanged_documents(start, db, dataset):
+    index = start(RebateIndex())
+    version = index.version
+    rebate = dataset["rebates"][0]
+    db.collection("rebates").document(rebate["id"]).set(dict(rebate))
+    assert index.version == version
+    db.collection("rebates").document(rebate["id"]).update({"amount": rebate["amount"] + 1})
+    assert index.version != version
+
+
+@pytest.fixture
+def live_db():
+    """The fake Firestore the app's index listeners are attached to."""
+    from firebase_admin import firestore
+    return firestore.client()
+
+
+@pytest.mark.anyio
+async def test_rebates_revalidate_until_the_catalog_changes(api, live_db):
+    client, _, _ = api
+    body = {"location": "NSW", "income": 80000}
+    first = await client.post("/rebates/", json=body)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and "must-revalidate" in first.headers["cache-control"]
+
+    cached = await client.post("/rebates/", json=body, headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b"" and cached.headers["etag"] == etag
+    other = await client.post("/rebates/", json={**body, "income": 80001}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    rebates = live_db.collection("rebates")
+    rebates.document("etag_test").set({"name": "New", "location": "NSW", "income_max": 200000, "amount": 100})
+    try:
+        changed = await client.post("/rebates/", json=body, headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+        assert "etag_test" in {r["id"] for r in changed.json()["rebates"]}
+    finally:
+        rebates.document("etag_test").delete()
+
+
+@pytest.mark.anyio
+async def test_contractor_etag_ignores_service_order(api):
+    client, _, _ = api
+    first = await client.post("/contractors/", json={"location": "VIC", "services": ["solar", "battery"]})
+    swapped = await client.post("/contractors/", json={"location": "VIC", "services": ["battery", "solar"]},
+                                headers={"If-None-Match": first.headers["etag"]})
+    assert swapped.status_code == 304
+
+
+@pytest.mark.anyio
+async def test_search_sends_etag(api):
+    client, _, _ = api
+    first = await client.get("/rebates/search", params={"q": "solar"})
+    assert first.status_code == 200
+    again = await client.get("/rebates/search", params={"q": "solar"}, headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
@@ -0,0 +1,83 @@
+# backend/tests/test_main.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeFirestore
+from services.audits import LatestAuditCache
+from services.carbon_history import CarbonHistory
+from services.contractor_index import ContractorIndex
+from services.rebate_index import RebateIndex
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_warm_up_marks_ready_unhealthy(api, monkeypatch, caplog):
+    import main
+
+    client, _, _ = api
+    assert (await client.get("/ready")).status_code == 200
+
+    async def broken():
+        raise RuntimeError("listener setup failed")
+
+    monkeypatch.setattr(main, "_warm_up", broken)
+    monkeypatch.setattr(main, "_warm_up_task", main._warm_up_task)
+    monkeypatch.setattr(main, "_warm_up_error", None)
+    await main.startup_event()
+    await asyncio.wait([main._warm_up_task])
+    await asyncio.sleep(0)
+
+    response = await client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["warm_up_error"] == "RuntimeError: listener setup failed"
+    assert "Service warm-up failed" in caplog.text
+
+
+async def test_warm_up_creates_clients_off_the_loop(api, store, monkeypatch):
+    import main
+
+    loop_thread = threading.get_ident()
+    created_on = []
+
+    def slow_client(app=None):
+        created_on.append(threading.get_ident())
+        time.sleep(0.3)
+        return FakeFirestore(store)
+
+    async def nothing():
+        pass
+
+    for name, value in (("rebate_index", RebateIndex()), ("contractor_index", ContractorIndex()),
+                        ("carbon_history", CarbonHistory()), ("latest_audits", LatestAuditCache())):
+        monkeypatch.setattr(main, name, value)
+    monkeypatch.setattr(main.registry, "warm_up", nothing)
+    monkeypatch.setattr(main.chat, "init_redis", nothing)
+    monkeypatch.setattr(main.firestore, "client", slow_client)
+
+    gaps, stop = [], False
+
+    async def ticker():
+        last = time.perf_counter()
+        while not stop:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticking = asyncio.create_task(ticker())
+    try:
+        await main._warm_up()
+    finally:
+        stop = True
+        await ticking
+        main.rebate_index.stop()
+        main.contractor_index.stop()
+        main.latest_audits.stop_listener()
+        main.carbon_history.stop()
+
+    assert created_on and created_on[0] != loop_thread
+    assert max(gaps) < 0.2
+    assert main.latest_audits._loop is asyncio.get_running_loop()
@@ -0,0 +1,113 @@
+# backend/tests/test_metrics.py
+import asyncio
+import re
+
+import pytest
+
+from services.metrics import Counter, Histogram, Registry, register_cache, track_dependency, track_stream
+
+
+def sample(text, name, **labels):
+    """The value of one sample in Prometheus text output, or None."""
+    wanted = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    pattern = rf"^{re.escape(name)}{{{re.escape(wanted)}}} (\S+)$" if labels else rf"^{re.escape(name)} (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    return None if match is None else float(match.group(1).replace("+Inf", "inf"))
+
+
+def test_counter_and_histogram_render():
+    registry = Registry()
+    requests = registry.register(Counter("req_total", "Requests.", ("route",)))
+    latency = registry.register(Histogram("lat_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe("/a", value=value)
+
+    text = registry.render()
+    assert "# TYPE req_total counter" in text and "# TYPE lat_seconds histogram" in text
+    assert 'req_total{route="/a\\"b"} 3' in text
+    assert sample(text, "lat_seconds_bucket", route="/a", le="0.1") == 2
+    assert sample(text, "lat_seconds_bucket", route="/a", le="1.0") == 3
+    assert sample(text, "lat_seconds_bucket", route="/a", le="+Inf") == 4
+    assert sample(text, "lat_seconds_count", route="/a") == 4
+    assert sample(text, "lat_seconds_sum", route="/a") == pytest.approx(3.65)
+
+
+def test_track_dependency_records_outcome():
+    from services.metrics import REGISTRY
+
+    with track_dependency("test_dep", "ok_op"):
+        pass
+    with pytest.raises(RuntimeError):
+        with track_dependency("test_dep", "bad_op"):
+            raise RuntimeError("boom")
+    text = REGISTRY.render()
+    assert sample(text, "veridian_dependency_calls_total", dependency="test_dep", operation="ok_op", outcome="ok") == 1
+    assert sample(text, "veridian_dependency_calls_total", dependency="test_dep", operation="bad_op", outcome="error") == 1
+    assert sample(text, "veridian_dependency_duration_seconds_count", dependency="test_dep", operation="ok_op") == 1
+
+
+@pytest.mark.anyio
+async def test_track_stream_times_only_the_fetch():
+    from services.metrics import REGISTRY
+
+    closed = []
+
+    async def items(fail=False):
+        try:
+            for n in range(3):
+                await asyncio.sleep(0.001)
+                yield n
+            if fail:
+                raise RuntimeError("stream broke")
+        finally:
+            closed.append(fail)
+
+    async def consume(operation, stop_after=None, fail=False):
+        stream = track_stream("test_stream", operation, items(fail))
+        async for n in stream:
+            await asyncio.sleep(0.05)  # the consumer's own work
+            if n == stop_after:
+                await stream.aclose()
+                break
+
+    await consume("full")
+    await consume("early", stop_after=0)
+    with pytest.raises(RuntimeError):
+        await consume("broken", fail=True)
+    assert closed == [False, False, True]
+
+    text = REGISTRY.render()
+    for operation, outcome in (("full", "ok"), ("early", "ok"), ("broken", "error")):
+        assert sample(text, "veridian_dependency_calls_total", dependency="test_stream", operation=operation,
+                      outcome=outcome) == 1
+    assert sample(text, "veridian_dependency_calls_total", dependency="test_stream", operation="early",
+                  outcome="error") is None
+    assert sample(text, "veridian_dependency_duration_seconds_sum", dependency="test_stream", operation="full") < 0.05
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint_uses_route_templates(api, monkeypatch):
+    from services import metrics
+
+    client, dataset, _ = api
+    monkeypatch.setattr(metrics, "_caches", dict(metrics._caches))
+    register_cache("test_cache", lambda: {"hits": 7, "misses": 2, "size": 5})
+    before = sample((await client.get("/metrics")).text, "veridian_http_requests_total",
+                    method="GET", route="/users/{user_id}", status="200") or 0
+    for user in dataset["users"][:3]:
+        await client.get(f"/users/{user['id']}")
+    await client.get("/users/nobody")
+    await client.get("/no/such/path")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    text = response.text
+    assert sample(text, "veridian_http_requests_total", method="GET", route="/users/{user_id}", status="200") == before + 3
+    assert sample(text, "veridian_http_requests_total", method="GET", route="/users/{user_id}", status="404") >= 1
+    assert sample(text, "veridian_http_requests_total", method="GET", route="unmatched", status="404") >= 1
+    assert dataset["users"][0]["id"] not in text
+    assert sample(text, "veridian_http_requests_in_flight", method="GET", route="/users/{user_id}") == 0
+    assert sample(text, "veridian_cache_hits_total", cache="test_cache") == 7
+    assert sample(text, "veridian_cache_entries", cache="test_cache") == 5
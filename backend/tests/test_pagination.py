@@ -0,0 +1,88 @@
+# backend/tests/test_pagination.py
+import json
+
+import pytest
+
+from services.pagination import decode_cursor, encode_cursor, paginate_sorted, stream_page
+from services.rebate_index import RebateIndex, rebate_key
+
+
+def items(n):
+    return sorted(({"id": f"r{i:03d}", "income_max": float(i // 3)} for i in range(n)), key=rebate_key)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor((1500.0, "abc"))) == (1500.0, "abc")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_paginate_sorted_walks_every_item_once():
+    data = items(23)
+    seen, cursor = [], None
+    while True:
+        page, cursor = paginate_sorted(data, rebate_key, limit=5, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert seen == data
+    assert paginate_sorted(data, rebate_key) == (data, None)
+
+
+async def collect(lines):
+    return [json.loads(line) for chunk in [c async for c in lines] for line in chunk.splitlines()]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("as_stream", [False, True])
+async def test_stream_page(as_stream):
+    data = items(10)
+
+    async def stream():
+        for item in data:
+            yield item
+
+    source = stream() if as_stream else data
+    lines = await collect(stream_page(source, rebate_key, limit=4, cursor=encode_cursor(rebate_key(data[2]))))
+    assert [line["id"] for line in lines[:-1]] == [d["id"] for d in data[3:7]]
+    assert lines[-1] == {"done": True, "count": 4, "next_cursor": encode_cursor(rebate_key(data[6]))}
+
+
+@pytest.fixture
+def firestore_fallback(api, monkeypatch):
+    """Serves POST /rebates from Firestore, as before the index has loaded."""
+    from services import firestore_data
+
+    monkeypatch.setattr(RebateIndex, "ready", property(lambda self: False))
+    return firestore_data.get_db().store
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("path", ["/rebates/", "/rebates/stream"])
+async def test_firestore_fallback_reads_only_each_page(api, firestore_fallback, path):
+    from services.rebate_index import rebate_index
+
+    client, _, _ = api
+    body = {"location": "NSW", "income": 60000}
+    expected = [r["id"] for r in rebate_index.query("NSW", 60000)]
+
+    store, limit = firestore_fallback, 4
+    reads, pages, cursor = [], [], None
+    while True:
+        before = store.reads
+        response = await client.post(path, json={**body, "limit": limit, "cursor": cursor})
+        reads.append(store.reads - before)
+        if path.endswith("stream"):
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            pages.append([line["id"] for line in lines[:-1]])
+            cursor = lines[-1]["next_cursor"]
+        else:
+            pages.append([r["id"] for r in response.json()["rebates"]])
+            cursor = response.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [rid for page in pages for rid in page] == expected
+    assert len(pages) == -(-len(expected) // limit)
+    # Every page costs at most limit + 1 reads, however deep it is
+    assert max(reads) <= limit + 1
@@ -0,0 +1,91 @@
+# backend/tests/test_rate_limit.py
+import asyncio
+
+import fakeredis
+import pytest
+
+from services.rate_limit import InMemoryRateLimiter, RedisRateLimiter
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+async def test_in_memory_sliding_window():
+    clock = Clock()
+    limiter = InMemoryRateLimiter(3, 60, clock=clock)
+    assert [await limiter.hit("u") for _ in range(4)] == [True, True, True, False]
+    assert await limiter.hit("v")
+
+    clock.now += 30
+    assert not await limiter.hit("u")
+    clock.now += 30.5
+    # The three hits at t=0 have left the window; the rejected ones never counted
+    assert [await limiter.hit("u") for _ in range(4)] == [True, True, True, False]
+
+
+async def test_in_memory_evicts_idle_and_excess_keys():
+    clock = Clock()
+    limiter = InMemoryRateLimiter(2, 10, max_keys=3, clock=clock)
+    for key in "abc":
+        await limiter.hit(key)
+    clock.now += 11
+    await limiter.hit("d")
+    assert len(limiter) == 1
+
+    for key in "efgh":
+        await limiter.hit(key)
+    assert len(limiter) == 3
+    # The least recently active key went first
+    assert await limiter.hit("h") and not await limiter.hit("h")
+
+
+@pytest.fixture
+async def redis_client():
+    client = fakeredis.FakeAsyncRedis()
+    yield client
+    await client.aclose()
+
+
+async def test_redis_limit_is_shared_between_workers(redis_client):
+    workers = [RedisRateLimiter(redis_client, 5, 60, prefix="t:") for _ in range(3)]
+    results = await asyncio.gather(*(w.hit("user") for w in workers for _ in range(4)))
+    assert sum(results) == 5
+    assert await redis_client.zcard("t:user") == 5
+    assert 0 < await redis_client.pttl("t:user") <= 60_000
+    assert await workers[0].hit("other")
+
+
+async def test_redis_window_slides(redis_client):
+    limiter = RedisRateLimiter(redis_client, 2, 0.2, prefix="t:")
+    assert [await limiter.hit("u") for _ in range(3)] == [True, True, False]
+    await asyncio.sleep(0.25)
+    assert await limiter.hit("u")
+
+
+async def test_redis_outage_allows_requests():
+    class Down:
+        def register_script(self, script):
+            async def run(**kwargs):
+                raise ConnectionError("connection refused")
+            return run
+
+    limiter = RedisRateLimiter(Down(), 1, 60)
+    assert await limiter.hit("u") and await limiter.hit("u")
+
+
+async def test_chat_returns_429_over_the_limit(api, monkeypatch):
+    from routes import chat
+
+    client, dataset, _ = api
+    monkeypatch.setattr(chat, "rate_limiter", InMemoryRateLimiter(2, 60))
+    body = {"user_id": dataset["users"][5]["id"], "message": "Tips for hot water?"}
+    codes = [(await client.post("/chat/", json={**body, "message": f"{body['message']} {i}"})).status_code
+             for i in range(3)]
+    assert codes == [200, 200, 429]
@@ -0,0 +1,69 @@
+# backend/tests/test_rebate_index.py
+import pytest
+
+from services.rebate_index import RebateIndex, location_code, rebate_key
+
+
+def firestore_query(rebates, location, income):
+    """What `location in [loc, "AUS"] and income_max >= income` returns, in rebate_key order."""
+    matches = [
+        r for r in rebates
+        if r.get("location") in (location, "AUS")
+        and isinstance(r.get("income_max"), (int, float)) and r["income_max"] >= income
+    ]
+    return sorted(matches, key=rebate_key)
+
+
+@pytest.fixture
+def index(start):
+    return start(RebateIndex())
+
+
+@pytest.mark.parametrize("location", ["NSW", "VIC", "QLD", "AUS", "XX"])
+@pytest.mark.parametrize("income", [0, 75000, 120001, 250000, 10 ** 9])
+def test_query_matches_firestore(index, dataset, location, income):
+    expected = firestore_query(dataset["rebates"], location, income)
+    assert [r["id"] for r in index.query(location, income)] == [r["id"] for r in expected]
+
+
+def test_listener_applies_changes(index, db, dataset):
+    rebates = db.collection("rebates")
+    version = index.version
+
+    rebates.document("new").set({"name": "New", "location": "TAS", "income_max": 90000, "amount": 10})
+    assert "new" in {r["id"] for r in index.query("TAS", 80000)}
+    assert index.version != version
+
+    rebates.document("new").update({"income_max": 50000})
+    assert "new" not in {r["id"] for r in index.query("TAS", 80000)}
+
+    moved = dataset["rebates"][0]["id"]
+    rebates.document(moved).update({"location": "TAS"})
+    assert moved in {r["id"] for r in index.query("TAS", 0)}
+
+    rebates.document("new").delete()
+    assert "new" not in {r["id"] for r in index.query("TAS", 0)}
+
+
+def test_skips_rebates_without_numeric_income_max(index, db):
+    db.collection("rebates").document("odd").set({"location": "TAS", "income_max": "lots"})
+    db.collection("rebates").document("none").set({"location": "TAS"})
+    assert not {"odd", "none"} & {r["id"] for r in index.query("TAS", 0)}
+
+
+def test_version_is_content_based(start):
+    assert start(RebateIndex()).version == start(RebateIndex()).version
+
+
+def test_location_code():
+    assert location_code("nsw, 2000") == "NSW"
+    assert location_code(" VIC ") == "VIC"
+
+
+@pytest.mark.anyio
+async def test_post_rebates_matches_firestore(api):
+    client, dataset, _ = api
+    response = await client.post("/rebates/", json={"location": "NSW", "income": 120000})
+    assert response.status_code == 200
+    expected = firestore_query(dataset["rebates"], "NSW", 120000)
+    assert [r["id"] for r in response.json()["rebates"]] == [r["id"] for r in expected]
@@ -0,0 +1,78 @@
+# backend/tests/test_reply_cache.py
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeAsyncFirestore, FakeGeminiResponse
+from routes import chat
+from services import firestore_data
+from services.rate_limit import InMemoryRateLimiter
+from services.reply_cache import ReplyCache, normalize_message
+
+pytestmark = pytest.mark.anyio
+
+
+def test_normalized_messages_share_a_key():
+    assert normalize_message("  How do I   SAVE power?! ") == "how do i save power"
+    assert ReplyCache.key("Save power?", "ctx") == ReplyCache.key("save  power", "ctx")
+    assert ReplyCache.key("save power", "ctx") != ReplyCache.key("save power", "other ctx")
+    assert ReplyCache.key("save power", "ctx") != ReplyCache.key("save power", "ctx", [("hi", "hello")])
+
+
+async def test_concurrent_misses_share_one_generation():
+    cache = ReplyCache(10, 60)
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "reply"
+
+    replies = await asyncio.gather(*(cache.get_or_generate("k", generate) for _ in range(10)))
+    assert replies == ["reply"] * 10 and len(calls) == 1
+    assert cache.stats()["coalesced"] == 9
+    assert await cache.get_or_generate("k", generate) == "reply" and len(calls) == 1
+
+
+class RecordingModel:
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        return FakeGeminiResponse(f"reply {len(self.prompts)}")
+
+
+@pytest.fixture
+def model(store, db, monkeypatch):
+    model = RecordingModel()
+    monkeypatch.setattr(firestore_data, "_client", FakeAsyncFirestore(store))
+    monkeypatch.setattr(chat, "get_model", lambda: model)
+    monkeypatch.setattr(chat, "rate_limiter", InMemoryRateLimiter(1000, 60))
+    monkeypatch.setattr(chat, "reply_cache", ReplyCache(100, 60))
+    household = {"location": "NSW", "home_size_sqft": 1500, "family_size": 3,
+                 "annual_income": 90000.0, "monthly_energy_bill": 210.0}
+    for user_id, name in (("pii_a", "Alice"), ("pii_b", "Bob")):
+        db.collection("users").document(user_id).set(
+            {**household, "email": f"{name.lower()}@example.com", "name": name, "phone": "0400 000 000"})
+    return model
+
+
+async def test_prompt_only_contains_the_fields_in_the_key(model):
+    first = await chat.handle_chat(chat.ChatInput(user_id="pii_a", message="How can I cut my bill?"))
+    prompt = model.prompts[0]
+    assert "NSW" in prompt and "$90,000/yr" in prompt
+    assert not any(secret in prompt for secret in ("alice", "Alice", "0400", "pii_a"))
+
+    # Same household facts, different person: same key, so the cached reply is shared, and it
+    # was generated from a prompt that held nothing specific to the first user
+    second = await chat.handle_chat(chat.ChatInput(user_id="pii_b", message="how can i cut my bill"))
+    assert second == first and len(model.prompts) == 1
+
+
+async def test_prompt_and_key_come_from_the_same_inputs(model):
+    prompt, key = await chat._build_prompt(chat.ChatInput(user_id="pii_a", message="Solar worth it?"))
+    context = await chat.chat_context.get_context("pii_a")
+    history = chat.chat_context.history("pii_a")
+    assert prompt == chat._render_prompt("Solar worth it?", context, history)
+    assert key == ReplyCache.key("Solar worth it?", context, history)
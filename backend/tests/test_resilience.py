@@ -0,0 +1,189 @@
+# backend/tests/test_resilience.py
+import asyncio
+
+import pytest
+
+from services import resilience
+from services.resilience import (
+    Bulkhead,
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    DependencyGuard,
+    retry_after_header,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def own_guards(monkeypatch):
+    # Guards register themselves for /metrics; keep test guards out of the app's registry
+    monkeypatch.setattr(resilience, "_guards", {})
+
+
+def breaker(clock, **kwargs):
+    options = dict(window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=1.0, slow_rate=0.75,
+                   open_seconds=30.0, half_open_calls=2, clock=clock)
+    return CircuitBreaker("test", **{**options, **kwargs})
+
+
+async def test_bulkhead_caps_concurrency_and_queue():
+    bulkhead = Bulkhead("test", max_concurrent=2, queue_timeout=0.05, max_waiting=1)
+    peak = running = 0
+
+    async def work():
+        nonlocal peak, running
+        async with bulkhead:
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+    await asyncio.gather(*(work() for _ in range(3)))
+    assert peak == 2 and bulkhead.active == 0 and bulkhead.rejected == 0
+
+    await bulkhead.acquire()
+    await bulkhead.acquire()
+    waiter = asyncio.ensure_future(bulkhead.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(BulkheadFullError):
+        await bulkhead.acquire()  # max_waiting reached
+    with pytest.raises(BulkheadFullError):
+        await waiter  # queue_timeout elapsed
+    assert bulkhead.rejected == 2 and bulkhead.waiting == 0
+    bulkhead.release()
+    bulkhead.release()
+    assert bulkhead.active == 0
+
+
+def test_breaker_opens_on_failure_rate_and_fails_fast():
+    clock = Clock()
+    circuit = breaker(clock)
+    circuit.on_failure(circuit.before_call())
+    circuit.on_success(0.1, circuit.before_call())
+    circuit.on_failure(circuit.before_call())
+    assert circuit.state == CircuitBreaker.CLOSED  # below min_calls
+    circuit.on_failure(circuit.before_call())
+    assert circuit.state == CircuitBreaker.OPEN and circuit.opened == 1
+
+    clock.now = 10.0
+    with pytest.raises(CircuitOpenError) as error:
+        circuit.before_call()
+    assert error.value.retry_after == pytest.approx(20.0)
+    assert retry_after_header(error.value) == {"Retry-After": "20"}
+    assert circuit.rejected == 1
+
+
+def test_breaker_opens_on_slow_calls():
+    circuit = breaker(Clock())
+    for duration in (2.0, 2.0, 0.1, 2.0):
+        circuit.on_success(duration, circuit.before_call())
+    assert circuit.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probes_close_or_reopen():
+    clock = Clock()
+    circuit = breaker(clock)
+    circuit._trip("test")
+    clock.now = 30.0
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+
+    first, second = circuit.before_call(), circuit.before_call()
+    assert first and second
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call()  # only half_open_calls probes at a time
+    circuit.on_success(0.1, first)
+    circuit.on_failure(second)
+    assert circuit.state == CircuitBreaker.OPEN and circuit.opened == 2
+
+    clock.now = 60.0
+    probes = [circuit.before_call(), circuit.before_call()]
+    circuit.on_cancel(probes[0])
+    probes[0] = circuit.before_call()  # a cancelled probe frees its place
+    for probe in probes:
+        circuit.on_success(0.1, probe)
+    assert circuit.state == CircuitBreaker.CLOSED
+
+
+async def test_guard_deadline_and_failure_classification():
+    guard = DependencyGuard("test", Bulkhead("test", 1, 0.01), breaker(Clock(), min_calls=2), timeout=0.02,
+                           is_failure=lambda e: not isinstance(e, ValueError))
+
+    async def rejected_prompt():
+        raise ValueError("blocked")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await guard.call(rejected_prompt)
+    assert guard.stats()["state"] == CircuitBreaker.CLOSED
+
+    with pytest.raises(DeadlineExceededError):
+        await guard.call(lambda: asyncio.sleep(1))
+    with pytest.raises(DeadlineExceededError):
+        await guard.call(lambda: asyncio.sleep(1))
+    stats = guard.stats()
+    assert stats["state"] == CircuitBreaker.OPEN and stats["active"] == 0
+    with pytest.raises(CircuitOpenError):
+        await guard.call(rejected_prompt)
+
+
+async def test_guard_release_is_idempotent_and_frees_probes():
+    clock = Clock()
+    guard = DependencyGuard("test", Bulkhead("test", 1, 0.01), breaker(clock, half_open_calls=1), timeout=1.0)
+    guard.breaker._trip("test")
+    clock.now = 30.0
+
+    lease = await guard.acquire()
+    assert lease.probe
+    guard.release(lease)
+    guard.release(lease)
+    assert guard.bulkhead.active == 0
+    # The abandoned probe did not settle the circuit, and its place is free again
+    assert guard.breaker.state == CircuitBreaker.HALF_OPEN
+    assert await guard.call(lambda: asyncio.sleep(0, result="ok")) == "ok"
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+
+async def test_iterate_times_out_stalled_streams():
+    guard = DependencyGuard("test", Bulkhead("test", 1, 0.01), breaker(Clock()), timeout=1.0)
+    closed = []
+
+    async def stream():
+        try:
+            yield "a"
+            await asyncio.sleep(1)
+            yield "b"
+        finally:
+            closed.append(True)
+
+    lease = await guard.acquire()
+    items = []
+    with pytest.raises(DeadlineExceededError):
+        async for item in guard.iterate(stream(), lease, idle_timeout=0.02):
+            items.append(item)
+    guard.release(lease)
+    assert items == ["a"] and closed == [True] and guard.bulkhead.active == 0
+
+
+async def test_open_circuit_returns_503_with_retry_after(api, monkeypatch):
+    from routes import chat
+
+    client, dataset, _ = api
+    guard = DependencyGuard("gemini", Bulkhead("gemini", 4, 1.0), breaker(Clock()), timeout=5.0)
+    guard.breaker._trip("test")
+    monkeypatch.setattr(chat, "gemini_guard", guard)
+    body = {"user_id": dataset["users"][0]["id"], "message": "Circuit test: solar?"}
+    for path in ("/chat/", "/chat/stream"):
+        response = await client.post(path, json=body)
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "30"
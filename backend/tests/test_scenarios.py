@@ -0,0 +1,93 @@
+# backend/tests/test_scenarios.py
+import itertools
+
+import pytest
+
+from services.carbon_model import EMISSION_FACTORS, FACTOR_DEFAULTS, AuditAnswers, calculate_emissions
+from services.scenarios import UPGRADES, match_rebates, scenario_simulator
+
+FACTORS = {name: options for category in EMISSION_FACTORS.values() for name, options in category.items()}
+
+
+def reference(answers: AuditAnswers):
+    """Every reachable upgrade combination, scored one at a time with `calculate_emissions`."""
+    current = answers.model_dump()
+    choices = {}
+    for name in UPGRADES:
+        value = FACTORS[name].get(current[name], FACTOR_DEFAULTS[name])
+        better = [option for option, factor in FACTORS[name].items() if factor < value]
+        if better:
+            choices[name] = [None, *better]
+    baseline = calculate_emissions(answers)["total"]
+    scenarios = {}
+    for combo in itertools.product(*choices.values()):
+        upgrades = {name: option for name, option in zip(choices, combo) if option is not None}
+        if upgrades:
+            total = calculate_emissions(AuditAnswers(**{**current, **upgrades}))["total"]
+            scenarios[tuple(sorted(upgrades.items()))] = baseline - total
+    return scenarios
+
+
+HOUSEHOLDS = [
+    AuditAnswers(),
+    AuditAnswers(fridge_age="old", insulation="poor", hvac_age="old", water_heater="electric_storage",
+                 window_type="single", has_solar=False, has_dryer=True),
+    AuditAnswers(fridge_age="new", insulation="good", hvac_age="new", water_heater="heat_pump_wh",
+                 window_type="double", has_solar=True),
+    AuditAnswers(fridge_age="medium", insulation="average", water_heater="gas_storage"),
+]
+
+
+@pytest.mark.parametrize("answers", HOUSEHOLDS)
+def test_simulate_matches_scalar_reference(answers):
+    result = scenario_simulator.simulate(answers)
+    expected = reference(answers)
+    assert result["baseline"] == calculate_emissions(answers)
+    assert result["count"] == len(expected)
+    got = {tuple(sorted(s["upgrades"].items())): s["saved"] for s in result["scenarios"]}
+    assert got.keys() == expected.keys()
+    for key, saved in expected.items():
+        assert got[key] == pytest.approx(saved)
+
+    ranking = [(-s["saved"], len(s["upgrades"])) for s in result["scenarios"]]
+    assert ranking == sorted(ranking)
+    assert all(s["labels"] == [UPGRADES[name]["label"] for name in s["upgrades"]] for s in result["scenarios"])
+
+
+def test_limit_keeps_the_top_scenarios():
+    answers = HOUSEHOLDS[1]
+    full = scenario_simulator.simulate(answers)["scenarios"]
+    assert scenario_simulator.simulate(answers, limit=5)["scenarios"] == full[:5]
+
+
+def test_rebates_are_joined_per_upgrade():
+    rebates = [
+        {"id": "r1", "name": "Solar Rebate", "description": "", "amount": 1000},
+        {"id": "r2", "name": "Home upgrade", "description": "Hot water and insulation", "amount": 500},
+        {"id": "r3", "name": "EV charger", "description": "", "amount": 200},
+    ]
+    by_upgrade = match_rebates(rebates)
+    assert [r["id"] for r in by_upgrade["has_solar"]] == ["r1"]
+    assert [r["id"] for r in by_upgrade["insulation"]] == ["r2"]
+
+    result = scenario_simulator.simulate(HOUSEHOLDS[1], by_upgrade)
+    for scenario in result["scenarios"]:
+        expected = {r["id"] for name in scenario["upgrades"] for r in by_upgrade[name]}
+        assert {r["id"] for r in scenario["rebates"]} == expected
+        assert scenario["rebate_total"] == sum(r["amount"] for r in rebates if r["id"] in expected)
+
+
+@pytest.mark.anyio
+async def test_scenarios_route(api):
+    client, dataset, _ = api
+    body = {"answers": HOUSEHOLDS[1].model_dump(), "include_rebates": True, "location": "NSW",
+            "income": 50000, "limit": 3}
+    response = await client.post("/carbon/scenarios", json=body)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["count"] == 3 and all("rebate_total" in s for s in result["scenarios"])
+
+    user = dataset["users"][0]["id"]
+    assert (await client.post("/carbon/scenarios", json={"user_id": user})).status_code == 200
+    assert (await client.post("/carbon/scenarios", json={"user_id": "nobody"})).status_code == 404
+    assert (await client.post("/carbon/scenarios", json={})).status_code == 422
@@ -0,0 +1,92 @@
+# backend/tests/test_seeding.py
+import pytest
+
+from services.seeding import diff_documents, sync_collection
+
+
+def test_diff_documents():
+    existing = {"a": {"x": 1}, "b": {"x": 2, "y": 3}, "c": {"x": 3}}
+    desired = {"a": {"x": 1}, "b": {"x": 2}, "d": {"x": 4}}
+    assert diff_documents(existing, desired) == (["d"], ["b"], [])
+    # Merging {"x": 2} into b changes nothing
+    assert diff_documents(existing, desired, merge=True) == (["d"], [], [])
+    assert diff_documents(existing, desired, prune=True) == (["d"], ["b"], ["c"])
+
+
+@pytest.fixture
+def commits(db, monkeypatch):
+    """(kind, size) of each batch committed through `db`, in commit order."""
+    committed = []
+    make_batch = db.batch
+
+    def batch():
+        inner = make_batch()
+        kinds = []
+        for kind in ("set", "delete"):
+            write = getattr(inner, kind)
+            setattr(inner, kind, lambda *args, kind=kind, write=write, **kwargs: (kinds.append(kind), write(*args, **kwargs)))
+        commit = inner.commit
+
+        def counted():
+            committed.append((",".join(sorted(set(kinds))), len(kinds)))
+            commit()
+        inner.commit = counted
+        return inner
+
+    monkeypatch.setattr(db, "batch", batch)
+    return committed
+
+
+def docs(n):
+    return [{"id": f"doc_{i:04d}", "n": i} for i in range(n)]
+
+
+def test_sync_writes_only_changes(db, commits):
+    first = sync_collection(db, "things", docs(1200), batch_size=500)
+    assert (first["created"], first["updated"], first["written"], first["failed"]) == (1200, 0, 1200, 0)
+    assert sorted(size for _, size in commits) == [200, 500, 500]
+
+    commits.clear()
+    again = sync_collection(db, "things", docs(1200))
+    assert (again["unchanged"], again["written"]) == (1200, 0) and commits == []
+
+    changed = docs(1200)
+    changed[7]["n"] = -1
+    report = sync_collection(db, "things", changed + [{"id": "new", "n": -2}])
+    assert (report["created"], report["updated"], report["written"]) == (1, 1, 2)
+    assert db.collection("things").document("doc_0007").get().to_dict()["n"] == -1
+
+
+def test_sync_prunes_after_upserts(db, commits):
+    sync_collection(db, "things", docs(10))
+    commits.clear()
+    report = sync_collection(db, "things", docs(5) + [{"id": "extra", "n": 99}], prune=True)
+    assert (report["created"], report["deleted"]) == (1, 5)
+    assert [kind for kind, _ in commits] == ["set", "delete"]
+    assert {d.id for d in db.collection("things").stream()} == {f"doc_{i:04d}" for i in range(5)} | {"extra"}
+
+
+def test_sync_merge_keeps_other_fields(db):
+    db.collection("things").document("doc_0000").set({"id": "doc_0000", "n": 0, "note": "keep"})
+    report = sync_collection(db, "things", docs(1), merge=True)
+    assert report["unchanged"] == 1
+    sync_collection(db, "things", [{"id": "doc_0000", "n": 5}], merge=True)
+    assert db.collection("things").document("doc_0000").get().to_dict() == {"id": "doc_0000", "n": 5, "note": "keep"}
+
+
+def test_failed_batches_are_counted(db, monkeypatch):
+    make_batch = db.batch
+    calls = {"n": 0}
+
+    def flaky():
+        batch = make_batch()
+        calls["n"] += 1
+        if calls["n"] == 2:
+            def fail():
+                raise RuntimeError("deadline exceeded")
+            batch.commit = fail
+        return batch
+
+    monkeypatch.setattr(db, "batch", flaky)
+    report = sync_collection(db, "things", docs(30), batch_size=10, max_workers=1)
+    assert (report["written"], report["failed"]) == (20, 10)
@@ -0,0 +1,105 @@
+# backend/tests/test_serialization.py
+import datetime
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi.encoders import jsonable_encoder
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from google.cloud.firestore_v1 import GeoPoint
+from google.cloud.firestore_v1.document import DocumentReference
+
+from services.serialization import FastJSONResponse, document_data, dumps, to_plain
+
+UTC = datetime.timezone.utc
+
+
+def test_to_plain_converts_firestore_values():
+    stamp = DatetimeWithNanoseconds(2025, 1, 2, 3, 4, 5, nanosecond=123456789, tzinfo=UTC)
+    value = {
+        "at": stamp,
+        "where": GeoPoint(-33.87, 151.21),
+        "owner": DocumentReference("users", "u1", client=None),
+        "blob": b"\x00\xff",
+        "nested": [{"at": stamp}, 1, "x", None, True],
+    }
+    plain = to_plain(value)
+    assert plain == {
+        "at": datetime.datetime(2025, 1, 2, 3, 4, 5, 123456, UTC),
+        "where": {"latitude": -33.87, "longitude": 151.21},
+        "owner": "users/u1",
+        "blob": "AP8=",
+        "nested": [{"at": datetime.datetime(2025, 1, 2, 3, 4, 5, 123456, UTC)}, 1, "x", None, True],
+    }
+    assert type(plain["at"]) is datetime.datetime
+
+
+def test_document_data():
+    assert document_data(SimpleNamespace(to_dict=lambda: None)) == {}
+    stamp = DatetimeWithNanoseconds(2025, 1, 1, tzinfo=UTC)
+    assert type(document_data(SimpleNamespace(to_dict=lambda: {"t": stamp}))["t"]) is datetime.datetime
+
+
+@pytest.mark.parametrize("value", [
+    {"name": "Solar rebate", "amount": 1500, "income_max": 90000.5, "tags": ["solar", "nsw"], "active": True},
+    {"at": datetime.datetime(2025, 1, 2, 3, 4, 5, 6, UTC), "day": datetime.date(2025, 1, 2), "none": None},
+    [{"id": str(n), "score": n / 7} for n in range(50)],
+])
+def test_dumps_matches_jsonable_encoder(value):
+    assert json.loads(dumps(value)) == json.loads(json.dumps(jsonable_encoder(value)))
+
+
+def test_dumps_handles_what_orjson_rejects_by_default():
+    stamp = DatetimeWithNanoseconds(2025, 1, 2, tzinfo=UTC)
+    assert json.loads(dumps({1: "a", "v": np.float32(1.5), "arr": np.arange(3)})) == {"1": "a", "v": 1.5, "arr": [0, 1, 2]}
+    assert json.loads(dumps({"at": stamp, "where": GeoPoint(1.0, 2.0), "other": {1, 2} - {1, 2}})) == {
+        "at": "2025-01-02T00:00:00+00:00", "where": {"latitude": 1.0, "longitude": 2.0}, "other": "set()",
+    }
+
+
+def test_fast_json_response():
+    response = FastJSONResponse({"a": [1, 2]}, status_code=201, headers={"ETag": '"x"'})
+    assert response.body == b'{"a":[1,2]}'
+    assert response.status_code == 201 and response.media_type == "application/json"
+    assert response.headers["etag"] == '"x"'
+
+
+@pytest.mark.anyio
+async def test_list_routes_return_the_documents(api):
+    client, dataset, _ = api
+    response = await client.post("/contractors/", json={"location": "NSW", "services": ["solar"], "limit": 5})
+    assert response.status_code == 200 and response.headers["content-type"] == "application/json"
+    by_id = {c["id"]: c for c in dataset["contractors"]}
+    contractors = response.json()["contractors"]
+    assert contractors
+    for contractor in contractors:
+        expected = json.loads(json.dumps(jsonable_encoder(by_id[contractor["id"]])))
+        assert {key: contractor[key] for key in expected} == expected
+
+    user = dataset["users"][0]
+    assert (await client.get(f"/users/{user['id']}")).json() == user
+
+
+@pytest.mark.anyio
+async def test_response_models_apply(api, monkeypatch):
+    from routes import carbon
+
+    client, dataset, _ = api
+    schema = (await client.get("/openapi.json")).json()
+    for path, method, model in (("/carbon/scenarios", "post", "ScenarioResult"),
+                                ("/carbon/history/{user_id}", "get", "CarbonHistoryResult"),
+                                ("/rebates/", "post", "RebatePage")):
+        content = schema["paths"][path][method]["responses"]["200"]["content"]["application/json"]
+        assert content["schema"]["$ref"].endswith(f"/{model}"), path
+
+    simulate = carbon.scenario_simulator.simulate
+    monkeypatch.setattr(carbon.scenario_simulator, "simulate", lambda *args: {**simulate(*args), "debug": "internal"})
+    response = await client.post("/carbon/scenarios", json={"answers": {"has_solar": False}, "limit": 2})
+    assert response.status_code == 200 and response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert "debug" not in body and body["count"] == len(body["scenarios"]) == 1
+    assert all("rebates" not in s and "rebate_total" not in s for s in body["scenarios"])
+
+    rebates = await client.post("/rebates/", json={"location": "NSW", "income": 50000, "limit": 3})
+    assert rebates.headers["etag"] and len(rebates.json()["rebates"]) == 3
@@ -0,0 +1,124 @@
+# backend/tests/test_snapshot_file.py
+import datetime
+import time
+
+import pytest
+
+from services.contractor_index import ContractorIndex
+from services.rebate_index import RebateIndex
+from services.serialization import document_data
+from services.snapshot_file import SnapshotError, SnapshotReader, preload_indexes, read_snapshot, write_snapshot
+
+UTC = datetime.timezone.utc
+
+
+@pytest.fixture
+def snapshot(tmp_path, db):
+    """The catalog as scripts/snapshot.py exports it from Firestore."""
+    path = tmp_path / "catalog.snap"
+    write_snapshot(str(path), {name: [(doc.id, document_data(doc)) for doc in db.collection(name).stream()]
+                               for name in ("rebates", "contractors")})
+    return path
+
+
+def test_round_trip(tmp_path):
+    stamp = datetime.datetime(2025, 3, 4, 5, 6, 7, 890, UTC)
+    collections = {
+        "things": [("a", {"n": 1, "at": stamp, "nested": {"when": [stamp], "x": None}}), ("b", {})],
+        "empty": [],
+    }
+    path = tmp_path / "s.snap"
+    assert write_snapshot(str(path), collections) == {"things": 2, "empty": 0}
+    assert not (tmp_path / "s.snap.tmp").exists()
+
+    with SnapshotReader(str(path)) as reader:
+        assert reader.collections == {"things": 2, "empty": 0}
+        assert 0 <= reader.age_seconds < 60
+        assert reader.documents("things") == collections["things"]
+        assert reader.documents("empty") == []
+        with pytest.raises(KeyError):
+            reader.documents("missing")
+    assert read_snapshot(str(path), ["things"]) == {"things": collections["things"]}
+
+    with pytest.raises(TypeError):
+        write_snapshot(str(tmp_path / "bad.snap"), {"things": [("a", {"v": {1, 2}})]})
+
+
+def test_rejects_damaged_files(tmp_path, snapshot):
+    raw = snapshot.read_bytes()
+    cases = {
+        "empty": b"",
+        "magic": b"NOTASNAP" + raw[8:],
+        "truncated": raw[:len(raw) - 10],
+        "flipped": raw[:-5] + bytes([raw[-5] ^ 0xFF]) + raw[-4:],
+    }
+    for name, content in cases.items():
+        path = tmp_path / f"{name}.snap"
+        path.write_bytes(content)
+        with pytest.raises(SnapshotError):
+            with SnapshotReader(str(path)) as reader:
+                for collection in reader.collections:
+                    reader.documents(collection)
+    # The flipped byte is in the last collection written
+    assert not preload_indexes(str(tmp_path / "flipped.snap"), [ContractorIndex()])
+    assert not preload_indexes(str(tmp_path / "nowhere.snap"), [RebateIndex()])
+
+
+def wait_reconciled(index, timeout=5.0):
+    """Waits for the listener's first snapshot to replace the preloaded documents."""
+    deadline = time.monotonic() + timeout
+    while index._preloaded is not None:
+        assert time.monotonic() < deadline, "listener never delivered its first snapshot"
+        time.sleep(0.01)
+
+
+def test_preloaded_indexes_serve_before_the_listener(snapshot, dataset):
+    rebates, contractors = RebateIndex(), ContractorIndex()
+    assert preload_indexes(str(snapshot), [rebates, contractors])
+    assert rebates.ready and contractors.ready
+    rebate = dataset["rebates"][0]
+    assert rebate["id"] in {r["id"] for r in rebates.query(rebate["location"], 0)}
+    assert len(contractors.query("NSW", ["solar"])) == len([
+        c for c in dataset["contractors"] if c["location"] in ("NSW", "AUS") and "solar" in c["services"]
+    ])
+
+
+def test_unchanged_documents_keep_the_version(snapshot, db, start):
+    fresh = start(RebateIndex())
+    preloaded = RebateIndex()
+    preload_indexes(str(snapshot), [preloaded])
+    version = preloaded.version
+    assert version == fresh.version
+
+    rebuilt = []
+    rebuild = preloaded._rebuild
+    preloaded._rebuild = lambda touched: (rebuilt.append(set(touched)), rebuild(touched))
+    preloaded.start(db)
+    try:
+        wait_reconciled(preloaded)
+    finally:
+        preloaded.stop()
+    assert rebuilt == [set()]
+    assert preloaded.version == version
+
+
+def test_reconcile_drops_deleted_and_applies_changed(snapshot, db, dataset, start):
+    deleted, changed = dataset["rebates"][0], dataset["rebates"][1]
+    rebates = db.collection("rebates")
+    rebates.document(deleted["id"]).delete()
+    rebates.document(changed["id"]).update({"income_max": 10 ** 9, "location": "TAS"})
+    rebates.document("added").set({"name": "Added", "location": "TAS", "income_max": 10 ** 9})
+
+    index = RebateIndex()
+    preload_indexes(str(snapshot), [index])
+    assert deleted["id"] in index._docs
+    index.start(db)
+    try:
+        wait_reconciled(index)
+        assert deleted["id"] not in index._docs
+        tas = {r["id"] for r in index.query("TAS", 10 ** 9)}
+        assert {changed["id"], "added"} <= tas
+        assert deleted["id"] not in {r["id"] for r in index.query(deleted["location"], 0)}
+        assert index.version == start(RebateIndex()).version
+    finally:
+        index.stop()
@@ -0,0 +1,59 @@
+# backend/tests/test_users.py
+import json
+
+import pytest
+
+from routes import users as users_routes
+from routes.users import DEFAULT_BATCH_FIELDS
+
+pytestmark = pytest.mark.anyio
+
+ADMIN = {"Authorization": "Bearer admin_1"}
+
+
+def parse(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def test_batch_requires_a_privileged_token(api):
+    client, dataset, _ = api
+    body = {"user_ids": [dataset["users"][0]["id"]]}
+    assert (await client.post("/users/batch", json=body)).status_code == 401
+    denied = await client.post("/users/batch", json=body, headers={"Authorization": "Bearer user_000000"})
+    assert denied.status_code == 403
+    assert (await client.post("/users/batch", json=body, headers=ADMIN)).status_code == 200
+
+
+async def test_batch_defaults_to_non_pii_fields(api):
+    client, dataset, _ = api
+    user = dataset["users"][0]
+    lines = parse(await client.post("/users/batch", json={"user_ids": [user["id"]]}, headers=ADMIN))
+    assert set(lines[0]) <= {"id", *DEFAULT_BATCH_FIELDS}
+    assert lines[0]["location"] == user["location"]
+
+    lines = parse(await client.post("/users/batch", json={"user_ids": [user["id"]], "fields": ["email"]},
+                                    headers=ADMIN))
+    assert lines[0] == {"id": user["id"], "email": user["email"]}
+
+
+async def test_batch_streams_every_user_once(api, monkeypatch):
+    client, dataset, _ = api
+    monkeypatch.setattr(users_routes, "USERS_BATCH_CHUNK_SIZE", 7)
+    known = [u["id"] for u in dataset["users"][:30]]
+    body = {"user_ids": known + known[:5] + ["nobody_1", "nobody_2"], "fields": ["location", "annual_income"]}
+    lines = parse(await client.post("/users/batch", json=body, headers=ADMIN))
+
+    *found, done = lines
+    assert done["done"] and done["count"] == 30 and sorted(done["missing"]) == ["nobody_1", "nobody_2"]
+    assert sorted(line["id"] for line in found) == sorted(known)
+    by_id = {u["id"]: u for u in dataset["users"]}
+    for line in found:
+        assert line == {"id": line["id"], "location": by_id[line["id"]]["location"],
+                        "annual_income": by_id[line["id"]]["annual_income"]}
+
+
+async def test_batch_validates_input(api):
+    client, _, _ = api
+    assert (await client.post("/users/batch", json={"user_ids": []}, headers=ADMIN)).status_code == 422
+    bad = {"user_ids": ["a"], "fields": ["email; drop"]}
+    assert (await client.post("/users/batch", json=bad, headers=ADMIN)).status_code == 422